@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import subprocess
+
+from clip_index import get_clip_metadata
+from moviepy.config import get_setting
+from threading import Lock
+from typing import Optional
+
+MEZZANINE_VERSION = 1
+MEZZANINE_CODEC = "libx264"
+MEZZANINE_PRESET = "veryfast"
+MEZZANINE_CRF = 16
+
+_mezzanine_lock = Lock()
+
+
+def get_background_video_crop(
+    clip_size: tuple[int, int],
+    video_dimensions: tuple[int, int],
+    horizontal_offset: Optional[int] = None,
+    vertical_offset: Optional[int] = None,
+) -> tuple[int, int, int, int]:
+    """
+    Gets the region of a single background video that is scaled to the video.
+
+    A video that is wider than the video is cropped horizontally at the
+    horizontal offset, otherwise it is cropped vertically at the vertical
+    offset. Without an offset the crop is centered.
+
+    Parameters
+    ----------
+    clip_size : tuple[int, int]
+        The width and height of the background video.
+    video_dimensions : tuple[int, int]
+        The width and height of the video.
+    horizontal_offset : Optional[int]
+        The horizontal offset of the crop.
+    vertical_offset : Optional[int]
+        The vertical offset of the crop.
+
+    Returns
+    -------
+    tuple[int, int, int, int]
+        The x, y, width and height of the crop.
+    """
+
+    clip_width, clip_height = clip_size
+    video_width, video_height = video_dimensions
+    target_aspect_ratio = video_width / video_height
+
+    if clip_width / clip_height > target_aspect_ratio:
+        new_width = int(clip_height * target_aspect_ratio)
+        x = horizontal_offset or (clip_width - new_width) // 2
+
+        return x, 0, new_width, clip_height
+
+    new_height = int(clip_width / target_aspect_ratio)
+    y = vertical_offset or (clip_height - new_height) // 2
+
+    return 0, y, clip_width, new_height
+
+
+def get_background_video_mezzanine(
+    path: str,
+    video_dimensions: tuple[int, int],
+    horizontal_offset: Optional[int] = None,
+    vertical_offset: Optional[int] = None,
+) -> str:
+    """
+    Gets the mezzanine of a single background video: the cropped region
+    scaled to the video size, transcoded once and stored next to the source.
+
+    The mezzanine is not trimmed, so every preset that uses the same
+    background video with the same crop shares it whatever its start time.
+
+    Parameters
+    ----------
+    path : str
+        The path to the background video.
+    video_dimensions : tuple[int, int]
+        The width and height of the video.
+    horizontal_offset : Optional[int]
+        The horizontal offset of the crop.
+    vertical_offset : Optional[int]
+        The vertical offset of the crop.
+
+    Returns
+    -------
+    str
+        The path to the mezzanine.
+    """
+
+    metadata = get_clip_metadata(path)
+    crop = get_background_video_crop(
+        (metadata.width, metadata.height),
+        video_dimensions,
+        horizontal_offset,
+        vertical_offset,
+    )
+
+    key_data = {
+        "version": MEZZANINE_VERSION,
+        "source": [os.path.basename(path), metadata.file_size, metadata.modified_time],
+        "crop": crop,
+        "video_dimensions": list(video_dimensions),
+        "encoder": [MEZZANINE_CODEC, MEZZANINE_PRESET, MEZZANINE_CRF],
+    }
+    key = hashlib.sha256(json.dumps(key_data).encode("utf-8")).hexdigest()[:16]
+
+    video_width, video_height = video_dimensions
+    stem = os.path.splitext(path)[0]
+    mezzanine_path = f"{stem}.{video_width}x{video_height}.{key}.mp4".replace("\\", "/")
+
+    # Renders in other threads wait for the same mezzanine instead of transcoding it again
+    with _mezzanine_lock:
+        if not os.path.isfile(mezzanine_path):
+            create_mezzanine(path, mezzanine_path, crop, video_dimensions, metadata.fps)
+
+    return mezzanine_path
+
+
+def create_mezzanine(
+    path: str,
+    mezzanine_path: str,
+    crop: tuple[int, int, int, int],
+    video_dimensions: tuple[int, int],
+    fps: float,
+) -> None:
+    """
+    Transcodes the cropped and scaled region of a video without audio, with a
+    keyframe every second so subclips can start anywhere quickly.
+    """
+
+    x, y, width, height = crop
+    video_width, video_height = video_dimensions
+    temporary_path = f"{mezzanine_path}.{os.getpid()}.tmp.mp4"
+
+    command = [
+        get_setting("FFMPEG_BINARY"),
+        "-y",
+        "-loglevel",
+        "error",
+        "-i",
+        path,
+        "-an",
+        "-vf",
+        f"crop={width}:{height}:{x}:{y},scale={video_width}:{video_height},setsar=1",
+        "-c:v",
+        MEZZANINE_CODEC,
+        "-preset",
+        MEZZANINE_PRESET,
+        "-crf",
+        str(MEZZANINE_CRF),
+        "-g",
+        str(max(round(fps or 30), 1)),
+        "-pix_fmt",
+        "yuv420p",
+        temporary_path,
+    ]
+
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except subprocess.CalledProcessError as error:
+        if os.path.isfile(temporary_path):
+            os.remove(temporary_path)
+
+        raise RuntimeError(
+            f"Failed to create the mezzanine of {path}: {error.stderr.decode(errors='ignore')}"
+        ) from error
+
+    os.replace(temporary_path, mezzanine_path)
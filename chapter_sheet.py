@@ -0,0 +1,157 @@
+import csv
+import io
+import os
+
+from typing import Optional
+
+
+class ChapterSheet:
+    """
+    The verse numbers, verse texts, translations and timestamps of a chapter
+    CSV file, kept in memory while a video is prepared.
+
+    The file is read once and written once by save, through a temporary file
+    that replaces it, so a crash never leaves a truncated file behind. Rows
+    without any value are left out.
+    """
+
+    def __init__(self, path: str, field_names: list[str], rows: Optional[list[dict]] = None):
+        self.path = path
+        self.field_names = list(field_names)
+        self.rows = rows if rows is not None else []
+
+        # The contents of the file, None when there is no file yet
+        self._saved_contents = None
+
+    @classmethod
+    def load(cls, path: str) -> "ChapterSheet":
+        """
+        Reads a chapter CSV file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the CSV file.
+
+        Returns
+        -------
+        ChapterSheet
+            The chapter sheet.
+        """
+
+        with open(path, "r", encoding="utf-8", newline="") as file:
+            contents = file.read()
+
+        dict_reader = csv.DictReader(io.StringIO(contents, newline=""))
+        rows = [
+            {
+                field_name: value or ""
+                for field_name, value in row.items()
+                if field_name is not None
+            }
+            for row in dict_reader
+        ]
+        chapter_sheet = cls(path, dict_reader.fieldnames or [], rows)
+        chapter_sheet._saved_contents = contents
+
+        return chapter_sheet
+
+    def add_column(self, name: str, before: Optional[str] = None) -> None:
+        """
+        Adds a column, before another column when the sheet has it, otherwise
+        at the end. Does nothing when the sheet already has the column.
+        """
+
+        if name in self.field_names:
+            return
+
+        if before in self.field_names:
+            self.field_names.insert(self.field_names.index(before), name)
+        else:
+            self.field_names.append(name)
+
+    def select_columns(self, columns: list[str]) -> list[list[str]]:
+        """
+        Selects columns of every row.
+
+        Parameters
+        ----------
+        columns : list[str]
+            The names of the columns to select.
+
+        Returns
+        -------
+        list[list[str]]
+            The values of the columns of every row.
+        """
+
+        return [[row[column] for column in columns] for row in self.remove_empty_rows()]
+
+    def remove_empty_rows(self) -> list[dict]:
+        """
+        Removes the rows without any value and fills the missing values of the
+        other rows with empty strings, like reading the sheet back from its file.
+
+        Returns
+        -------
+        list[dict]
+            The rows.
+        """
+
+        self.rows = [
+            row
+            for row in self.rows
+            if any(str(row.get(field_name) or "").strip() for field_name in self.field_names)
+        ]
+
+        for row in self.rows:
+            for field_name in self.field_names:
+                if row.get(field_name) is None:
+                    row[field_name] = ""
+
+        return self.rows
+
+    def get_contents(self) -> str:
+        """
+        Gets the sheet as CSV, the way save writes it.
+        """
+
+        contents = io.StringIO(newline="")
+        dict_writer = csv.DictWriter(
+            contents, fieldnames=self.field_names, extrasaction="ignore"
+        )
+        dict_writer.writeheader()
+        dict_writer.writerows(self.remove_empty_rows())
+
+        return contents.getvalue()
+
+    def save(self) -> bool:
+        """
+        Writes the sheet to its file when it changed since it was read or
+        last written.
+
+        Returns
+        -------
+        bool
+            True if the file was written, False if it did not change.
+        """
+
+        contents = self.get_contents()
+
+        if contents == self._saved_contents:
+            return False
+
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+
+        try:
+            with open(temporary_path, "w", encoding="utf-8", newline="") as file:
+                file.write(contents)
+
+            os.replace(temporary_path, self.path)
+        finally:
+            if os.path.isfile(temporary_path):
+                os.remove(temporary_path)
+
+        self._saved_contents = contents
+
+        return True
@@ -0,0 +1,476 @@
+import json
+import os
+import subprocess
+
+from dataclasses import asdict, dataclass
+from threading import Lock
+from typing import Optional
+
+CLIP_INDEX_FILE_NAME = ".clip_index.json"
+CLIP_INDEX_VERSION = 1
+
+
+class ClipProbeError(OSError):
+    """
+    Raised when a clip can not be probed, e.g. because it is corrupt or has no
+    video stream.
+    """
+
+
+@dataclass
+class ClipMetadata:
+    path: str
+    duration: float
+    width: int
+    height: int
+    fps: float
+    codec: Optional[str]
+    # Only known once get_clip_keyframe_interval scanned the packets of the clip
+    keyframe_interval: Optional[float]
+    file_size: int
+    modified_time: float
+
+
+class ClipIndex:
+    """
+    Metadata index of the background clip libraries of an account.
+
+    Every clip directory keeps its own index file, so directories that are
+    shared between accounts are only probed once. Clips are only probed again
+    when their file size or modification time changed.
+    """
+
+    def __init__(self, directories: list[str]):
+        self.directories = [directory.replace("\\", "/") for directory in directories]
+        self._clips: dict[str, ClipMetadata] = {}
+        self._lock = Lock()
+
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Updates the index with the mp4 files currently on disk and writes the
+        index file of every directory that changed.
+        """
+
+        clips = {}
+
+        for directory in self.directories:
+            stored_clips = load_directory_index(directory)
+            directory_clips = {}
+            changed = False
+
+            for file in sorted(os.listdir(directory)):
+                if not file.endswith(".mp4"):
+                    continue
+
+                path = os.path.join(directory, file)
+                stat = os.stat(path)
+                metadata = stored_clips.get(file)
+
+                if (
+                    metadata is None
+                    or metadata.file_size != stat.st_size
+                    or metadata.modified_time != stat.st_mtime
+                ):
+                    try:
+                        metadata = probe_clip(path)
+                    except ClipProbeError as error:
+                        # A single unreadable clip should not stop the rest of the directory
+                        print(f"Skipping background clip {path}: {error}")
+                        changed = True
+                        continue
+
+                    changed = True
+
+                metadata.path = path
+                directory_clips[file] = metadata
+
+            if changed or stored_clips.keys() != directory_clips.keys():
+                try:
+                    save_directory_index(directory, directory_clips)
+                except OSError as error:
+                    # The index is only an optimization, e.g. for read-only directories
+                    print(f"Unable to save the clip index of {directory}: {error}")
+
+            clips.update(
+                {metadata.path: metadata for metadata in directory_clips.values()}
+            )
+
+        with self._lock:
+            self._clips = clips
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._clips
+
+    def paths(self) -> list[str]:
+        """
+        Returns the paths of all indexed clips.
+        """
+
+        return list(self._clips)
+
+    def get(self, path: str) -> ClipMetadata:
+        """
+        Returns the metadata of a clip, probing it when it is not part of the
+        indexed directories (e.g. a clip from an older video map).
+        """
+
+        metadata = self._clips.get(path)
+
+        if metadata is None:
+            with self._lock:
+                metadata = self._clips.get(path)
+
+                if metadata is None:
+                    metadata = probe_clip(path)
+                    self._clips[path] = metadata
+
+        return metadata
+
+    def duration(self, path: str, speed: float = 1.0) -> float:
+        """
+        Returns the duration of a clip played at the given speed.
+        """
+
+        return self.get(path).duration / speed
+
+
+_clip_indexes: dict[tuple[str, ...], ClipIndex] = {}
+_clip_indexes_lock = Lock()
+
+
+def get_clip_index(directories: list[str], refresh: bool = True) -> ClipIndex:
+    """
+    Returns the clip index of the given directories, refreshing it when it was
+    already loaded in this process.
+
+    Parameters
+    ----------
+    directories : list[str]
+        The background clip directories.
+    refresh : bool
+        Whether to pick up changed files when the index was already loaded.
+
+    Returns
+    -------
+    ClipIndex
+        The clip index.
+    """
+
+    key = tuple(directories)
+
+    with _clip_indexes_lock:
+        clip_index = _clip_indexes.get(key)
+
+        if clip_index is None:
+            clip_index = _clip_indexes[key] = ClipIndex(directories)
+        elif refresh:
+            clip_index.refresh()
+
+    return clip_index
+
+
+def get_clip_metadata(path: str) -> ClipMetadata:
+    """
+    Gets the metadata of a clip from the loaded indexes, loading the index of
+    the clip's directory when no loaded index contains it.
+
+    Parameters
+    ----------
+    path : str
+        The path to the clip.
+
+    Returns
+    -------
+    ClipMetadata
+        The metadata of the clip.
+    """
+
+    path = path.replace("\\", "/")
+
+    for clip_index in list(_clip_indexes.values()):
+        if path in clip_index:
+            return clip_index.get(path)
+
+    directory = os.path.dirname(path) or "."
+
+    # Without an index file, e.g. in a read-only library, every worker process
+    # would probe the whole directory, so only the clip itself is probed
+    if not os.path.isfile(os.path.join(directory, CLIP_INDEX_FILE_NAME)):
+        return get_clip_index([], refresh=False).get(path)
+
+    return get_clip_index([directory], refresh=False).get(path)
+
+
+def get_clip_keyframe_interval(path: str) -> Optional[float]:
+    """
+    Gets the average keyframe interval of a clip, scanning its packets the
+    first time it is needed instead of when the clip is indexed.
+
+    Parameters
+    ----------
+    path : str
+        The path to the clip.
+
+    Returns
+    -------
+    Optional[float]
+        The average keyframe interval in seconds, None if it could not be determined.
+    """
+
+    metadata = get_clip_metadata(path)
+
+    if metadata.keyframe_interval is None:
+        metadata.keyframe_interval = probe_keyframe_interval(metadata.path)
+
+    return metadata.keyframe_interval
+
+
+def load_directory_index(directory: str) -> dict[str, ClipMetadata]:
+    """
+    Loads the index file of a clip directory.
+
+    Parameters
+    ----------
+    directory : str
+        The clip directory.
+
+    Returns
+    -------
+    dict[str, ClipMetadata]
+        The stored metadata by file name, empty if there is no valid index file.
+    """
+
+    index_file_path = os.path.join(directory, CLIP_INDEX_FILE_NAME)
+
+    try:
+        with open(index_file_path, "r", encoding="utf-8") as index_file:
+            index = json.load(index_file)
+
+        if index.get("version") != CLIP_INDEX_VERSION:
+            return {}
+
+        return {
+            file: ClipMetadata(**metadata) for file, metadata in index["clips"].items()
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def save_directory_index(directory: str, clips: dict[str, ClipMetadata]) -> None:
+    """
+    Atomically writes the index file of a clip directory.
+
+    Parameters
+    ----------
+    directory : str
+        The clip directory.
+    clips : dict[str, ClipMetadata]
+        The metadata by file name.
+    """
+
+    index_file_path = os.path.join(directory, CLIP_INDEX_FILE_NAME)
+    temporary_file_path = f"{index_file_path}.tmp"
+
+    try:
+        with open(temporary_file_path, "w", encoding="utf-8") as index_file:
+            json.dump(
+                {
+                    "version": CLIP_INDEX_VERSION,
+                    "clips": {
+                        file: asdict(metadata) for file, metadata in clips.items()
+                    },
+                },
+                index_file,
+                indent=4,
+            )
+
+        os.replace(temporary_file_path, index_file_path)
+    finally:
+        if os.path.isfile(temporary_file_path):
+            os.remove(temporary_file_path)
+
+
+def probe_clip(path: str) -> ClipMetadata:
+    """
+    Probes a clip with a single ffprobe call.
+
+    Falls back to moviepy's ffmpeg header parser when ffprobe is not installed,
+    in which case the codec is unknown. The keyframe interval is left unknown,
+    see get_clip_keyframe_interval.
+
+    Parameters
+    ----------
+    path : str
+        The path to the clip.
+
+    Returns
+    -------
+    ClipMetadata
+        The metadata of the clip.
+
+    Raises
+    ------
+    ClipProbeError
+        If the clip can not be read or has no video stream.
+    """
+
+    stat = os.stat(path)
+
+    try:
+        return run_probe(path, stat)
+    except ClipProbeError:
+        raise
+    except (
+        OSError,
+        subprocess.CalledProcessError,
+        IndexError,
+        KeyError,
+        TypeError,
+        ValueError,
+    ) as error:
+        raise ClipProbeError(f"Failed to probe {path}: {error}") from error
+
+
+def run_probe(path: str, stat: os.stat_result) -> ClipMetadata:
+    """
+    Probes a clip, see probe_clip.
+    """
+
+    try:
+        output = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-select_streams",
+                "v:0",
+                "-show_entries",
+                "stream=codec_name,width,height,avg_frame_rate,r_frame_rate:format=duration",
+                "-of",
+                "json",
+                path,
+            ],
+            capture_output=True,
+            check=True,
+        ).stdout
+    except FileNotFoundError:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+        infos = ffmpeg_parse_infos(path)
+        width, height = infos["video_size"]
+
+        return ClipMetadata(
+            path=path,
+            duration=infos["video_duration"],
+            width=width,
+            height=height,
+            fps=infos["video_fps"],
+            codec=None,
+            keyframe_interval=None,
+            file_size=stat.st_size,
+            modified_time=stat.st_mtime,
+        )
+
+    probe = json.loads(output)
+
+    if not probe.get("streams"):
+        raise ClipProbeError(f"{path} has no video stream")
+
+    stream = probe["streams"][0]
+
+    return ClipMetadata(
+        path=path,
+        duration=float(probe["format"]["duration"]),
+        width=int(stream["width"]),
+        height=int(stream["height"]),
+        fps=parse_frame_rate(stream.get("avg_frame_rate"))
+        or parse_frame_rate(stream.get("r_frame_rate")),
+        codec=stream.get("codec_name"),
+        keyframe_interval=None,
+        file_size=stat.st_size,
+        modified_time=stat.st_mtime,
+    )
+
+
+def probe_keyframe_interval(path: str, probe_duration: float = 30.0) -> Optional[float]:
+    """
+    Gets the average keyframe interval in seconds over the start of a clip.
+
+    Parameters
+    ----------
+    path : str
+        The path to the clip.
+    probe_duration : float
+        The number of seconds to read packets of.
+
+    Returns
+    -------
+    Optional[float]
+        The average keyframe interval, None if it could not be determined.
+    """
+
+    try:
+        output = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-select_streams",
+                "v:0",
+                "-read_intervals",
+                f"%+{probe_duration}",
+                "-show_entries",
+                "packet=pts_time,flags",
+                "-of",
+                "csv=print_section=0",
+                path,
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    keyframe_times = []
+
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(",")
+
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframe_times.append(float(pts_time))
+
+    if len(keyframe_times) < 2:
+        return None
+
+    return round(
+        (keyframe_times[-1] - keyframe_times[0]) / (len(keyframe_times) - 1), 3
+    )
+
+
+def parse_frame_rate(frame_rate: Optional[str]) -> float:
+    """
+    Parses an ffprobe frame rate such as "30000/1001".
+
+    Parameters
+    ----------
+    frame_rate : Optional[str]
+        The frame rate.
+
+    Returns
+    -------
+    float
+        The frame rate, 0 if it is unknown.
+    """
+
+    if not frame_rate:
+        return 0.0
+
+    numerator, _, denominator = frame_rate.partition("/")
+
+    try:
+        return float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
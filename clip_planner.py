@@ -0,0 +1,188 @@
+import math
+import random
+
+from bisect import bisect_left
+from clip_index import ClipIndex
+from clip_sampler import BackgroundClipSampler, BackgroundClipsExhaustedError
+from typing import Optional
+
+# Background clip time offsets are planned in hundredths of a second
+TIME_OFFSET_RESOLUTION = 100
+DURATION_TOLERANCE = 1e-6
+
+
+class BackgroundClipPlanner:
+    """
+    Fits background clips to the duration of a video clip in a single pass.
+
+    Clips are drawn from the sampler among those that are long enough to be
+    used for the remaining duration, and their time offsets are only sampled
+    from the offsets that satisfy the minimum clip duration rule, so no draw
+    is ever thrown away. Clips narrower than the video are never planned.
+    """
+
+    def __init__(
+        self,
+        clip_index: ClipIndex,
+        sampler: BackgroundClipSampler,
+        clip_speed: float,
+        minimum_clip_duration: float,
+        video_width: int,
+        allow_mirrored_clips: bool,
+        seed: Optional[int] = None,
+    ):
+        self.clip_index = clip_index
+        self.sampler = sampler
+        self.clip_speed = clip_speed
+        self.minimum_clip_duration = minimum_clip_duration
+        self.video_width = video_width
+        self.allow_mirrored_clips = allow_mirrored_clips
+
+        self._random = random.Random(seed)
+        self._durations = {}
+
+        for clip_path in sampler.clip_paths:
+            clip_width = clip_index.get(clip_path).width
+
+            if clip_width < video_width:
+                print(
+                    f"Skipping background clip {clip_path}: its width ({clip_width}) is less than the video width ({video_width})"
+                )
+                continue
+
+            self._durations[clip_path] = clip_index.duration(clip_path, clip_speed)
+
+        self._sorted_durations = sorted(self._durations.values())
+
+    def plan(self, duration: float) -> list[list[str, float, int, str]]:
+        """
+        Plans the background clips of a video clip.
+
+        Parameters
+        ----------
+        duration : float
+            The duration of the video clip.
+
+        Returns
+        -------
+        list[list[str, float, int, str]]
+            The background clips as [path, time offset, horizontal offset, mirrored]
+            entries, in the same format as the video map.
+        """
+
+        background_clips = []
+        remaining_duration = duration
+
+        while remaining_duration > DURATION_TOLERANCE:
+            minimum_duration = self.get_minimum_usable_duration(remaining_duration)
+
+            if (
+                bisect_left(self._sorted_durations, minimum_duration - DURATION_TOLERANCE)
+                == len(self._sorted_durations)
+            ):
+                raise BackgroundClipsExhaustedError(
+                    f"No background clip is at least {minimum_duration:.2f}s long at speed {self.clip_speed}."
+                )
+
+            clip_path = self.sampler.draw(
+                accept=lambda clip_path: self._durations.get(clip_path, 0)
+                >= minimum_duration - DURATION_TOLERANCE
+            )
+            clip_duration = self._durations[clip_path]
+
+            time_offset = self.get_time_offset(clip_duration, remaining_duration)
+            remaining_duration -= min(remaining_duration, clip_duration - time_offset)
+
+            background_clips.append(
+                [
+                    clip_path,
+                    time_offset,
+                    self.get_horizontal_offset(clip_path),
+                    self.get_mirrored(),
+                ]
+            )
+
+        return background_clips
+
+    def can_split(self, remaining_duration: float) -> bool:
+        """
+        Checks if the remaining duration can be covered by more than one clip.
+
+        A clip shorter than the remaining duration only fits when it can leave at
+        least the minimum clip duration for the clips after it, which needs
+        twice the minimum clip duration (plus one offset step) to be remaining.
+        """
+
+        return (
+            remaining_duration
+            >= 2 * self.minimum_clip_duration + 1 / TIME_OFFSET_RESOLUTION
+        )
+
+    def get_minimum_usable_duration(self, remaining_duration: float) -> float:
+        """
+        Gets the shortest clip duration that can be used for the remaining duration.
+        """
+
+        if self.can_split(remaining_duration):
+            return self.minimum_clip_duration
+
+        return remaining_duration
+
+    def get_time_offset(self, clip_duration: float, remaining_duration: float) -> float:
+        """
+        Samples a time offset uniformly from all offsets that are valid for the clip.
+
+        An offset is valid when the rest of the clip covers the remaining
+        duration, or when it leaves at least the minimum clip duration both for
+        this clip and for the clips after it.
+        """
+
+        max_time_offset = max(clip_duration - self.minimum_clip_duration, 0)
+        offset_ranges = []
+
+        if clip_duration >= remaining_duration - DURATION_TOLERANCE:
+            offset_ranges.append(
+                (0, min(max_time_offset, max(clip_duration - remaining_duration, 0)))
+            )
+
+        if (
+            clip_duration >= self.minimum_clip_duration - DURATION_TOLERANCE
+            and self.can_split(remaining_duration)
+        ):
+            offset_ranges.append(
+                (
+                    max(
+                        clip_duration - remaining_duration + self.minimum_clip_duration,
+                        0,
+                    ),
+                    max_time_offset,
+                )
+            )
+
+        steps = [
+            (
+                math.ceil(start * TIME_OFFSET_RESOLUTION - DURATION_TOLERANCE),
+                math.floor(end * TIME_OFFSET_RESOLUTION + DURATION_TOLERANCE),
+            )
+            for start, end in offset_ranges
+        ]
+        steps = [(start, end) for start, end in steps if start <= end]
+
+        step = self._random.randint(0, sum(end - start + 1 for start, end in steps) - 1)
+
+        for start, end in steps:
+            if step <= end - start:
+                return (start + step) / TIME_OFFSET_RESOLUTION
+
+            step -= end - start + 1
+
+    def get_horizontal_offset(self, clip_path: str) -> int:
+        max_horizontal_offset = self.clip_index.get(clip_path).width - self.video_width
+
+        return self._random.randint(0, max_horizontal_offset)
+
+    def get_mirrored(self) -> str:
+        if self.allow_mirrored_clips:
+            return str(self._random.choice([True, False]))
+
+        return "False"
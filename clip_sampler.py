@@ -0,0 +1,153 @@
+import random
+
+from threading import Lock
+from typing import Callable, Optional
+
+
+class BackgroundClipsExhaustedError(Exception):
+    pass
+
+
+class BackgroundClipSampler:
+    """
+    Draws background clips for all video clips of a render from a shuffled deck.
+
+    Every clip is drawn at most once per pass over the deck. When duplicates are
+    not allowed, clips drawn in earlier passes stay excluded until the library
+    runs out, after which the deck is recycled or an error is raised. When the
+    unused clips left are all rejected, a single used clip is drawn again and
+    the unused clips stay in the deck.
+    """
+
+    def __init__(
+        self,
+        clip_paths: list[str],
+        allow_duplicates: bool = False,
+        recycle_when_exhausted: bool = True,
+        seed: Optional[int] = None,
+    ):
+        self.clip_paths = list(dict.fromkeys(clip_paths))
+        self.allow_duplicates = allow_duplicates
+        self.recycle_when_exhausted = recycle_when_exhausted
+        self.recycle_count = 0
+
+        if not self.clip_paths:
+            raise BackgroundClipsExhaustedError("There are no background clips to draw.")
+
+        self._random = random.Random(seed)
+        self._deck: list[str] = []
+        self._used: set[str] = set()
+        self._lock = Lock()
+
+        self._shuffle()
+
+    def draw(self, accept: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Draws a clip from the deck.
+
+        Parameters
+        ----------
+        accept : Optional[Callable[[str], bool]]
+            Predicate a clip must satisfy, clips it rejects stay in the deck.
+
+        Returns
+        -------
+        str
+            The path of the drawn clip.
+        """
+
+        with self._lock:
+            clip_path = self._draw(accept)
+
+            if clip_path is None and not self.allow_duplicates and self._deck:
+                # Unused clips remain but none of them fits, keep them in the deck
+                # and only reuse a single clip instead of recycling every clip
+                if not self.recycle_when_exhausted:
+                    raise BackgroundClipsExhaustedError(
+                        "None of the unused background clips fit the requested duration."
+                    )
+
+                clip_path = self._draw_used(accept)
+
+                if clip_path is None:
+                    raise BackgroundClipsExhaustedError(
+                        "None of the background clips fit the requested duration."
+                    )
+            elif clip_path is None:
+                # Only refill the deck once per draw so a predicate no clip
+                # satisfies cannot keep the caller waiting
+                if not self.allow_duplicates and not self.recycle_when_exhausted:
+                    raise BackgroundClipsExhaustedError(
+                        f"All {len(self.clip_paths)} background clips have been used."
+                    )
+
+                self._used.clear()
+                self._shuffle()
+                self.recycle_count += 1
+
+                clip_path = self._draw(accept)
+
+                if clip_path is None:
+                    raise BackgroundClipsExhaustedError(
+                        "None of the background clips fit the requested duration."
+                    )
+
+            self._used.add(clip_path)
+
+            return clip_path
+
+    def mark_used(self, clip_path: str) -> None:
+        """
+        Excludes a clip that was chosen without drawing it, e.g. from a video map.
+        """
+
+        with self._lock:
+            self._used.add(clip_path)
+
+    def release(self, clip_path: str) -> None:
+        """
+        Returns a drawn clip that ended up unused to the bottom of the deck.
+        """
+
+        with self._lock:
+            self._used.discard(clip_path)
+            self._deck.insert(0, clip_path)
+
+    def is_used(self, clip_path: str) -> bool:
+        return clip_path in self._used
+
+    def _draw(self, accept: Optional[Callable[[str], bool]]) -> Optional[str]:
+        for index in range(len(self._deck) - 1, -1, -1):
+            clip_path = self._deck[index]
+
+            if not self.allow_duplicates and clip_path in self._used:
+                # Lazily drop clips that were marked as used after shuffling
+                del self._deck[index]
+                continue
+
+            if accept is None or accept(clip_path):
+                del self._deck[index]
+
+                return clip_path
+
+        return None
+
+    def _draw_used(self, accept: Optional[Callable[[str], bool]]) -> Optional[str]:
+        used_clip_paths = [
+            clip_path
+            for clip_path in self.clip_paths
+            if clip_path in self._used and (accept is None or accept(clip_path))
+        ]
+
+        if not used_clip_paths:
+            return None
+
+        return self._random.choice(used_clip_paths)
+
+    def _shuffle(self) -> None:
+        self._deck = [
+            clip_path
+            for clip_path in self.clip_paths
+            if self.allow_duplicates or clip_path not in self._used
+        ]
+        self._random.shuffle(self._deck)
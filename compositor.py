@@ -0,0 +1,530 @@
+import math
+import numpy as np
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Union
+
+
+# Frames handed to the writer are reused after this many frames
+FRAME_BUFFER_COUNT = 3
+
+
+@dataclass
+class OverlayLayer:
+    image: np.ndarray
+    x: int
+    y: int
+    start: float
+    duration: float
+    fade_duration: float
+
+
+@dataclass
+class FlattenedRegion:
+    """
+    Premultiplied RGBA region of flattened text layers in 8-bit fixed point,
+    with the scratch buffers its blends are computed in.
+    """
+
+    rows: slice
+    columns: slice
+    color: np.ndarray
+    alpha: np.ndarray
+    inverse_alpha: np.ndarray
+    scaled_color: np.ndarray
+    faded_color: np.ndarray
+    faded_inverse_alpha: np.ndarray
+    work: np.ndarray
+    carry: np.ndarray
+
+    @classmethod
+    def from_layer(
+        cls, rows: slice, columns: slice, color: np.ndarray, alpha: np.ndarray
+    ) -> "FlattenedRegion":
+        """
+        Converts a premultiplied float layer with 0-255 colors and 0-1 alpha.
+        """
+
+        color = np.round(color).astype(np.uint16)
+        alpha = np.round(alpha * 255).astype(np.uint16)
+
+        return cls(
+            rows=rows,
+            columns=columns,
+            color=color,
+            alpha=alpha,
+            inverse_alpha=255 - alpha,
+            scaled_color=color * np.uint16(255),
+            faded_color=np.empty_like(color),
+            faded_inverse_alpha=np.empty_like(alpha),
+            work=np.empty_like(color),
+            carry=np.empty_like(color),
+        )
+
+
+class FadeEnvelope:
+    """
+    Fade factors of a layer for every frame of the video it is shown in,
+    precomputed in fixed point steps of 1/256.
+
+    The factors rise and fall linearly over the fade duration at the start and
+    end of the layer, like moviepy's crossfadein and crossfadeout, and are 0
+    outside the layer. Times are in seconds of the video.
+    """
+
+    def __init__(self, start: float, duration: float, fade_duration: float, fps: float):
+        self.start = start
+        self.duration = duration
+        self.fade_duration = fade_duration
+        self.fps = fps
+
+        self.first_frame = math.floor(start * fps)
+        frame_times = (
+            np.arange(self.first_frame, math.ceil((start + duration) * fps) + 1) / fps
+        )
+        self.steps = np.array(
+            [
+                round(get_fade_factor(frame_time - start, duration, fade_duration) * 256)
+                for frame_time in frame_times
+            ],
+            dtype=np.uint16,
+        )
+
+    def get_step(self, t: float) -> int:
+        """
+        Gets the fade factor at a time in steps of 1/256.
+        """
+
+        frame = round(t * self.fps)
+
+        # Times between frames are not in the table
+        if abs(frame - t * self.fps) > 1e-6:
+            return round(
+                get_fade_factor(t - self.start, self.duration, self.fade_duration) * 256
+            )
+
+        frame -= self.first_frame
+
+        if frame < 0 or frame >= len(self.steps):
+            return 0
+
+        return int(self.steps[frame])
+
+
+class IntervalIndex:
+    """
+    Finds the items whose [start, end) interval contains a time.
+
+    Items are sorted by start, so a lookup only scans the items that start
+    within the longest interval before the time: with intervals that follow
+    each other, like the texts of the verses of a video, a lookup costs the
+    same however many intervals there are.
+    """
+
+    def __init__(self, intervals: list[tuple[float, float, object]]):
+        intervals = sorted(intervals, key=lambda interval: interval[0])
+
+        self.starts = [start for start, _, _ in intervals]
+        self.ends = [end for _, end, _ in intervals]
+        self.items = [item for _, _, item in intervals]
+        self.max_length = max((end - start for start, end, _ in intervals), default=0)
+
+    def get_active(self, t: float) -> list:
+        """
+        Gets the items active at a time, in order of their start.
+        """
+
+        first = bisect_left(self.starts, t - self.max_length)
+        last = bisect_right(self.starts, t)
+
+        return [
+            self.items[position]
+            for position in range(first, last)
+            if t < self.ends[position]
+        ]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class SegmentCompositor:
+    """
+    Composites the shadow and text overlays of a segment onto its background
+    frames.
+
+    The shadow covers the whole frame with a constant color, so it is a single
+    multiply-add. The texts of a segment are static apart from their fades, so
+    they are flattened once into premultiplied RGBA regions around their
+    bounding boxes: a frame then only blends those regions, as
+    frame * (1 - fade * alpha) + fade * color. Texts with a different timing or
+    fade duration than the first texts get their own regions. Where faded
+    texts overlap each other the flattened fade is an approximation of fading
+    them one by one.
+
+    Blending is done in 8-bit fixed point with 16-bit intermediates, into
+    buffers that are allocated once: frame * (255 - alpha) + color * 255 is at
+    most 255 * 255 because premultiplied colors never exceed their alpha.
+    Returned frames are overwritten FRAME_BUFFER_COUNT frames later.
+
+    Fades are looked up in precomputed FadeEnvelopes, so a fade costs a scalar
+    multiply. Text groups are kept in an IntervalIndex, so a frame only visits
+    the texts shown at its time, also when the compositor spans a whole single
+    background video.
+    """
+
+    def __init__(
+        self,
+        video_dimensions: tuple[int, int],
+        shadow_color: tuple[int, int, int],
+        shadow_opacity: float,
+        layers: list[OverlayLayer],
+        fps: float,
+    ):
+        self.video_dimensions = video_dimensions
+
+        width, height = video_dimensions
+        shadow_alpha = round(shadow_opacity * 255)
+        self.shadow_inverse_alpha = np.uint16(255 - shadow_alpha)
+        self.shadow_scaled_color = (
+            np.round(np.array(shadow_color, dtype=np.float64) * shadow_alpha / 255)
+            .astype(np.uint16)
+            .clip(0, shadow_alpha)
+            * np.uint16(255)
+        )
+
+        self.frame_buffers = [
+            np.empty((height, width, 3), dtype=np.uint8)
+            for _ in range(FRAME_BUFFER_COUNT)
+        ]
+        self.next_frame_buffer = 0
+        self.work = np.empty((height, width, 3), dtype=np.uint16)
+        self.carry = np.empty((height, width, 3), dtype=np.uint16)
+
+        groups = {}
+
+        for layer in layers:
+            groups.setdefault(
+                (layer.start, layer.duration, layer.fade_duration), []
+            ).append(layer)
+
+        # Every group is (fade envelope, regions), indexed by when it is shown
+        self.groups = IntervalIndex(
+            [
+                (
+                    start,
+                    start + duration,
+                    (
+                        FadeEnvelope(start, duration, fade_duration, fps),
+                        self.flatten(group_layers),
+                    ),
+                )
+                for (start, duration, fade_duration), group_layers in groups.items()
+            ]
+        )
+
+    def flatten(self, layers: list[OverlayLayer]) -> list[FlattenedRegion]:
+        """
+        Flattens text layers into premultiplied regions, merging the bounding
+        boxes of layers that overlap.
+
+        Returns
+        -------
+        list[FlattenedRegion]
+            The regions.
+        """
+
+        visible_layers = [
+            (layer, region)
+            for layer in map(trim_transparent_border, layers)
+            if (region := get_visible_region(layer, self.video_dimensions))
+        ]
+        boxes = merge_boxes(
+            [
+                (rows.start, columns.start, rows.stop, columns.stop)
+                for _, ((rows, columns), _) in visible_layers
+            ]
+        )
+        regions = []
+
+        for y1, x1, y2, x2 in boxes:
+            color = np.zeros((y2 - y1, x2 - x1, 3), dtype=np.float32)
+            alpha = np.zeros((y2 - y1, x2 - x1, 1), dtype=np.float32)
+
+            for layer, ((rows, columns), (image_rows, image_columns)) in visible_layers:
+                if not (y1 <= rows.start and rows.stop <= y2):
+                    continue
+
+                if not (x1 <= columns.start and columns.stop <= x2):
+                    continue
+
+                box_rows = slice(rows.start - y1, rows.stop - y1)
+                box_columns = slice(columns.start - x1, columns.stop - x1)
+                image = layer.image[image_rows, image_columns].astype(np.float32)
+                layer_alpha = image[:, :, 3:] / 255
+
+                color[box_rows, box_columns] = (
+                    image[:, :, :3] * layer_alpha
+                    + color[box_rows, box_columns] * (1 - layer_alpha)
+                )
+                alpha[box_rows, box_columns] = layer_alpha + alpha[
+                    box_rows, box_columns
+                ] * (1 - layer_alpha)
+
+            regions.append(
+                FlattenedRegion.from_layer(slice(y1, y2), slice(x1, x2), color, alpha)
+            )
+
+        return regions
+
+    def get_fade_state(self, t: float) -> tuple:
+        """
+        Gets what the overlays look like at a time: frames with the same fade
+        state composite to the same image over the same background.
+        """
+
+        state = tuple(
+            (id(fade_envelope), fade_step)
+            for fade_envelope, _ in self.groups.get_active(t)
+            if (fade_step := fade_envelope.get_step(t)) > 0
+        )
+
+        return state
+
+    def composite(self, frame: np.ndarray, t: float) -> np.ndarray:
+        """
+        Composites the overlays onto a background frame.
+
+        Parameters
+        ----------
+        frame : np.ndarray
+            The background frame.
+        t : float
+            The time of the frame in the segment.
+
+        Returns
+        -------
+        np.ndarray
+            The composited frame, valid until FRAME_BUFFER_COUNT more frames
+            are composited.
+        """
+
+        if frame.dtype != np.uint8:
+            frame = np.clip(frame, 0, 255).astype(np.uint8)
+
+        result = self.frame_buffers[self.next_frame_buffer]
+        self.next_frame_buffer = (self.next_frame_buffer + 1) % FRAME_BUFFER_COUNT
+
+        np.multiply(frame, self.shadow_inverse_alpha, out=self.work, dtype=np.uint16)
+        np.add(self.work, self.shadow_scaled_color, out=self.work, dtype=np.uint16)
+        divide_by_255(self.work, self.carry)
+        np.copyto(result, self.work, casting="unsafe")
+
+        for fade_envelope, regions in self.groups.get_active(t):
+            fade_step = fade_envelope.get_step(t)
+
+            if fade_step <= 0:
+                continue
+
+            for region in regions:
+                blend_region(result, region, fade_step)
+
+        return result
+
+
+def blend_region(frame: np.ndarray, region: FlattenedRegion, fade_step: int) -> None:
+    """
+    Blends a flattened region into a frame in place, scaled by a fade factor
+    in steps of 1/256.
+    """
+
+    frame_region = frame[region.rows, region.columns]
+
+    if fade_step >= 256:
+        inverse_alpha = region.inverse_alpha
+        scaled_color = region.scaled_color
+    else:
+        fade_step = np.uint16(fade_step)
+        inverse_alpha = region.faded_inverse_alpha
+        scaled_color = region.faded_color
+
+        np.multiply(region.alpha, fade_step, out=inverse_alpha, dtype=np.uint16)
+        np.add(inverse_alpha, 128, out=inverse_alpha, dtype=np.uint16)
+        np.right_shift(inverse_alpha, 8, out=inverse_alpha)
+        np.subtract(255, inverse_alpha, out=inverse_alpha, dtype=np.uint16)
+
+        np.multiply(region.color, fade_step, out=scaled_color, dtype=np.uint16)
+        np.add(scaled_color, 128, out=scaled_color, dtype=np.uint16)
+        np.right_shift(scaled_color, 8, out=scaled_color)
+        np.multiply(scaled_color, 255, out=scaled_color, dtype=np.uint16)
+
+    np.multiply(frame_region, inverse_alpha, out=region.work, dtype=np.uint16)
+    np.add(region.work, scaled_color, out=region.work, dtype=np.uint16)
+    divide_by_255(region.work, region.carry)
+    np.copyto(frame_region, region.work, casting="unsafe")
+
+
+def divide_by_255(values: np.ndarray, carry: np.ndarray) -> None:
+    """
+    Divides 16-bit values of at most 255 * 255 by 255 in place, rounded to the
+    nearest integer, using carry as scratch space.
+    """
+
+    np.add(values, 128, out=values, dtype=np.uint16)
+    np.right_shift(values, 8, out=carry)
+    np.add(values, carry, out=values, dtype=np.uint16)
+    np.right_shift(values, 8, out=values)
+
+
+def get_fade_factor(t: float, duration: float, fade_duration: float) -> float:
+    """
+    Gets the opacity of a text at a time, like moviepy's crossfadein and
+    crossfadeout: 0 outside the text, rising and falling linearly over the
+    fade duration at its start and end.
+    """
+
+    if t < 0 or t >= duration:
+        return 0.0
+
+    if fade_duration <= 0:
+        return 1.0
+
+    return min(1.0, t / fade_duration) * min(1.0, (duration - t) / fade_duration)
+
+
+def get_overlay_offset(
+    position: tuple[Union[float, str], Union[float, str]],
+    image_size: tuple[int, int],
+    video_dimensions: tuple[int, int],
+) -> tuple[int, int]:
+    """
+    Gets the top left corner of an overlay from its relative moviepy position.
+
+    Parameters
+    ----------
+    position : tuple[Union[float, str], Union[float, str]]
+        The relative position, or "center", "left", "right", "top" or "bottom".
+    image_size : tuple[int, int]
+        The width and height of the overlay.
+    video_dimensions : tuple[int, int]
+        The width and height of the video.
+
+    Returns
+    -------
+    tuple[int, int]
+        The x and y offset in pixels.
+    """
+
+    offsets = []
+
+    for value, image_dimension, video_dimension in zip(
+        position, image_size, video_dimensions
+    ):
+        if value == "center":
+            offsets.append(int((video_dimension - image_dimension) / 2))
+        elif value in ("right", "bottom"):
+            offsets.append(int(video_dimension - image_dimension))
+        elif value in ("left", "top"):
+            offsets.append(0)
+        else:
+            offsets.append(int(video_dimension * value))
+
+    return tuple(offsets)
+
+
+def get_visible_region(
+    layer: OverlayLayer, video_dimensions: tuple[int, int]
+) -> Union[tuple[tuple[slice, slice], tuple[slice, slice]], None]:
+    """
+    Gets the part of a layer that is inside the frame.
+
+    Returns
+    -------
+    Union[tuple[tuple[slice, slice], tuple[slice, slice]], None]
+        The rows and columns of the frame and of the layer image, None if the
+        layer is outside the frame.
+    """
+
+    width, height = video_dimensions
+    image_height, image_width = layer.image.shape[:2]
+
+    frame_x1, frame_y1 = max(layer.x, 0), max(layer.y, 0)
+    frame_x2 = min(layer.x + image_width, width)
+    frame_y2 = min(layer.y + image_height, height)
+
+    if frame_x1 >= frame_x2 or frame_y1 >= frame_y2:
+        return None
+
+    return (
+        (slice(frame_y1, frame_y2), slice(frame_x1, frame_x2)),
+        (
+            slice(frame_y1 - layer.y, frame_y2 - layer.y),
+            slice(frame_x1 - layer.x, frame_x2 - layer.x),
+        ),
+    )
+
+
+def trim_transparent_border(layer: OverlayLayer) -> OverlayLayer:
+    """
+    Crops a layer to the bounding box of its visible pixels, caption images
+    are as wide as their wrap width and mostly transparent.
+    """
+
+    visible_rows = np.flatnonzero(layer.image[:, :, 3].any(axis=1))
+    visible_columns = np.flatnonzero(layer.image[:, :, 3].any(axis=0))
+
+    if not len(visible_rows):
+        return OverlayLayer(
+            image=layer.image[:0, :0],
+            x=layer.x,
+            y=layer.y,
+            start=layer.start,
+            duration=layer.duration,
+            fade_duration=layer.fade_duration,
+        )
+
+    y1, y2 = visible_rows[0], visible_rows[-1] + 1
+    x1, x2 = visible_columns[0], visible_columns[-1] + 1
+
+    return OverlayLayer(
+        image=layer.image[y1:y2, x1:x2],
+        x=layer.x + int(x1),
+        y=layer.y + int(y1),
+        start=layer.start,
+        duration=layer.duration,
+        fade_duration=layer.fade_duration,
+    )
+
+
+def merge_boxes(
+    boxes: list[tuple[int, int, int, int]],
+) -> list[tuple[int, int, int, int]]:
+    """
+    Merges overlapping (y1, x1, y2, x2) boxes until no boxes overlap.
+    """
+
+    merged_boxes = []
+
+    for box in boxes:
+        while True:
+            for merged_box in merged_boxes:
+                if (
+                    box[0] < merged_box[2]
+                    and merged_box[0] < box[2]
+                    and box[1] < merged_box[3]
+                    and merged_box[1] < box[3]
+                ):
+                    merged_boxes.remove(merged_box)
+                    box = (
+                        min(box[0], merged_box[0]),
+                        min(box[1], merged_box[1]),
+                        max(box[2], merged_box[2]),
+                        max(box[3], merged_box[3]),
+                    )
+                    break
+            else:
+                break
+
+        merged_boxes.append(box)
+
+    return merged_boxes
@@ -0,0 +1,285 @@
+import subprocess
+
+from clip_index import get_clip_metadata
+from moviepy.config import get_setting
+from render_plan import OverlaySpec, RenderPlan, SegmentPlan
+from segment_renderer import SEGMENT_CODEC, SEGMENT_PRESET
+from typing import Optional, Union
+
+
+def render_segment(
+    render_plan: RenderPlan,
+    segment: SegmentPlan,
+    overlay_images: list[tuple[OverlaySpec, str]],
+    segment_file: str,
+    fps: float,
+    frame_count: int,
+    threads: Optional[int] = None,
+) -> None:
+    """
+    Renders a segment with a single ffmpeg process.
+
+    Parameters
+    ----------
+    render_plan : RenderPlan
+        The render plan.
+    segment : SegmentPlan
+        The segment to render.
+    overlay_images : list[tuple[OverlaySpec, str]]
+        Every overlay of the segment with the path of its pre-rendered RGBA image.
+    segment_file : str
+        The path of the segment file.
+    fps : float
+        The frame rate of the video.
+    frame_count : int
+        The number of frames of the segment.
+    threads : Optional[int]
+        The number of encoder threads.
+    """
+
+    command = build_segment_command(
+        render_plan, segment, overlay_images, segment_file, fps, frame_count, threads
+    )
+
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except subprocess.CalledProcessError as error:
+        raise RuntimeError(
+            f"ffmpeg failed to render clip {segment.index}: {error.stderr.decode(errors='ignore')}"
+        ) from error
+
+
+def build_segment_command(
+    render_plan: RenderPlan,
+    segment: SegmentPlan,
+    overlay_images: list[tuple[OverlaySpec, str]],
+    segment_file: str,
+    fps: float,
+    frame_count: int,
+    threads: Optional[int] = None,
+) -> list[str]:
+    """
+    Compiles a segment into an ffmpeg command with a single filter_complex.
+
+    The backgrounds are trimmed, sped up, mirrored, cropped and scaled, the
+    shadow is drawn as a colour overlay and every text image is overlaid with
+    the fades of its overlay.
+
+    Returns
+    -------
+    list[str]
+        The ffmpeg command.
+    """
+
+    video_width, video_height = render_plan.video_dimensions
+    inputs = []
+    filters = []
+
+    if render_plan.video_mode == "IMAGE":
+        background_path, frame_time = segment.backgrounds[0][:2]
+
+        inputs += ["-ss", f"{frame_time:.3f}", "-i", background_path]
+        filters.append(
+            "[0:v]trim=end_frame=1,"
+            + get_center_crop_filter(background_path, render_plan.video_dimensions)
+            + f"scale={video_width}:{video_height},setsar=1,"
+            + f"loop=loop=-1:size=1,setpts=N/({fps}*TB)[background]"
+        )
+    else:
+        remaining_duration = segment.duration
+        background_labels = []
+
+        for index, background in enumerate(segment.backgrounds):
+            background_path, time_offset, horizontal_offset, mirrored = background[:4]
+            metadata = get_clip_metadata(background_path)
+
+            clip_duration = metadata.duration / render_plan.clip_speed - time_offset
+            duration = min(remaining_duration, clip_duration)
+            remaining_duration -= duration
+
+            # Offsets and durations are planned at clip speed, the input is read at source speed
+            inputs += [
+                "-ss",
+                f"{time_offset * render_plan.clip_speed:.3f}",
+                "-t",
+                f"{duration * render_plan.clip_speed:.3f}",
+                "-i",
+                background_path,
+            ]
+            filters.append(
+                f"[{index}:v]"
+                + get_background_filter(
+                    metadata.width,
+                    metadata.height,
+                    horizontal_offset,
+                    str(mirrored) == "True",
+                    render_plan.clip_speed,
+                    render_plan.video_dimensions,
+                    fps,
+                )
+                + f"[background{index}]"
+            )
+            background_labels.append(f"[background{index}]")
+
+        filters.append(
+            "".join(background_labels)
+            + f"concat=n={len(background_labels)}:v=1:a=0[background]"
+        )
+
+    # Repeat the last frame when rounding to frames makes the backgrounds a frame short
+    red, green, blue = render_plan.shadow_color
+    filters.append(
+        "[background]tpad=stop_mode=clone:stop_duration=1,"
+        + f"drawbox=x=0:y=0:w=iw:h=ih:t=fill:color=0x{red:02x}{green:02x}{blue:02x}@{render_plan.shadow_opacity}"
+        + "[layer0]"
+    )
+
+    input_count = 1 if render_plan.video_mode == "IMAGE" else len(segment.backgrounds)
+
+    for index, (overlay, overlay_image) in enumerate(overlay_images):
+        input_index = input_count + index
+        inputs += [
+            "-loop",
+            "1",
+            "-framerate",
+            str(fps),
+            "-t",
+            f"{overlay.duration:.3f}",
+            "-i",
+            overlay_image,
+        ]
+
+        fade_out_start = max(overlay.duration - overlay.fade_duration, 0)
+        x, y = overlay.position
+        filters.append(
+            f"[{input_index}:v]format=rgba,"
+            + f"fade=t=in:st=0:d={overlay.fade_duration}:alpha=1,"
+            + f"fade=t=out:st={fade_out_start:.3f}:d={overlay.fade_duration}:alpha=1"
+            + f"[text{index}]"
+        )
+        filters.append(
+            f"[layer{index}][text{index}]overlay="
+            + f"x={get_overlay_position(x, 'main_w', 'overlay_w')}:"
+            + f"y={get_overlay_position(y, 'main_h', 'overlay_h')}:"
+            + f"eof_action=pass[layer{index + 1}]"
+        )
+
+    filters.append(f"[layer{len(overlay_images)}]format=yuv420p[video]")
+
+    command = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error"]
+    command += inputs
+    command += [
+        "-filter_complex",
+        ";".join(filters),
+        "-map",
+        "[video]",
+        "-an",
+        "-r",
+        str(fps),
+        "-frames:v",
+        str(frame_count),
+        "-c:v",
+        SEGMENT_CODEC,
+        "-preset",
+        SEGMENT_PRESET,
+    ]
+
+    if threads:
+        command += ["-threads", str(threads)]
+
+    command.append(segment_file)
+
+    return command
+
+
+def get_background_filter(
+    clip_width: int,
+    clip_height: int,
+    horizontal_offset: int,
+    mirrored: bool,
+    clip_speed: float,
+    video_dimensions: tuple[int, int],
+    fps: float,
+) -> str:
+    """
+    Gets the filters that turn a background clip into video frames, in the same
+    order as the moviepy backend: speed, mirror, crop at the horizontal offset,
+    then crop to the video aspect ratio and scale.
+
+    Returns
+    -------
+    str
+        The comma separated filters, ending with a comma-free filter.
+    """
+
+    video_width, video_height = video_dimensions
+    target_aspect_ratio = video_width / video_height
+
+    crop_width = max(min(video_width, clip_width - horizontal_offset), 1)
+    crop_height = min(video_height, clip_height)
+
+    filters = [f"setpts=(PTS-STARTPTS)/{clip_speed}"]
+
+    if mirrored:
+        filters.append("hflip")
+
+    filters.append(f"crop={crop_width}:{crop_height}:{horizontal_offset}:0")
+
+    if crop_width / crop_height > target_aspect_ratio:
+        new_width = int(crop_height * target_aspect_ratio)
+        filters.append(f"crop={new_width}:{crop_height}:{(crop_width - new_width) // 2}:0")
+
+    filters += [f"scale={video_width}:{video_height}", "setsar=1", f"fps={fps}"]
+
+    return ",".join(filters)
+
+
+def get_center_crop_filter(clip_path: str, video_dimensions: tuple[int, int]) -> str:
+    """
+    Gets the filter that crops the center of a clip to the video aspect ratio,
+    followed by a comma, or an empty string when no crop is needed.
+    """
+
+    video_width, video_height = video_dimensions
+    target_aspect_ratio = video_width / video_height
+    metadata = get_clip_metadata(clip_path)
+
+    if metadata.width / metadata.height <= target_aspect_ratio:
+        return ""
+
+    new_width = int(metadata.height * target_aspect_ratio)
+
+    return f"crop={new_width}:{metadata.height}:{(metadata.width - new_width) // 2}:0,"
+
+
+def get_overlay_position(
+    position: Union[float, str], main_size: str, overlay_size: str
+) -> str:
+    """
+    Converts a relative moviepy position into an ffmpeg overlay expression.
+
+    Parameters
+    ----------
+    position : Union[float, str]
+        The relative position or "center", "left", "right", "top" or "bottom".
+    main_size : str
+        The ffmpeg variable of the video size along the axis.
+    overlay_size : str
+        The ffmpeg variable of the overlay size along the axis.
+
+    Returns
+    -------
+    str
+        The overlay expression.
+    """
+
+    if position == "center":
+        return f"({main_size}-{overlay_size})/2"
+
+    if position in ("right", "bottom"):
+        return f"{main_size}-{overlay_size}"
+
+    if position in ("left", "top"):
+        return "0"
+
+    return f"trunc({main_size}*{float(position)})"
@@ -1,16 +1,27 @@
 import concurrent.futures
+import dataclasses
 from threading import Lock
 
-import contextlib
 import csv
+import ffmpeg_backend
+import json
 import moviepy.editor as mpy
 import os
 import random
 import re
-import requests
+import tempfile
 
+from background_mezzanine import (
+    get_background_video_crop,
+    get_background_video_mezzanine,
+)
+from chapter_sheet import ChapterSheet
+from clip_index import get_clip_index, get_clip_metadata
+from clip_planner import BackgroundClipPlanner
+from clip_sampler import BackgroundClipSampler
 from colorama import Fore, Style
 from compact_json import EolStyle, Formatter
+from compositor import OverlayLayer, SegmentCompositor, get_overlay_offset
 from datetime import datetime, timedelta
 from models import (
     Account,
@@ -22,10 +33,38 @@ from models import (
     VideoSettings,
     AdditionalVideoSettings,
     Languages,
+    RenderBackends,
+    RenderSettings,
+)
+from overlay_cache import (
+    configure_overlay_cache,
+    get_text_image,
+    prerender_text_images,
+)
+from quran_corpus import (
+    get_chapter_name,
+    get_chapter_text,
+    get_chapter_translations,
+    get_chapter_verse_count,
 )
-from fuzzywuzzy import fuzz
-from pyquran import quran
+from render_plan import BackgroundVideoPlan, OverlaySpec, RenderPlan, SegmentPlan
+from segment_cache import SegmentCache
+from segment_renderer import (
+    DEFAULT_SEGMENT_FPS,
+    SEGMENT_ENCODER_SETTINGS,
+    concatenate_segment_files,
+    get_segment_frame_ranges,
+    write_clip_frames,
+)
+from still_renderer import encode_still_frames, write_still_frames
+from text_renderer import save_text_image
 from typing import Optional
+from verse_alignment import VerseAligner
+from video_readers import (
+    close_video_readers,
+    get_video_reader_pool,
+    read_transformed_frame,
+)
 
 
 def create_video(
@@ -47,12 +86,23 @@ def create_video(
     reciter_name: Optional[str] = None,
     reciter_name_text_clip: Optional[TextClipInfo] = None,
     outputFile: Optional[str] = None,
-) -> None:
+    plan_only: bool = False,
+    renderSettings: Optional[RenderSettings] = None,
+) -> RenderPlan:
     """
     Create a video with the given parameters.
 
     Parameters
     ----------
+    plan_only : bool
+        Only write the render plan next to the output file instead of rendering the video.
+    renderSettings : Optional[RenderSettings]
+        How the video is encoded, by default a single moviepy render.
+
+    Returns
+    -------
+    RenderPlan
+        The render plan of the video.
     """
 
     if not isinstance(account, Account):
@@ -79,39 +129,34 @@ def create_video(
 
     chapterCsvFile = chapterCsvFile.replace("\\", "/")
     if not os.path.isfile(chapterCsvFile):
-        # Create chapter CSV file and add verses
+        # Create chapter sheet and add verses
         columnNames = [csvColumnNames.verse_number, csvColumnNames.verse_text]
-        if not CreateCsvFile(chapterCsvFile, columnNames):
-            PrintColored(
-                Fore.RED,
-                f"Unable to create {chapterCsvFile} with column names {columnNames}.",
-            )
-            return
+        chapterSheet = ChapterSheet(chapterCsvFile, columnNames)
         PrintColored(
             Fore.GREEN,
             f"Created {chapterCsvFile} with column names {columnNames}.",
         )
 
         if not AddVerses(
-            chapterCsvFile,
+            chapterSheet,
             audioSettings.chapterNumber,
             audioSettings.verseRange,
             csvColumnNames.verse_number,
             csvColumnNames.verse_text,
         ):
-            PrintColored(Fore.RED, f"Unable to add verse texts to {chapterCsvFile}.")
-            return
+            raise Exception(f"Unable to add verse texts to {chapterCsvFile}.")
         PrintColored(Fore.GREEN, f"Added verse texts to {chapterCsvFile}.")
+    else:
+        chapterSheet = ChapterSheet.load(chapterCsvFile)
 
     if not AddTranslations(
-        chapterCsvFile,
+        chapterSheet,
         account.language,
         audioSettings.chapterNumber,
         audioSettings.verseRange,
         csvColumnNames.timestamp,
     ):
-        PrintColored(Fore.RED, f"Unable to add translations to {chapterCsvFile}.")
-        return
+        raise Exception(f"Unable to add translations to {chapterCsvFile}.")
     PrintColored(Fore.GREEN, f"Added translations to {chapterCsvFile}.")
 
     # TODO
@@ -119,12 +164,12 @@ def create_video(
         raise FileNotFoundError(f"{timestampsCsvFile} is not a valid path.")
     else:
         if UpdateCsvFileTimestamps(
-            chapterCsvFile, timestampsCsvFile, csvColumnNames.timestamp
+            chapterSheet, timestampsCsvFile, csvColumnNames.timestamp
         ):
             PrintColored(Fore.GREEN, f"Added timestamps to {chapterCsvFile}.")
 
             if UpdateCsvFileVerseNumbers(
-                chapterCsvFile,
+                chapterSheet,
                 audioSettings.chapterNumber,
                 audioSettings.verseRange,
                 csvColumnNames.verse_number,
@@ -133,11 +178,14 @@ def create_video(
             ):
                 PrintColored(Fore.GREEN, f"Added verse numbers to {chapterCsvFile}.")
 
+    # Written once, and only when a step changed the sheet
+    if chapterSheet.save():
+        PrintColored(Fore.GREEN, f"Saved {chapterCsvFile}.")
+
     languageAbbreviation = account.language.value.abbreviation
 
     # TODO: A clip should be able to be created without language abbreviation column
-    chapterCsvLines = SelectColumnsFromCsvFile(
-        chapterCsvFile,
+    chapterCsvLines = chapterSheet.select_columns(
         [
             csvColumnNames.verse_number,
             csvColumnNames.verse_text,
@@ -154,6 +202,108 @@ def create_video(
         additionalVideoSettings.endLine,
     )
 
+    segmentCache = (
+        SegmentCache(
+            renderSettings.segmentCacheDirectory, renderSettings.segmentCacheSizeLimit
+        )
+        if renderSettings and renderSettings.segmentCacheDirectory
+        else None
+    )
+    videoMapKey = None
+
+    # Every render stores its video map, so a later render can opt into planning the same background clips
+    if segmentCache and not additionalVideoSettings.backgroundVideo:
+        videoMapKey = segmentCache.get_video_map_key(
+            {
+                "audio_file": os.path.abspath(audioSettings.audioFile),
+                "chapter_number": audioSettings.chapterNumber,
+                "loop_range": [startLine, endLine],
+                "clip_directories": account.clipDirectories,
+                "video_mode": videoSettings.videoMode.name,
+            }
+        )
+
+        if renderSettings.reuseVideoMap and additionalVideoSettings.videoMap is None:
+            cachedVideoMap = segmentCache.get_video_map(videoMapKey)
+
+            if cachedVideoMap is not None:
+                additionalVideoSettings = dataclasses.replace(
+                    additionalVideoSettings, videoMap=cachedVideoMap
+                )
+                PrintColored(
+                    Fore.CYAN, "Reusing the background clips of the last render."
+                )
+
+    try:
+        renderPlan = create_render_plan(
+            account=account,
+            audioSettings=audioSettings,
+            timeModifiers=timeModifiers,
+            videoSettings=videoSettings,
+            chapterCsvLines=chapterCsvLines,
+            loopRange=(startLine, endLine),
+            outputFile=outputFile,
+            additionalVideoSettings=additionalVideoSettings,
+            verse_text_text_clip=verse_text_text_clip,
+            verse_translation_text_clip=verse_translation_text_clip,
+            verse_number_text_clip=verse_number_text_clip,
+            reciter_name=reciter_name,
+            reciter_name_text_clip=reciter_name_text_clip,
+        )
+
+        write_video_map(renderPlan)
+
+        if videoMapKey:
+            segmentCache.put_video_map(videoMapKey, renderPlan.video_map())
+
+        if plan_only:
+            plan_output_file_path = outputFile.replace(".mp4", ".plan.json")
+            renderPlan.save(plan_output_file_path)
+            PrintColored(Fore.GREEN, f"Saved render plan to {plan_output_file_path}")
+
+            return renderPlan
+
+        render_video_plan(renderPlan, renderSettings)
+    finally:
+        # Stop every decoder that was opened for the video
+        close_video_readers()
+
+    return renderPlan
+
+
+def create_render_plan(
+    account: Account,
+    audioSettings: AudioSettings,
+    timeModifiers: TimeModifiers,
+    videoSettings: VideoSettings,
+    chapterCsvLines: list[list[str]],
+    loopRange: tuple[int, int],
+    outputFile: str,
+    additionalVideoSettings: AdditionalVideoSettings,
+    verse_text_text_clip: Optional[TextClipInfo] = None,
+    verse_translation_text_clip: Optional[TextClipInfo] = None,
+    verse_number_text_clip: Optional[TextClipInfo] = None,
+    reciter_name: Optional[str] = None,
+    reciter_name_text_clip: Optional[TextClipInfo] = None,
+) -> RenderPlan:
+    """
+    Decides the timings, background clips and text overlays of a video without
+    building any moviepy object.
+
+    Parameters
+    ----------
+    chapterCsvLines : list[list[str]]
+        The verse number, verse text, translation and timestamp of every line.
+    loopRange : tuple[int, int]
+        The first line and the line after the last line of the video.
+
+    Returns
+    -------
+    RenderPlan
+        The render plan.
+    """
+
+    startLine, endLine = loopRange
     videoWidth, videoHeight = videoSettings.videoDimensions
 
     videoStartTimestamp = chapterCsvLines[startLine - 1][3].strip().split(",")[0]
@@ -167,41 +317,52 @@ def create_video(
     videoEndTimestamp = chapterCsvLines[endLine - 1][3].strip().split(",")[0]
     videoEnd = OffsetTimestamp(videoEndTimestamp, timeModifiers.endTimeModifier)
 
-    # video_duration = GetTimeDifferenceSeconds(videoStart, videoEnd)
-
-    audio = mpy.AudioFileClip(audioSettings.audioFile).subclip(videoStart, videoEnd)
-
     # TODO: Unsure if it is better to have absolute or relative paths
     # if video_map:
     #     video_map = convert_video_map_paths_to_absolute_paths(video_map)
 
-    allBackgroundClips = GetRelativeMp4Paths(account.clipDirectories)
-    targetAspectRatio = videoWidth / videoHeight
-    textClips = []
-    usedBackgroundClips = []
-    videoClipEntries = []
-    videoMapOutput = {}
+    videoMap = {}
 
-    if additionalVideoSettings.videoMap:
-        additionalVideoSettings.videoMap = {
+    if isinstance(additionalVideoSettings.videoMap, dict):
+        videoMap = {
             int(key): value for key, value in additionalVideoSettings.videoMap.items()
         }
 
-    videoClipEntriesLock = Lock()
+    if not additionalVideoSettings.backgroundVideo:
+        clipIndex = get_clip_index(account.clipDirectories)
+        allBackgroundClips = clipIndex.paths()
 
-    loopRange = range(startLine, endLine)
+        # Draws each background clip at most once until the library runs out
+        backgroundClipSampler = BackgroundClipSampler(
+            allBackgroundClips,
+            allow_duplicates=videoSettings.allowDuplicateClips,
+        )
+        backgroundClipPlanner = BackgroundClipPlanner(
+            clip_index=clipIndex,
+            sampler=backgroundClipSampler,
+            clip_speed=videoSettings.clipSpeed,
+            minimum_clip_duration=videoSettings.minimumClipDuration,
+            video_width=videoWidth,
+            allow_mirrored_clips=videoSettings.allowMirroredClips,
+        )
+
+        # Keep clips of the video map from being drawn for other video clips
+        for videoMapBackgroundClips in videoMap.values():
+            for videoMapBackgroundClip in videoMapBackgroundClips:
+                if videoMapBackgroundClip and isinstance(videoMapBackgroundClip[0], str):
+                    backgroundClipSampler.mark_used(videoMapBackgroundClip[0])
+
+    segments = []
 
-    PrintColored(Fore.MAGENTA, f"Creating clips in range {startLine}-{endLine - 1}...")
+    PrintColored(Fore.MAGENTA, f"Planning clips in range {startLine}-{endLine - 1}...")
 
-    def CreateClip(line):
+    for line in range(startLine, endLine):
         videoClipIndex = line - startLine + 1
         chapterCsvLine = chapterCsvLines[line - 1]
 
         # TODO: A line should be able to exist without verse_translation
         verseNumber, verseText, verseTranslation, timestamp = chapterCsvLine
 
-        PrintColored(Fore.MAGENTA, f"Creating clip {videoClipIndex}...")
-
         nextLine = chapterCsvLines[line]
         nextTimestamp = nextLine[3]
 
@@ -229,213 +390,948 @@ def create_video(
         except IndexError:
             textDuration = maxVideoClipDuration
 
+        videoClipBackgroundClips = []
+
         if not additionalVideoSettings.backgroundVideo:
-            videoClipDuration = 0
-            videoClipBackgroundClips = []
+            if videoSettings.videoMode == VideoModes.VIDEO:
+                # Replay the video map and fit new background clips to whatever it does not cover
+                videoClipBackgroundClips = get_video_map_background_clips(
+                    videoMap.get(videoClipIndex, []),
+                    maxVideoClipDuration,
+                    videoSettings,
+                    backgroundClipPlanner,
+                )
+            else:
+                videoMapBackgroundClips = videoMap.get(videoClipIndex, [])
+
+                if videoMapBackgroundClips and is_valid_video_map_path(
+                    videoMapBackgroundClips[0]
+                ):
+                    backgroundClipPath = videoMapBackgroundClips[0][0]
+                else:
+                    videoMapBackgroundClips = []
+                    backgroundClipPath = backgroundClipSampler.draw()
+
+                backgroundClipMetadata = get_clip_metadata(backgroundClipPath)
+
+                maxHorizontalOffset = GetMaxHorizontalOffset(
+                    backgroundClipMetadata.width, videoWidth
+                )
+
+                if maxHorizontalOffset < 0:
+                    raise ValueError(
+                        f"Background clip {backgroundClipPath} width ({backgroundClipMetadata.width}) is less than video width ({videoWidth})"
+                    )
+
+                videoMapBackgroundClip = (
+                    videoMapBackgroundClips[0] if videoMapBackgroundClips else []
+                )
+
+                horizontalOffset = get_background_clip_horizontal_offset(
+                    videoMapBackgroundClip, maxHorizontalOffset
+                )
+
+                isMirrored = get_background_clip_mirrored(
+                    videoMapBackgroundClip,
+                    videoSettings.allowMirroredClips,
+                )
+
+                # The time offset of an image clip is the time of the frame used as the image
+                if (
+                    len(videoMapBackgroundClip) >= 2
+                    and isinstance(videoMapBackgroundClip[1], (float, int))
+                    and 0 <= videoMapBackgroundClip[1] < backgroundClipMetadata.duration
+                ):
+                    frameTime = videoMapBackgroundClip[1]
+                else:
+                    totalFrames = int(
+                        backgroundClipMetadata.fps * backgroundClipMetadata.duration
+                    )
+                    frameTime = round(
+                        random.randint(1, totalFrames) / backgroundClipMetadata.fps, 3
+                    )
+
+                videoClipBackgroundClips.append(
+                    [
+                        backgroundClipPath,
+                        frameTime,
+                        horizontalOffset,
+                        isMirrored,
+                    ]
+                )
+
+        overlays = []
+
+        overlayInfos = [
+            (
+                "verse_text",
+                verse_text_text_clip,
+                account.mode.value.verse_text_color,
+                account.verseTextFontFile,
+                verseText,
+            ),
+            (
+                "verse_translation",
+                verse_translation_text_clip,
+                account.mode.value.verse_translation_color,
+                account.verseTranslationFontFile,
+                verseTranslation,
+            ),
+        ]
+
+        # Add verse number text clip if it is a new verse
+        if verseNumber != "":
+            overlayInfos.append(
+                (
+                    "verse_number",
+                    verse_number_text_clip,
+                    account.mode.value.verse_number_color,
+                    account.verseNumberFontFile,
+                    verseNumber,
+                )
+            )
+
+        # Add reciter name text clip if it is the first clip
+        if line == startLine and reciter_name:
+            overlayInfos.append(
+                (
+                    "reciter_name",
+                    reciter_name_text_clip,
+                    account.mode.value.reciter_name_color,
+                    account.reciterNameFontFile,
+                    reciter_name,
+                )
+            )
+
+        # Text clips start with their video clip, or at the video clip's start time when using a single background video
+        segmentStart = GetTimeDifferenceSeconds(audioStart, videoStart)
+
+        for kind, textClipInfo, color, font, text in overlayInfos:
+            if textClipInfo:
+                overlays.append(
+                    OverlaySpec(
+                        kind=kind,
+                        text=text,
+                        color=color,
+                        font=font,
+                        font_size=textClipInfo.text_font_size,
+                        method=textClipInfo.text_method,
+                        background_color=textClipInfo.text_background_color,
+                        position=textClipInfo.text_position,
+                        size=textClipInfo.text_size,
+                        fade_duration=textClipInfo.text_fade_duration,
+                        duration=textDuration,
+                        start=segmentStart
+                        if additionalVideoSettings.backgroundVideo
+                        else 0.0,
+                    )
+                )
+
+        segments.append(
+            SegmentPlan(
+                index=videoClipIndex,
+                line=line,
+                audio_start=audioStart,
+                audio_end=audioEnd,
+                start=segmentStart,
+                duration=maxVideoClipDuration,
+                text_duration=textDuration,
+                backgrounds=videoClipBackgroundClips,
+                overlays=overlays,
+            )
+        )
+
+    if additionalVideoSettings.backgroundVideo:
+        backgroundVideo = BackgroundVideoPlan(
+            path=additionalVideoSettings.backgroundVideo,
+            start=videoStart,
+            horizontal_offset=additionalVideoSettings.backgroundVideoHorizontalOffset,
+            vertical_offset=additionalVideoSettings.backgroundVideoVerticalOffset,
+        )
+        fps = get_clip_metadata(additionalVideoSettings.backgroundVideo).fps
+    else:
+        backgroundVideo = None
+
+        if videoSettings.videoMode == VideoModes.IMAGE:
+            fps = 60
+        else:
+            # Concatenated clips are written at the highest frame rate of their background clips
+            fps = max(
+                (
+                    get_clip_metadata(backgroundClip[0]).fps
+                    for segment in segments
+                    for backgroundClip in segment.backgrounds
+                ),
+                default=None,
+            )
+
+    return RenderPlan(
+        output_file=outputFile,
+        audio_file=audioSettings.audioFile,
+        video_start=videoStart,
+        video_end=videoEnd,
+        video_dimensions=videoSettings.videoDimensions,
+        video_mode=videoSettings.videoMode.name,
+        clip_speed=videoSettings.clipSpeed,
+        fps=fps,
+        shadow_color=account.mode.value.shadow_color,
+        shadow_opacity=account.mode.value.shadow_opacity,
+        segments=segments,
+        background_video=backgroundVideo,
+    )
+
+
+def get_video_map_background_clips(
+    video_map_background_clips: list[list[str, float or int, int, str]],
+    video_clip_duration: float,
+    video_settings: VideoSettings,
+    background_clip_planner: BackgroundClipPlanner,
+) -> list[list[str, float or int, int, str]]:
+    """
+    Gets the background clips of a video clip from its video map entries.
+
+    Entries are used as long as their clip exists, is at least as wide as the
+    video and still fits the minimum clip duration rule, invalid offsets and mirrored values are
+    replaced by random ones and any duration the entries do not cover is
+    filled by the planner.
+
+    Parameters
+    ----------
+    video_map_background_clips : list[list[str, float or int, int, str]]
+        The video map entries of the video clip.
+    video_clip_duration : float
+        The duration of the video clip.
+    video_settings : VideoSettings
+        The video settings.
+    background_clip_planner : BackgroundClipPlanner
+        The planner used for the duration the entries do not cover.
+
+    Returns
+    -------
+    list[list[str, float or int, int, str]]
+        The background clips of the video clip.
+    """
+
+    background_clips = []
+    remaining_video_clip_duration = video_clip_duration
+
+    for video_map_background_clip in video_map_background_clips:
+        if remaining_video_clip_duration <= 1e-6:
+            break
+
+        if not is_valid_video_map_path(video_map_background_clip):
+            continue
+
+        background_clip_path = video_map_background_clip[0]
+        background_clip_duration = GetClipDuration(
+            background_clip_path, video_settings.clipSpeed
+        )
+
+        time_offset = get_background_clip_time_offset(
+            video_map_background_clip,
+            GetMaxTimeOffset(
+                background_clip_duration, video_settings.minimumClipDuration
+            ),
+        )
+        adjusted_background_clip_duration = min(
+            remaining_video_clip_duration, background_clip_duration - time_offset
+        )
+
+        # The timings may have changed since the video map was written
+        if not validate_background_clip_duration(
+            adjusted_background_clip_duration,
+            video_settings.minimumClipDuration,
+            remaining_video_clip_duration,
+        ):
+            break
+
+        max_horizontal_offset = GetMaxHorizontalOffset(
+            get_clip_metadata(background_clip_path).width,
+            background_clip_planner.video_width,
+        )
+
+        # Clips narrower than the video are never planned
+        if max_horizontal_offset < 0:
+            continue
+
+        background_clips.append(
+            [
+                background_clip_path,
+                time_offset,
+                get_background_clip_horizontal_offset(
+                    video_map_background_clip, max_horizontal_offset
+                ),
+                get_background_clip_mirrored(
+                    video_map_background_clip, video_settings.allowMirroredClips
+                ),
+            ]
+        )
+
+        remaining_video_clip_duration -= adjusted_background_clip_duration
+
+    if remaining_video_clip_duration > 1e-6:
+        background_clips.extend(
+            background_clip_planner.plan(remaining_video_clip_duration)
+        )
+
+    return background_clips
+
+
+def is_valid_video_map_path(
+    video_map_background_clip: list[str, float or int, int, str],
+) -> bool:
+    """
+    Checks if a video map entry refers to an existing clip.
+
+    Parameters
+    ----------
+    video_map_background_clip : list[str, float or int, int, str]
+        The video map entry.
+
+    Returns
+    -------
+    bool
+        True if the clip of the entry exists, False otherwise.
+    """
+
+    return (
+        len(video_map_background_clip) >= 1
+        and isinstance(video_map_background_clip[0], str)
+        and os.path.isfile(video_map_background_clip[0])
+    )
+
+
+def load_video_map(
+    json_file_path: str,
+) -> dict[str, list[list[str, float or int, int, str]]] or str:
+    """
+    Loads the video map written next to a video.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The path to the video map JSON file.
+
+    Returns
+    -------
+    dict[str, list[list[str, float or int, int, str]]] or str
+        The video map, or the background video path of single background video renders.
+    """
+
+    with open(json_file_path, "r", encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+def render_segment_file(
+    render_plan_data: dict,
+    segment_data: dict,
+    segment_file: str,
+    frame_count: int,
+    threads: Optional[int] = None,
+    render_settings: Optional[RenderSettings] = None,
+) -> str:
+    """
+    Encodes a single segment of a render plan, run in a worker process.
+
+    Parameters
+    ----------
+    render_plan_data : dict
+        The render plan, without its segments.
+    segment_data : dict
+        The segment to encode.
+    segment_file : str
+        The path of the segment file.
+    frame_count : int
+        The number of frames of the segment.
+    threads : Optional[int]
+        The number of encoder threads.
+    render_settings : Optional[RenderSettings]
+        The render settings, by default the defaults of RenderSettings.
+
+    Returns
+    -------
+    str
+        The path of the segment file.
+    """
+
+    render_plan = RenderPlan.from_dict(render_plan_data)
+    segment = SegmentPlan.from_dict(segment_data)
+    render_settings = render_settings or RenderSettings()
+
+    configure_overlay_cache(
+        render_settings.overlayCacheDirectory, render_settings.overlayCacheSizeLimit
+    )
+
+    if render_settings.backend == RenderBackends.FFMPEG:
+        with tempfile.TemporaryDirectory(
+            prefix=".overlays-", dir=os.path.dirname(segment_file) or "."
+        ) as overlayDirectory:
+            overlayImages = []
+
+            for overlayIndex, overlay in enumerate(segment.overlays):
+                overlayImage = os.path.join(overlayDirectory, f"{overlayIndex}.png")
+                save_overlay_image(overlay, overlayImage)
+                overlayImages.append((overlay, overlayImage))
+
+            ffmpeg_backend.render_segment(
+                render_plan,
+                segment,
+                overlayImages,
+                segment_file,
+                render_plan.fps or DEFAULT_SEGMENT_FPS,
+                frame_count,
+                threads=threads,
+            )
+
+        return segment_file
+
+    try:
+        write_clip_frames(
+            create_segment_clip(render_plan, segment, render_settings),
+            segment_file,
+            render_plan.fps or DEFAULT_SEGMENT_FPS,
+            frame_count,
+            threads=threads,
+        )
+    finally:
+        # Segments rarely share background clips, stop the decoders of the worker
+        close_video_readers()
+
+    return segment_file
+
+
+def render_video_plan_segments(
+    render_plan: RenderPlan, render_settings: RenderSettings
+) -> None:
+    """
+    Encodes every segment of a render plan to its own file in a process pool and
+    joins them without re-encoding.
+
+    With a segment cache, segments whose inputs did not change since an earlier
+    render are reused instead of encoded, and the least recently used segments
+    are removed once the video is joined when the cache is over its size limit.
+
+    Parameters
+    ----------
+    render_plan : RenderPlan
+        The render plan.
+    render_settings : RenderSettings
+        The render settings.
+    """
+
+    fps = render_plan.fps or DEFAULT_SEGMENT_FPS
+    segments = sorted(render_plan.segments, key=lambda segment: segment.index)
+    frame_ranges = get_segment_frame_ranges(
+        [(segment.start, segment.duration) for segment in segments], fps
+    )
+
+    render_plan_data = {**render_plan.to_dict(), "segments": []}
+    encoder_settings = {
+        **SEGMENT_ENCODER_SETTINGS,
+        "backend": render_settings.backend.name,
+        "decoderTransforms": render_settings.decoderTransforms,
+        "flattenOverlays": render_settings.flattenOverlays,
+    }
+
+    segment_cache = (
+        SegmentCache(
+            render_settings.segmentCacheDirectory, render_settings.segmentCacheSizeLimit
+        )
+        if render_settings.segmentCacheDirectory
+        else None
+    )
+
+    outputDirectory = os.path.dirname(render_plan.output_file) or "."
+
+    with tempfile.TemporaryDirectory(
+        prefix=".segments-", dir=outputDirectory
+    ) as segmentDirectory:
+        segment_files = {}
+        segment_tasks = []
+
+        for segment, (_, frame_count) in zip(segments, frame_ranges):
+            segment_data = segment.to_dict()
+
+            if segment_cache:
+                key = segment_cache.get_key(
+                    render_plan_data,
+                    segment_data,
+                    frame_count,
+                    encoder_settings,
+                )
+                segment_files[segment.index] = segment_cache.get(key)
+
+                if segment_files[segment.index]:
+                    continue
+
+                segment_file = segment_cache.get_temporary_path(key)
+            else:
+                key = None
+                segment_file = os.path.join(
+                    segmentDirectory, f"{segment.index:04d}.mp4"
+                )
+
+            segment_tasks.append((segment, segment_data, segment_file, frame_count, key))
+
+        if segment_cache:
+            PrintColored(
+                Fore.CYAN,
+                f"Reusing {len(segments) - len(segment_tasks)} cached clip(s), rendering {len(segment_tasks)}...",
+            )
+
+        if segment_tasks:
+            workers = min(render_settings.workers or os.cpu_count() or 1, len(segment_tasks))
+            threads = max((os.cpu_count() or 1) // workers, 1)
+
+            PrintColored(
+                Fore.MAGENTA,
+                f"Rendering {len(segment_tasks)} clips in {workers} processes...",
+            )
+
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(
+                        render_segment_file,
+                        render_plan_data,
+                        segment_data,
+                        segment_file,
+                        frame_count,
+                        threads,
+                        render_settings,
+                    ): (segment, key)
+                    for segment, segment_data, segment_file, frame_count, key in segment_tasks
+                }
+
+                for future in concurrent.futures.as_completed(futures):
+                    segment, key = futures[future]
+
+                    try:
+                        segment_file = future.result()
+                    except Exception as error:
+                        raise Exception(
+                            f"Failed to create clip {segment.index}: {error}"
+                        ) from error
+
+                    if segment_cache:
+                        segment_file = segment_cache.put(key, segment_file)
+
+                    segment_files[segment.index] = segment_file
+
+                    PrintColored(Fore.GREEN, f"Created clip {segment.index}")
+
+        PrintColored(Fore.GREEN, "Creating final video...")
+
+        concatenate_segment_files(
+            [segment_files[segment.index] for segment in segments],
+            render_plan.output_file,
+            audio_file=render_plan.audio_file,
+            audio_start=convert_timestamp_to_seconds(render_plan.video_start),
+            audio_end=convert_timestamp_to_seconds(render_plan.video_end),
+        )
+
+    if segment_cache:
+        segment_cache.trim()
+
+    PrintColored(Fore.GREEN, "Created final video")
+
+
+def render_video_plan_stills(render_plan: RenderPlan) -> None:
+    """
+    Encodes an IMAGE mode render plan from its stills.
+
+    The background of every segment is a single frame, so only the frames
+    where a text fades differ from their neighbours. Every run of identical
+    frames is composited once and the stills are encoded together with the
+    audio in a single ffmpeg pass.
+
+    Parameters
+    ----------
+    render_plan : RenderPlan
+        The render plan.
+    """
+
+    fps = render_plan.fps or DEFAULT_SEGMENT_FPS
+    segments = sorted(render_plan.segments, key=lambda segment: segment.index)
+    frame_ranges = get_segment_frame_ranges(
+        [(segment.start, segment.duration) for segment in segments], fps
+    )
+
+    outputDirectory = os.path.dirname(render_plan.output_file) or "."
+
+    with tempfile.TemporaryDirectory(
+        prefix=".stills-", dir=outputDirectory
+    ) as stillDirectory:
+        images = []
+
+        for segment, (_, frame_count) in zip(segments, frame_ranges):
+            PrintColored(Fore.MAGENTA, f"Creating clip {segment.index}...")
+
+            backgroundClipPath, frameTime = segment.backgrounds[0][:2]
+            PrintColored(
+                Fore.CYAN, f"{segment.index} Using background clip: {backgroundClipPath}"
+            )
+
+            images += write_still_frames(
+                stillDirectory,
+                read_transformed_frame(
+                    backgroundClipPath, frameTime, render_plan.video_dimensions
+                ),
+                create_overlay_compositor(render_plan, segment.overlays),
+                frame_count,
+                fps,
+                segment.duration,
+                first_image=len(images),
+            )
+
+            PrintColored(Fore.GREEN, f"Created clip {segment.index}")
+
+        PrintColored(Fore.GREEN, f"Creating final video from {len(images)} stills...")
+
+        encode_still_frames(
+            images,
+            render_plan.output_file,
+            fps,
+            audio_file=render_plan.audio_file,
+            audio_start=convert_timestamp_to_seconds(render_plan.video_start),
+            audio_end=convert_timestamp_to_seconds(render_plan.video_end),
+        )
+
+    PrintColored(Fore.GREEN, "Created final video")
+
+
+def write_video_map(render_plan: RenderPlan) -> None:
+    """
+    Writes the video map of a render plan next to its output video.
+
+    Parameters
+    ----------
+    render_plan : RenderPlan
+        The render plan.
+    """
+
+    json_output_file_path = render_plan.output_file.replace(".mp4", ".json")
+
+    formatter = Formatter()
+    formatter.use_tab_to_indent = True
+    formatter.nested_bracket_padding = False
+    formatter.max_inline_length = 300
+    formatter.max_inline_complexity = 1
+    formatter.json_eol_style = EolStyle.LF
+    formatter.dont_justify_numbers = True
+
+    formatter.dump(
+        render_plan.video_map(),
+        output_file=json_output_file_path,
+        newline_at_eof=True,
+    )
+
+
+def create_overlay_clip(overlay: OverlaySpec) -> mpy.ImageClip:
+    """
+    Creates the text clip of an overlay of a render plan.
+
+    Parameters
+    ----------
+    overlay : OverlaySpec
+        The overlay.
+
+    Returns
+    -------
+    mpy.ImageClip
+        The text clip.
+    """
+
+    text_clip = create_text_clip(
+        background_color=overlay.background_color,
+        color=overlay.color,
+        duration=overlay.duration,
+        fade_duration=overlay.fade_duration,
+        font=overlay.font,
+        fontsize=overlay.font_size,
+        method=overlay.method,
+        position=overlay.position,
+        size=overlay.size,
+        text=overlay.text,
+    )
+
+    return text_clip.set_start(overlay.start) if overlay.start else text_clip
+
+
+def prerender_overlays(render_plan: RenderPlan) -> None:
+    """
+    Renders the text of every overlay of a render plan into the overlay cache
+    before compositing starts, so the clips only load cached images.
+
+    Parameters
+    ----------
+    render_plan : RenderPlan
+        The render plan.
+    """
+
+    renderedTexts = prerender_text_images(
+        [
+            (
+                overlay.text,
+                overlay.font,
+                overlay.font_size,
+                overlay.color,
+                overlay.background_color,
+                overlay.method,
+                overlay.size,
+            )
+            for segment in render_plan.segments
+            for overlay in segment.overlays
+        ]
+    )
+
+    if renderedTexts:
+        PrintColored(Fore.CYAN, f"Rendered {renderedTexts} text overlay(s)")
+
+
+def save_overlay_image(overlay: OverlaySpec, path: str) -> None:
+    """
+    Saves the text of an overlay of a render plan as an RGBA image, without
+    its position and fades, for the ffmpeg backend.
+
+    Parameters
+    ----------
+    overlay : OverlaySpec
+        The overlay.
+    path : str
+        The path of the PNG image.
+    """
+
+    save_text_image(
+        get_text_image(
+            text=overlay.text,
+            font=overlay.font,
+            font_size=overlay.font_size,
+            color=overlay.color,
+            background_color=overlay.background_color,
+            method=overlay.method,
+            size=overlay.size,
+        ),
+        path,
+    )
+
+
+def create_segment_clip(
+    render_plan: RenderPlan,
+    segment: SegmentPlan,
+    render_settings: Optional[RenderSettings] = None,
+) -> mpy.VideoClip:
+    """
+    Builds the video clip of a segment of a render plan.
+
+    Parameters
+    ----------
+    render_plan : RenderPlan
+        The render plan.
+    segment : SegmentPlan
+        The segment.
+    render_settings : Optional[RenderSettings]
+        The render settings, by default the defaults of RenderSettings.
+
+    Returns
+    -------
+    mpy.VideoClip
+        The video clip of the segment, without audio.
+    """
+
+    render_settings = render_settings or RenderSettings()
+    videoWidth, videoHeight = render_plan.video_dimensions
+
+    if render_settings.flattenOverlays:
+        backgroundClip = create_background_clip(
+            background_clips_paths=segment.backgrounds,
+            background_clips_speed=render_plan.clip_speed,
+            final_clip_duration=segment.duration,
+            target_aspect_ratio=videoWidth / videoHeight,
+            video_dimensions=render_plan.video_dimensions,
+            video_mode=VideoModes[render_plan.video_mode],
+            decoder_transforms=render_settings.decoderTransforms,
+            fps=render_plan.fps or DEFAULT_SEGMENT_FPS,
+        )
+
+        # The compositor draws on frames of the video size
+        if tuple(backgroundClip.size) != tuple(render_plan.video_dimensions):
+            backgroundClip = backgroundClip.resize(render_plan.video_dimensions)
+
+        compositor = create_overlay_compositor(render_plan, segment.overlays)
+
+        return backgroundClip.fl(
+            lambda get_frame, t: compositor.composite(get_frame(t), t)
+        )
+
+    textClips = [create_overlay_clip(overlay) for overlay in segment.overlays]
+
+    # Create shadow clip to put overlay on the video clip
+    shadow_clip = create_shadow_clip(
+        size=render_plan.video_dimensions,
+        color=render_plan.shadow_color,
+        duration=segment.duration,
+        opacity=render_plan.shadow_opacity,
+    )
+
+    return CreateVideoClip(
+        background_clips_paths=segment.backgrounds,
+        background_clips_speed=render_plan.clip_speed,
+        final_clip_duration=segment.duration,
+        target_aspect_ratio=videoWidth / videoHeight,
+        text_clips=textClips,
+        video_dimensions=render_plan.video_dimensions,
+        video_mode=VideoModes[render_plan.video_mode],
+        shadow_clip=shadow_clip,
+        text_duration=segment.text_duration,
+        decoder_transforms=render_settings.decoderTransforms,
+        fps=render_plan.fps or DEFAULT_SEGMENT_FPS,
+    )
+
+
+def create_overlay_compositor(
+    render_plan: RenderPlan, overlays: list[OverlaySpec]
+) -> SegmentCompositor:
+    """
+    Flattens the shadow and text overlays of a segment, or of a whole single
+    background video, of a render plan.
+
+    Parameters
+    ----------
+    render_plan : RenderPlan
+        The render plan.
+    overlays : list[OverlaySpec]
+        The overlays.
+
+    Returns
+    -------
+    SegmentCompositor
+        The compositor of the overlays.
+    """
+
+    layers = []
+
+    for overlay in overlays:
+        image = get_text_image(
+            text=overlay.text,
+            font=overlay.font,
+            font_size=overlay.font_size,
+            color=overlay.color,
+            background_color=overlay.background_color,
+            method=overlay.method,
+            size=overlay.size,
+        )
+        x, y = get_overlay_offset(
+            overlay.position,
+            (image.shape[1], image.shape[0]),
+            render_plan.video_dimensions,
+        )
+        layers.append(
+            OverlayLayer(
+                image=image,
+                x=x,
+                y=y,
+                start=overlay.start,
+                duration=overlay.duration,
+                fade_duration=overlay.fade_duration,
+            )
+        )
+
+    return SegmentCompositor(
+        render_plan.video_dimensions,
+        render_plan.shadow_color,
+        render_plan.shadow_opacity,
+        layers,
+        fps=render_plan.fps or DEFAULT_SEGMENT_FPS,
+    )
+
+
+def render_video_plan(
+    render_plan: RenderPlan, render_settings: Optional[RenderSettings] = None
+) -> None:
+    """
+    Builds and writes the video described by a render plan.
 
-            if videoSettings.videoMode == VideoModes.VIDEO:
-                while videoClipDuration < maxVideoClipDuration:
-                    # Get new background clips until the total duration of the background clips is long enough for the video clip
-                    backgroundClipPath = GetRandomChoice(allBackgroundClips)
-
-                    # if len(usedBackgroundClips) == len(allBackgroundClips):
-                    #     allowDuplicateBackgroundClips = True
-
-                    if backgroundClipPath not in usedBackgroundClips:
-                        clipDuration = GetClipDuration(
-                            backgroundClipPath,
-                            videoSettings.clipSpeed,
-                        )
-                        maxTimeOffset = GetMaxTimeOffset(
-                            clipDuration,
-                            videoSettings.minimumClipDuration,
-                        )
-                        timeOffset = get_random_time_offset(maxTimeOffset)
-                        offsetClipDuration = clipDuration - timeOffset
-
-                        # If the background clip remaining duration is longer than the video clip duration, set the adjusted background clip duration to the video clip duration
-                        adjustedClipDuration = min(
-                            maxVideoClipDuration, offsetClipDuration
-                        )
-
-                        remainingVideoClipDuration = (
-                            maxVideoClipDuration - videoClipDuration
-                        )
-
-                        if (
-                            remainingVideoClipDuration - adjustedClipDuration
-                            >= videoSettings.minimumClipDuration
-                            or remainingVideoClipDuration - adjustedClipDuration <= 0
-                        ):
-                            backgroundClip = mpy.VideoFileClip(backgroundClipPath)
-
-                            maxHorizontalOffset = GetMaxHorizontalOffset(
-                                backgroundClip.w, videoWidth
-                            )
-                            # if maxHorizontalOffset < 0:
-                            #     raise ValueError(
-                            #         f"Verse {videoMapIndex} Background clip {x + 1} width ({backgroundClip.w}) is less than video width ({video_width})"
-                            #     )
-
-                            horizontalOffset = GetHorizontalOffset(maxHorizontalOffset)
-
-                            if videoSettings.allowMirroredClips:
-                                isMirrored = str(random.choice([True, False]))
-                            else:
-                                isMirrored = "False"
-
-                            videoClipBackgroundClips.append(
-                                [
-                                    backgroundClipPath,
-                                    timeOffset,
-                                    horizontalOffset,
-                                    isMirrored,
-                                ]
-                            )
-                            usedBackgroundClips.append(backgroundClipPath)
-
-                            videoClipDuration += adjustedClipDuration
-
-                videoMapOutput[videoClipIndex] = videoClipBackgroundClips
-            else:
-                backgroundClipPath = GetRandomChoice(allBackgroundClips)
-                backgroundClip = mpy.VideoFileClip(backgroundClipPath)
-                clipDuration = GetClipDuration(
-                    backgroundClipPath, videoSettings.clipSpeed
-                )
+    Parameters
+    ----------
+    render_plan : RenderPlan
+        The render plan.
+    render_settings : Optional[RenderSettings]
+        How the video is encoded, by default a single moviepy render.
+    """
 
-                maxTimeOffset = GetMaxTimeOffset(
-                    clipDuration,
-                    videoSettings.minimumClipDuration,
-                )
-                timeOffset = get_random_time_offset(maxTimeOffset)
+    render_settings = render_settings or RenderSettings()
 
-                maxHorizontalOffset = GetMaxHorizontalOffset(
-                    backgroundClip.w, videoWidth
-                )
+    configure_overlay_cache(
+        render_settings.overlayCacheDirectory, render_settings.overlayCacheSizeLimit
+    )
+    prerender_overlays(render_plan)
 
-                if maxHorizontalOffset < 0:
-                    raise ValueError(
-                        f"Background clip {backgroundClipPath} width ({backgroundClip.w}) is less than video width ({videoWidth})"
-                    )
+    if (
+        render_settings.stillImages
+        and VideoModes[render_plan.video_mode] == VideoModes.IMAGE
+        and not render_plan.background_video
+    ):
+        render_video_plan_stills(render_plan)
 
-                horizontalOffset = GetHorizontalOffset(maxHorizontalOffset)
+        return
 
-                isMirrored = get_background_clip_mirrored(
-                    backgroundClipPath,
-                    videoSettings.allowMirroredClips,
-                )
+    if (
+        render_settings.parallelSegments
+        or render_settings.segmentCacheDirectory
+        or render_settings.backend != RenderBackends.MOVIEPY
+    ):
+        if not render_plan.background_video:
+            render_video_plan_segments(render_plan, render_settings)
 
-                videoClipBackgroundClips.append(
-                    [
-                        backgroundClipPath,
-                        timeOffset,
-                        horizontalOffset,
-                        isMirrored,
-                    ]
-                )
+            return
 
-        # Append text clips
-        textClips = []
+        PrintColored(
+            Fore.YELLOW,
+            "A single background video can not be rendered in segments, rendering it as a whole.",
+        )
 
-        if verse_text_text_clip:
-            verse_text_color = account.mode.value.verse_text_color
-            verse_text_clip = verse_text_text_clip.create_text_clip(
-                color=verse_text_color,
-                duration=textDuration,
-                font=account.verseTextFontFile,
-                text=verseText,
-            )
-            textClips.append(verse_text_clip)
-
-        if verse_translation_text_clip:
-            verse_translation_color = account.mode.value.verse_translation_color
-            verse_translation_clip = verse_translation_text_clip.create_text_clip(
-                color=verse_translation_color,
-                duration=textDuration,
-                font=account.verseTranslationFontFile,
-                text=verseTranslation,
-            )
-            textClips.append(verse_translation_clip)
-
-        # Append verse number text clip if it is a new verse
-        if verse_number_text_clip and verseNumber != "":
-            verse_number_color = account.mode.value.verse_number_color
-            verse_number_clip = verse_number_text_clip.create_text_clip(
-                color=verse_number_color,
-                duration=textDuration,
-                font=account.verseNumberFontFile,
-                text=verseNumber,
-            )
-            textClips.append(verse_number_clip)
-
-        # Append reciter name text clip if it is the first clip
-        if line == startLine and reciter_name and reciter_name_text_clip:
-            reciter_name_color = account.mode.value.reciter_name_color
-            reciter_name_clip = reciter_name_text_clip.create_text_clip(
-                color=reciter_name_color,
-                duration=textDuration,
-                font=account.reciterNameFontFile,
-                text=reciter_name,
-            )
-            textClips.append(reciter_name_clip)
+    videoMode = VideoModes[render_plan.video_mode]
 
-        if not additionalVideoSettings.backgroundVideo:
-            # Create shadow clip to put overlay on the video clip
-            shadow_color = account.mode.value.shadow_color
-            shadow_opacity = account.mode.value.shadow_opacity
-            shadow_clip = create_shadow_clip(
-                size=videoSettings.videoDimensions,
-                color=shadow_color,
-                duration=maxVideoClipDuration,
-                opacity=shadow_opacity,
-            )
+    audio = mpy.AudioFileClip(render_plan.audio_file).subclip(
+        render_plan.video_start, render_plan.video_end
+    )
 
-            PrintColored(Fore.CYAN, f"{videoClipIndex} Using background clip(s):")
+    videoClipEntries = []
+    videoClipEntriesLock = Lock()
 
-            for backgroundClipPath in videoClipBackgroundClips:
-                PrintColored(Fore.CYAN, f"- {backgroundClipPath[0]}")
+    def CreateClip(segment: SegmentPlan):
+        PrintColored(Fore.MAGENTA, f"Creating clip {segment.index}...")
 
+        if render_plan.background_video and render_settings.flattenOverlays:
+            # The overlays are composited together with the background video
+            videoClipEntry = (segment.index, [])
+        elif render_plan.background_video:
             videoClipEntry = (
-                videoClipIndex,
-                CreateVideoClip(
-                    background_clips_paths=videoClipBackgroundClips,
-                    background_clips_speed=videoSettings.clipSpeed,
-                    final_clip_duration=maxVideoClipDuration,
-                    target_aspect_ratio=targetAspectRatio,
-                    text_clips=textClips,
-                    video_dimensions=videoSettings.videoDimensions,
-                    video_mode=videoSettings.videoMode,
-                    shadow_clip=shadow_clip,
-                    text_duration=textDuration,
-                ),
+                segment.index,
+                [create_overlay_clip(overlay) for overlay in segment.overlays],
             )
-
-            # Use lock when appending to the shared list
-            with videoClipEntriesLock:
-                videoClipEntries.append(videoClipEntry)
-
-            PrintColored(Fore.GREEN, f"Created clip {videoClipIndex}")
         else:
-            # Set text clip start times if using a single background video
-            text_start_time = GetTimeDifferenceSeconds(audioStart, videoStart)
+            PrintColored(Fore.CYAN, f"{segment.index} Using background clip(s):")
 
-            textClips[0] = textClips[0].set_start(text_start_time)
-            textClips[1] = textClips[1].set_start(text_start_time)
+            for backgroundClipPath in segment.backgrounds:
+                PrintColored(Fore.CYAN, f"- {backgroundClipPath[0]}")
 
-            # Append verse number text clip
-            if verseNumber != "":
-                textClips[2] = textClips[2].set_start(text_start_time)
+            videoClipEntry = (
+                segment.index,
+                create_segment_clip(render_plan, segment, render_settings),
+            )
 
-            # Append reciter name text clip if it is the first clip
-            if line == startLine and reciter_name:
-                textClips[-1] = textClips[-1].set_start(text_start_time)
+        # Use lock when appending to the shared list
+        with videoClipEntriesLock:
+            videoClipEntries.append(videoClipEntry)
 
-            textClips.extend(textClips)
+        PrintColored(Fore.GREEN, f"Created clip {segment.index}")
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=7) as executor:
         # Submit tasks to the executor
-        futures = [executor.submit(CreateClip, line) for line in loopRange]
+        futures = [
+            executor.submit(CreateClip, segment) for segment in render_plan.segments
+        ]
 
         for future in concurrent.futures.as_completed(
             futures
@@ -450,103 +1346,89 @@ def create_video(
     videoClipEntries = sorted(videoClipEntries, key=lambda clip: clip[0])
     videoClips = [videoClipEntry[1] for videoClipEntry in videoClipEntries]
 
-    if not additionalVideoSettings.backgroundVideo:
+    if not render_plan.background_video:
         final_video = mpy.concatenate_videoclips(
             clips=videoClips, method="chain"
         ).set_audio(audio)
     else:
-        background_clip = mpy.VideoFileClip(
-            additionalVideoSettings.backgroundVideo
-        ).subclip(videoStart)
-
-        background_clip_width, background_clip_height = background_clip.size
-        current_aspect_ratio = background_clip_width / background_clip_height
+        textClips = [textClip for textClips in videoClips for textClip in textClips]
 
-        if current_aspect_ratio > targetAspectRatio:
-            new_width = int(background_clip_height * targetAspectRatio)
+        if render_settings.backgroundVideoMezzanine:
+            PrintColored(Fore.CYAN, "Preparing background video...")
 
-            if not additionalVideoSettings.backgroundVideoHorizontalOffset:
-                background_video_horizontal_offset = (
-                    background_clip_width - new_width
-                ) // 2
-            else:
-                background_video_horizontal_offset = (
-                    additionalVideoSettings.backgroundVideoHorizontalOffset
+            # The mezzanine is already cropped and scaled to the video size
+            background_clip = (
+                get_video_reader_pool()
+                .get_clip(
+                    get_background_video_mezzanine(
+                        render_plan.background_video.path,
+                        render_plan.video_dimensions,
+                        render_plan.background_video.horizontal_offset,
+                        render_plan.background_video.vertical_offset,
+                    )
                 )
-
-            background_clip = background_clip.crop(
-                x1=background_video_horizontal_offset,
-                x2=background_video_horizontal_offset + new_width,
-            ).resize(videoSettings.videoDimensions)
+                .subclip(render_plan.background_video.start)
+            )
         else:
-            new_height = int(background_clip_width / targetAspectRatio)
-
-            if not additionalVideoSettings.backgroundVideoVerticalOffset:
-                background_video_vertical_offset = (
-                    background_clip_height - new_height
-                ) // 2
-            else:
-                background_video_vertical_offset = (
-                    additionalVideoSettings.backgroundVideoVerticalOffset
-                )
+            background_clip = (
+                get_video_reader_pool()
+                .get_clip(render_plan.background_video.path)
+                .subclip(render_plan.background_video.start)
+            )
 
+            x, y, width, height = get_background_video_crop(
+                background_clip.size,
+                render_plan.video_dimensions,
+                render_plan.background_video.horizontal_offset,
+                render_plan.background_video.vertical_offset,
+            )
             background_clip = background_clip.crop(
-                y1=background_video_vertical_offset,
-                y2=background_video_vertical_offset + new_height,
-            ).resize(videoSettings.videoDimensions)
-
-        shadow_clip = create_shadow_clip(
-            color=account.mode.value.shadow_color,
-            duration=background_clip.duration,
-            opacity=account.mode.value.shadow_opacity,
-            size=videoSettings.videoDimensions,
-        )
-
-        video = mpy.CompositeVideoClip([background_clip, shadow_clip])
-        final_video = mpy.CompositeVideoClip(
-            [video, *textClips], use_bgclip=True
-        ).set_audio(audio)
+                x1=x, y1=y, x2=x + width, y2=y + height
+            ).resize(render_plan.video_dimensions)
+
+        if render_settings.flattenOverlays:
+            compositor = create_overlay_compositor(
+                render_plan,
+                [
+                    overlay
+                    for segment in render_plan.segments
+                    for overlay in segment.overlays
+                ],
+            )
+            final_video = background_clip.fl(
+                lambda get_frame, t: compositor.composite(get_frame(t), t)
+            ).set_audio(audio)
+        else:
+            shadow_clip = create_shadow_clip(
+                color=render_plan.shadow_color,
+                duration=background_clip.duration,
+                opacity=render_plan.shadow_opacity,
+                size=render_plan.video_dimensions,
+            )
 
-        videoMapOutput = additionalVideoSettings.backgroundVideo
+            video = mpy.CompositeVideoClip([background_clip, shadow_clip])
+            final_video = mpy.CompositeVideoClip(
+                [video, *textClips], use_bgclip=True
+            ).set_audio(audio)
 
     PrintColored(Fore.GREEN, "Creating final video...")
 
-    json_output_file_path = outputFile.replace(".mp4", ".json")
-
-    formatter = Formatter()
-    formatter.use_tab_to_indent = True
-    formatter.nested_bracket_padding = False
-    formatter.max_inline_length = 300
-    formatter.max_inline_complexity = 1
-    formatter.json_eol_style = EolStyle.LF
-    formatter.dont_justify_numbers = True
-
-    videoMapOutput = {
-        key: videoMapOutput[key] for key in sorted(videoMapOutput.keys(), key=int)
-    }
-
-    formatter.dump(
-        videoMapOutput,
-        output_file=json_output_file_path,
-        newline_at_eof=True,
-    )
-
     try:
-        if additionalVideoSettings.backgroundVideo:
+        if render_plan.background_video:
             final_video.write_videofile(
-                filename=outputFile,
-                fps=video.fps,
+                filename=render_plan.output_file,
+                fps=render_plan.fps,
             )
-        elif videoSettings.videoMode == VideoModes.VIDEO:
+        elif videoMode == VideoModes.VIDEO:
             final_video.write_videofile(
                 codec="libx264",
-                filename=outputFile,
+                filename=render_plan.output_file,
             )
-        elif videoSettings.videoMode == VideoModes.IMAGE:
+        elif videoMode == VideoModes.IMAGE:
             final_video.write_videofile(
                 codec="libx264",
-                filename=outputFile,
-                fps=60,
+                filename=render_plan.output_file,
+                fps=render_plan.fps,
             )
 
         PrintColored(Fore.GREEN, "Created final video")
@@ -580,107 +1462,68 @@ def adjust_timestamps(input_file, output_file, seconds_to_add):
         print(f"An error occurred: {e}")
 
 
-def CreateCsvFile(path: str, columnNames: list[str]) -> bool:
-    """
-    Creates a CSV file using the given column names.
-    """
-
-    with open(path, "w", encoding="utf-8") as file:
-        dictWriter = csv.DictWriter(file, fieldnames=columnNames)
-
-        try:
-            dictWriter.writeheader()
-
-            return True
-        except Exception:
-            return False
-
-
 def AddVerses(
-    csvFilePath: str,
+    chapterSheet: ChapterSheet,
     chapterNumber: int,
     verseRange: tuple[int, int],
     verseNumberColumnName: str,
     verseTextColumnName: str,
 ) -> bool:
     """
-    Adds verses to the CSV file.
+    Adds verses to the chapter sheet.
     """
 
     try:
-        with open(csvFilePath, "r", encoding="utf-8") as file:
-            dictReader = csv.DictReader(file)
-
-            fieldNames = dictReader.fieldnames
-            verseNumberColumnIndex = fieldNames.index(verseNumberColumnName)
-            verseTextColumnIndex = fieldNames.index(verseTextColumnName)
-
-            rows = []
-            startVerse, endVerse = verseRange
-            verseTexts = GetChapterText(chapterNumber)[startVerse - 1 : endVerse]
-            for index, verseText in enumerate(verseTexts):
-                verseNumber = f"{chapterNumber}:{startVerse + index}"
-                if verseText is not None:
-                    rows.append(
-                        {
-                            fieldNames[verseNumberColumnIndex]: verseNumber,
-                            fieldNames[verseTextColumnIndex]: verseText,
-                        }
-                    )
+        rows = []
+        startVerse, endVerse = verseRange
+        verseTexts = GetChapterText(chapterNumber)[startVerse - 1 : endVerse]
+        for index, verseText in enumerate(verseTexts):
+            verseNumber = f"{chapterNumber}:{startVerse + index}"
+            if verseText is not None:
+                rows.append(
+                    {
+                        verseNumberColumnName: verseNumber,
+                        verseTextColumnName: verseText,
+                    }
+                )
 
-        with open(csvFilePath, "w", encoding="utf-8") as file:
-            dictWriter = csv.DictWriter(file, fieldnames=fieldNames)
-            dictWriter.writeheader()
-            dictWriter.writerows(rows)
+        chapterSheet.rows = rows
+        chapterSheet.remove_empty_rows()
 
-        if RemoveEmptyRows(csvFilePath):
-            return True
+        return True
     except Exception:
         return False
 
 
 def AddTranslations(
-    csv_file_path: str,
+    chapter_sheet: ChapterSheet,
     language: Languages,
     chapterNumber: int,
     verse_range: tuple[int, int],
     timestamp_column_name: str,
 ) -> bool:
     """
-    Appends the verse translations of a chapter from the Qur'an to a CSV file
+    Adds the verse translations of a chapter from the Qur'an to the chapter sheet
     """
 
     try:
-        with open(csv_file_path, "r", encoding="utf-8") as csv_file:
-            dict_reader = csv.DictReader(csv_file)
-
-            field_names = dict_reader.fieldnames
-            if language.value.abbreviation not in field_names:
-                if timestamp_column_name in field_names:
-                    # Insert the translation column before the timestamp column
-                    timestamp_column_index = field_names.index(timestamp_column_name)
-                    field_names.insert(
-                        timestamp_column_index, language.value.abbreviation
-                    )
-                else:
-                    # Append the translation column to the end
-                    field_names.append(language.value.abbreviation)
-
-                rows = list(dict_reader)
-                start_verse, end_verse = verse_range
-                verse_translations = GetChapterTranslation(chapterNumber, language)[
-                    start_verse - 1 : end_verse
-                ]
-                for index, translation in enumerate(verse_translations):
-                    rows[index][language.value.abbreviation] = translation
-
-                with open(csv_file_path, "w", encoding="utf-8") as csv_file:
-                    dict_writer = csv.DictWriter(csv_file, fieldnames=field_names)
-                    dict_writer.writeheader()
-                    dict_writer.writerows(rows)
-
-        if RemoveEmptyRows(csv_file_path):
-            return True
+        if language.value.abbreviation not in chapter_sheet.field_names:
+            # Insert the translation column before the timestamp column, or append it to the end
+            chapter_sheet.add_column(
+                language.value.abbreviation, before=timestamp_column_name
+            )
+
+            rows = chapter_sheet.remove_empty_rows()
+            start_verse, end_verse = verse_range
+            verse_translations = GetChapterTranslation(chapterNumber, language)[
+                start_verse - 1 : end_verse
+            ]
+            for index, translation in enumerate(verse_translations):
+                rows[index][language.value.abbreviation] = translation
+
+        chapter_sheet.remove_empty_rows()
+
+        return True
     except Exception:
         return False
 
@@ -704,49 +1547,18 @@ def RemoveEmptyRows(csvFilePath: str) -> bool:
         return False
 
 
-def SelectColumnsFromCsvFile(
-    csv_file_path: str, columns_to_select: list[str]
-) -> list[list[str]]:
-    """
-    Selects columns from a CSV file.
-
-    Parameters
-    ----------
-    csv_file_path : str
-        The path of the CSV file to select the columns from.
-    columns_to_select : list[str]
-        The names of the columns to select.
-
-    Returns
-    -------
-    list[list[str]]
-        A list of lists containing the selected columns.
-    """
-
-    with open(csv_file_path, "r", encoding="utf-8") as csv_file:
-        csv_dict_reader = csv.DictReader(csv_file)
-
-        selected_data = []
-
-        for row in csv_dict_reader:
-            selected_row = [row[column] for column in columns_to_select]
-            selected_data.append(selected_row)
-
-    return selected_data
-
-
 def UpdateCsvFileTimestamps(
-    chapter_csv_file_path: str,
+    chapter_sheet: ChapterSheet,
     timestamps_csv_file_path: str,
     timestamp_column_name: str,
 ) -> bool:
     """
-    Updates the timestamps of a CSV file containing the verses of a chapter from the Qur'an.
+    Updates the timestamps of the chapter sheet containing the verses of a chapter from the Qur'an.
 
     Parameters
     ----------
-    chapter_csv_file_path : str
-        The path of the CSV file to update the timestamps of.
+    chapter_sheet : ChapterSheet
+        The chapter sheet to update the timestamps of.
     timestamps_csv_file_path : str
         The path of the CSV file containing the timestamps.
     timestamp_column_name : str
@@ -782,44 +1594,31 @@ def UpdateCsvFileTimestamps(
             sorted_nested_timestamps, key=convert_timestamp_to_seconds
         )
 
-        with open(chapter_csv_file_path, "r", encoding="utf-8") as chapter_csv_file:
-            csv_dict_reader = csv.DictReader(chapter_csv_file)
-            field_names = csv_dict_reader.fieldnames
+    chapter_sheet.add_column(timestamp_column_name)
 
-            if timestamp_column_name not in field_names:
-                field_names.append(timestamp_column_name)
+    data = chapter_sheet.remove_empty_rows()
 
-            data = list(csv_dict_reader)
-
-            while len(data) < len(sorted_timestamps):
-                try:
-                    data.append(
-                        {timestamp_column_name: sorted_timestamps[len(data)].strip()}
-                    )
-                except AttributeError:
-                    data.append({timestamp_column_name: sorted_timestamps[len(data)]})
-
-            for line in range(len(sorted_timestamps)):
-                if isinstance(sorted_timestamps[line], list):
-                    for i in range(len(sorted_timestamps[line])):
-                        sorted_timestamps[line][i] = sorted_timestamps[line][i].strip()
-                    data[line][timestamp_column_name] = ",".join(
-                        sorted_timestamps[line]
-                    )
-                else:
-                    data[line][timestamp_column_name] = sorted_timestamps[line].strip()
+    while len(data) < len(sorted_timestamps):
+        try:
+            data.append({timestamp_column_name: sorted_timestamps[len(data)].strip()})
+        except AttributeError:
+            data.append({timestamp_column_name: sorted_timestamps[len(data)]})
+
+    for line in range(len(sorted_timestamps)):
+        if isinstance(sorted_timestamps[line], list):
+            for i in range(len(sorted_timestamps[line])):
+                sorted_timestamps[line][i] = sorted_timestamps[line][i].strip()
+            data[line][timestamp_column_name] = ",".join(sorted_timestamps[line])
+        else:
+            data[line][timestamp_column_name] = sorted_timestamps[line].strip()
 
-            with open(chapter_csv_file_path, "w", encoding="utf-8") as chapter_csv_file:
-                writer = csv.DictWriter(chapter_csv_file, fieldnames=field_names)
-                writer.writeheader()
-                writer.writerows(data)
+    chapter_sheet.remove_empty_rows()
 
-    if RemoveEmptyRows(chapter_csv_file_path):
-        return True
+    return True
 
 
 def UpdateCsvFileVerseNumbers(
-    chapter_csv_file_path: str,
+    chapter_sheet: ChapterSheet,
     chapter_number: int,
     entire_audio_verse_range: tuple[int, int],
     verse_number_column_name: str,
@@ -827,12 +1626,12 @@ def UpdateCsvFileVerseNumbers(
     timestamp_column_name: str,
 ) -> bool:
     """
-    Updates the verse numbers of a CSV file containing the verses of a chapter from the Qur'an.
+    Updates the verse numbers of the chapter sheet containing the verses of a chapter from the Qur'an.
 
     Parameters
     ----------
-    chapter_csv_file_path : str
-        The path of the CSV file to update the verse numbers of.
+    chapter_sheet : ChapterSheet
+        The chapter sheet to update the verse numbers of.
     chapter_number : int
         The chapter number of the chapter to get the verse numbers of.
     start_verse : int
@@ -852,88 +1651,37 @@ def UpdateCsvFileVerseNumbers(
         True if the verse numbers were updated successfully, False otherwise.
     """
 
-    with open(chapter_csv_file_path, "r", encoding="utf-8") as chapter_csv_file:
-        csv_dict_reader = csv.DictReader(chapter_csv_file)
-        field_names = csv_dict_reader.fieldnames
+    data = []
+    existing_verses = set()
+    start_verse, end_verse = entire_audio_verse_range
+    verse_texts = [
+        re.sub("۞", "", verse)
+        for verse in GetChapterText(chapter_number)[start_verse - 1 : end_verse]
+    ]
+    verse_aligner = VerseAligner(
+        list(zip(range(start_verse, end_verse + 1), verse_texts))
+    )
 
-        data = []
-        existing_verses = set()
-        start_verse, end_verse = entire_audio_verse_range
-        verse_texts = [
-            re.sub("۞", "", verse)
-            for verse in GetChapterText(chapter_number)[start_verse - 1 : end_verse]
-        ]
-        indexed_verse_texts = [
-            list(item) for item in zip(range(start_verse, end_verse + 1), verse_texts)
-        ]
+    for row in chapter_sheet.remove_empty_rows():
+        if row[verse_text_column_name] != "" or row[timestamp_column_name] == "":
+            verse_number = verse_aligner.align(row[verse_text_column_name])
 
-        for row in csv_dict_reader:
-            if row[verse_text_column_name] != "" or row[timestamp_column_name] == "":
-                best_ratio, best_verse_number = (0, None)
-                csv_text = row[verse_text_column_name]
-
-                for tuple in indexed_verse_texts:
-                    letter_difference = len(tuple[1]) - len(csv_text)
-
-                    # Here we check if the indexed verse text is long or equal to the CSV text
-                    # We do this so we can skip over texts that would definitely not match due to being too short
-                    if letter_difference >= 0:
-                        # Here we get the indexes of the start of each word in the indexed verse text
-                        # We do this because we're comparing words, so there's no need to start checking in the middle of a word or at a space
-                        word_start_indexes = [0] + [
-                            space_index + 1
-                            for space_index, char in enumerate(tuple[1])
-                            if char == " "
-                        ]
-
-                        for word_start_index in word_start_indexes:
-                            # Here we check the match ratio of the CSV text and the indexed verse text starting at each word
-                            # We do this to find the best match
-                            match = tuple[1][
-                                word_start_index : len(csv_text) + word_start_index
-                            ]
-                            ratio = fuzz.ratio(csv_text, match)
-
-                            # Replace the previous ratio if this one is better
-                            if ratio > best_ratio:
-                                best_ratio, best_verse_number = (ratio, tuple[0])
-
-                            # If it's a perfect match, we don't need to continue
-                            if ratio == 100:
-                                break
-
-                    # If it's a perfect match, we don't need to continue
-                    if best_ratio == 100:
-                        break
-
-                if best_ratio >= 84:
-                    verse = f"{chapter_number}:{best_verse_number}"
-                    if verse not in existing_verses:
-                        row[verse_number_column_name] = verse
-                        existing_verses.add(verse)
-                    else:
-                        row[verse_number_column_name] = ""
-
-                    with contextlib.suppress(IndexError):
-                        indexed_verse_texts[0][1] = re.sub(
-                            match, "", indexed_verse_texts[0][1]
-                        ).strip()
-
-                        if indexed_verse_texts[0][1] == "":
-                            indexed_verse_texts.pop(0)
-                        # if indexed_verse_texts[0][0] != best_verse_number:
-                        #     indexed_verse_texts.pop(0)
+            if verse_number is not None:
+                verse = f"{chapter_number}:{verse_number}"
+                if verse not in existing_verses:
+                    row[verse_number_column_name] = verse
+                    existing_verses.add(verse)
                 else:
                     row[verse_number_column_name] = ""
+            else:
+                row[verse_number_column_name] = ""
 
-            data.append(row)
-        with open(chapter_csv_file_path, "w", encoding="utf-8") as chapter_csv_file:
-            csv_dict_writer = csv.DictWriter(chapter_csv_file, fieldnames=field_names)
-            csv_dict_writer.writeheader()
-            csv_dict_writer.writerows(data)
+        data.append(row)
 
-    if RemoveEmptyRows(chapter_csv_file_path):
-        return True
+    chapter_sheet.rows = data
+    chapter_sheet.remove_empty_rows()
+
+    return True
 
 
 def GetLoopRange(
@@ -1054,61 +1802,75 @@ def fetch_chapter_name(chapter_number: int) -> str:
         The name of the chapter.
     """
 
-    url = "https://api.quran.com/api/v4/chapters"
+    return get_chapter_name(chapter_number)
 
-    try:
-        response = requests.get(url)
-    except Exception as error:
-        raise Exception("Failed to fetch chapters.") from error
 
-    chapter_names = [chapter["name_simple"] for chapter in response.json()["chapters"]]
+def GetChapterTranslation(chapterNumber: int, language: Languages) -> list[str]:
+    """
+    Gets the translation of a chapter from the Qur'an
+    """
 
-    return chapter_names[chapter_number - 1]
+    return GetChapterTranslations(chapterNumber, [language])[language]
 
 
-def GetChapterTranslation(chapterNumber: int, language: Languages) -> list[str]:
+def GetChapterTranslations(
+    chapterNumber: int, languages: list[Languages]
+) -> dict[Languages, list[str]]:
     """
-    Gets the translation of a chapter from the Qur'an
+    Gets the translations of a chapter from the Qur'an in several languages,
+    fetching the translations that are not stored yet in parallel.
     """
 
     try:
-        translationId = language.value.translation_id
-        response = requests.get(
-            f"https://api.quran.com/api/v4/quran/translations/{translationId}?chapter_number={chapterNumber}"
+        translations = get_chapter_translations(
+            chapterNumber, [language.value.translation_id for language in languages]
         )
 
-        return [
+        return {
+            language: [
+                clean_translation(translation)
+                for translation in translations[language.value.translation_id]
+            ]
+            for language in languages
+        }
+    except Exception as error:
+        abbreviations = ", ".join(language.value.abbreviation for language in languages)
+
+        raise Exception(
+            f"Failed to fetch translation for chapter {chapterNumber} in {abbreviations}."
+        ) from error
+
+
+def clean_translation(translation: str) -> str:
+    """
+    Removes the footnotes and transliteration diacritics of a translation.
+    """
+
+    return re.sub(
+        "’",
+        "'",
+        re.sub(
+            "ʿ",
+            "'",
             re.sub(
-                "’",
-                "'",
+                "ū",
+                "u",
                 re.sub(
-                    "ʿ",
-                    "'",
+                    "صَۣ",
+                    "صَ",
                     re.sub(
-                        "ū",
-                        "u",
+                        "ḥ",
+                        "h",
                         re.sub(
-                            "صَۣ",
-                            "صَ",
-                            re.sub(
-                                "ḥ",
-                                "h",
-                                re.sub(
-                                    "ā",
-                                    "a",
-                                    re.sub(r"<.*?>*<.*?>", "", translation["text"]),
-                                ),
-                            ),
+                            "ā",
+                            "a",
+                            re.sub(r"<.*?>*<.*?>", "", translation),
                         ),
                     ),
                 ),
-            )
-            for translation in response.json()["translations"]
-        ]
-    except Exception as error:
-        raise Exception(
-            f"Failed to fetch translation for chapter {chapterNumber} in {language.value['abbreviation']}."
-        ) from error
+            ),
+        ),
+    )
 
 
 def fetch_chapter_verse_count(chapter_number: int) -> int:
@@ -1126,14 +1888,7 @@ def fetch_chapter_verse_count(chapter_number: int) -> int:
         The number of verses in the chapter.
     """
 
-    url = f"https://api.quran.com/api/v4/chapters/{chapter_number}"
-
-    try:
-        response = requests.get(url)
-    except Exception as error:
-        raise Exception(f"Failed to fetch chapter {chapter_number}.") from error
-
-    return response.json()["chapter"]["verses_count"]
+    return get_chapter_verse_count(chapter_number)
 
 
 def GetChapterText(chapterNumber: int) -> list[str]:
@@ -1142,14 +1897,7 @@ def GetChapterText(chapterNumber: int) -> list[str]:
     """
 
     try:
-        response = requests.get(
-            f"https://api.quran.com/api/v4/quran/verses/uthmani?chapter_number={chapterNumber}"
-        )
-
-        return [
-            re.sub("ا۟", "ا", verse["text_uthmani"])
-            for verse in response.json()["verses"]
-        ]
+        return [re.sub("ا۟", "ا", verse) for verse in get_chapter_text(chapterNumber)]
     except Exception as error:
         raise Exception(f"Failed to fetch text for chapter {chapterNumber}.") from error
 
@@ -1252,6 +2000,9 @@ def GetRelativeMp4Paths(
     """
     Gets the relative paths of all mp4 files in a list of folders.
 
+    The folders are indexed on the way, so later duration and size lookups of
+    the returned clips do not need to open them.
+
     Parameters
     ----------
     folder_paths : list[str]
@@ -1263,12 +2014,7 @@ def GetRelativeMp4Paths(
         The relative paths of all mp4 files in the folders.
     """
 
-    return [
-        os.path.join(folder_path, file)
-        for folder_path in folder_paths
-        for file in os.listdir(folder_path)
-        if file.endswith(".mp4")
-    ]
+    return get_clip_index(folder_paths).paths()
 
 
 def GetClipDuration(clipPath: str, clipSpeed: float) -> float:
@@ -1501,7 +2247,7 @@ def get_background_clip_time_offset(
 
 def GetVideoDurationSeconds(mp4File: str) -> float:
     """
-    Gets the duration of a video in seconds.
+    Gets the duration of a video in seconds from the clip index.
 
     Parameters
     ----------
@@ -1514,7 +2260,7 @@ def GetVideoDurationSeconds(mp4File: str) -> float:
         The duration of the video in seconds.
     """
 
-    return mpy.VideoFileClip(mp4File).duration
+    return get_clip_metadata(mp4File).duration
 
 
 def sort_nested_timestamps(
@@ -1639,15 +2385,15 @@ def get_valid_background_clips(
                 minimal_background_clip_duration,
                 remainingVideoClipDuration,
             ):
-                background_clip = mpy.VideoFileClip(background_clip_path)
+                background_clip_width = get_clip_metadata(background_clip_path).width
 
                 max_horizontal_offset = GetMaxHorizontalOffset(
-                    background_clip.w, video_width
+                    background_clip_width, video_width
                 )
 
                 if max_horizontal_offset < 0:
                     raise ValueError(
-                        f"Verse {video_map_index} Background clip {x + 1} width ({background_clip.w}) is less than video width ({video_width})"
+                        f"Verse {video_map_index} Background clip {x + 1} width ({background_clip_width}) is less than video width ({video_width})"
                     )
 
                 background_clip_horizontal_offset = GetHorizontalOffset(
@@ -1820,7 +2566,7 @@ def create_text_clip(
     position: tuple[str or float, str or float],
     size: tuple,
     text: str,
-) -> mpy.TextClip:
+) -> mpy.ImageClip:
     """
     Creates a text clip
 
@@ -1849,19 +2595,21 @@ def create_text_clip(
 
     Returns
     -------
-    mpy.TextClip
+    mpy.ImageClip
         The text clip.
     """
 
     return (
-        mpy.TextClip(
-            bg_color=background_color,
-            color=color,
-            font=font,
-            fontsize=fontsize,
-            method=method,
-            size=size,
-            txt=text,
+        mpy.ImageClip(
+            get_text_image(
+                text=text,
+                font=font,
+                font_size=fontsize,
+                color=color,
+                background_color=background_color,
+                method=method,
+                size=size,
+            )
         )
         .set_duration(duration)
         .set_position(position, relative=True)
@@ -1870,45 +2618,44 @@ def create_text_clip(
     )
 
 
-def CreateVideoClip(
+def create_background_clip(
     background_clips_paths: list[list[str, float or int, int, str]],
     background_clips_speed: float,
     final_clip_duration: float,
     target_aspect_ratio: float,
-    text_clips: list[mpy.TextClip],
     video_dimensions: tuple[int, int],
     video_mode: VideoModes,
-    shadow_clip: mpy.ColorClip = None,
-    text_duration: float = None,
-) -> mpy.CompositeVideoClip:
+    decoder_transforms: bool = False,
+    fps: float = DEFAULT_SEGMENT_FPS,
+) -> mpy.VideoClip:
     """
-    Creates a video clip
+    Creates the background of a video clip from its background clips.
 
     Parameters
     ----------
     background_clip_paths : list[list[str, float or int, int, str]]
         The paths of the background clips.
+    background_clip_speed : float
+        The speed of the background clip.
     final_clip_duration : float
         The duration of the final clip.
     target_aspect_ratio : float
         The target aspect ratio.
-    text_clips : list[mpy.TextClip]
-        The text clips.
-    video_mode : VideoMode
-        The video mode.
     video_dimensions : tuple[int, int]
         The dimensions of the video.
-    background_clip_speed : float
-        The speed of the background clip.
-    shadow_clip : mpy.ColorClip, optional
-        The shadow clip, by default None
-    text_duration : float, optional
-        The duration of the text, by default None
+    video_mode : VideoMode
+        The video mode.
+    decoder_transforms : bool, optional
+        Whether ffmpeg crops, mirrors, speeds up and scales the background
+        clips while decoding, by default False
+    fps : float, optional
+        The frame rate the background clips are decoded at with decoder
+        transforms, by default DEFAULT_SEGMENT_FPS
 
     Returns
     -------
-    mpy.CompositeVideoClip
-        The video clip.
+    mpy.VideoClip
+        The background clip.
     """
 
     background_clips = []
@@ -1921,16 +2668,34 @@ def CreateVideoClip(
             background_clip_horizontal_offset = background_clip_info[2]
             background_mirrored = background_clip_info[3]
 
-            background_clip = mpy.VideoFileClip(background_clip_path).speedx(
-                background_clips_speed
-            )
-            if background_mirrored == "True":
-                background_clip = background_clip.fx(mpy.vfx.mirror_x)
-
             background_clip_duration = (
                 GetClipDuration(background_clip_path, background_clips_speed)
             ) - background_clip_time_offset
 
+            if decoder_transforms:
+                background_clips.append(
+                    get_video_reader_pool().get_transformed_clip(
+                        background_clip_path,
+                        background_clip_time_offset,
+                        background_clips_speed,
+                        background_clip_horizontal_offset,
+                        background_mirrored == "True",
+                        video_dimensions,
+                        fps,
+                        background_clip_duration,
+                    )
+                )
+
+                continue
+
+            background_clip = (
+                get_video_reader_pool()
+                .get_clip(background_clip_path)
+                .speedx(background_clips_speed)
+            )
+            if background_mirrored == "True":
+                background_clip = background_clip.fx(mpy.vfx.mirror_x)
+
             background_clip = (
                 background_clip.crop(
                     x1=background_clip_horizontal_offset,
@@ -1957,10 +2722,17 @@ def CreateVideoClip(
 
         video_clip = mpy.concatenate_videoclips(clips=background_clips, method="chain")
         # background_clip = background_clip.fx(mpy.vfx.colorx, 1.25) # Saturation
+    elif video_mode == VideoModes.IMAGE and decoder_transforms:
+        video_clip = mpy.ImageClip(
+            read_transformed_frame(
+                background_clips_paths[0][0],
+                background_clips_paths[0][1],
+                video_dimensions,
+            )
+        )
     elif video_mode == VideoModes.IMAGE:
-        background_clip = mpy.VideoFileClip(background_clips_paths[0][0])
-        total_frames = int(background_clip.fps * background_clip.duration)
-        random_frame_number = random.randint(1, total_frames)
+        background_clip = get_video_reader_pool().get_clip(background_clips_paths[0][0])
+        frame_time = background_clips_paths[0][1]
 
         current_aspect_ratio = background_clip.w / background_clip.h
 
@@ -1971,13 +2743,73 @@ def CreateVideoClip(
                 x1=horizontal_offset, x2=horizontal_offset + new_width
             ).resize(video_dimensions)
 
-        random_frame = background_clip.get_frame(
-            random_frame_number / background_clip.fps
-        )
-        video_clip = mpy.ImageClip(random_frame)
+        frame = background_clip.get_frame(frame_time)
+        video_clip = mpy.ImageClip(frame)
+
+    return video_clip.set_duration(final_clip_duration)
+
+
+def CreateVideoClip(
+    background_clips_paths: list[list[str, float or int, int, str]],
+    background_clips_speed: float,
+    final_clip_duration: float,
+    target_aspect_ratio: float,
+    text_clips: list[mpy.ImageClip],
+    video_dimensions: tuple[int, int],
+    video_mode: VideoModes,
+    shadow_clip: mpy.ColorClip = None,
+    text_duration: float = None,
+    decoder_transforms: bool = False,
+    fps: float = DEFAULT_SEGMENT_FPS,
+) -> mpy.CompositeVideoClip:
+    """
+    Creates a video clip
+
+    Parameters
+    ----------
+    background_clip_paths : list[list[str, float or int, int, str]]
+        The paths of the background clips.
+    final_clip_duration : float
+        The duration of the final clip.
+    target_aspect_ratio : float
+        The target aspect ratio.
+    text_clips : list[mpy.ImageClip]
+        The text clips.
+    video_mode : VideoMode
+        The video mode.
+    video_dimensions : tuple[int, int]
+        The dimensions of the video.
+    background_clip_speed : float
+        The speed of the background clip.
+    shadow_clip : mpy.ColorClip, optional
+        The shadow clip, by default None
+    text_duration : float, optional
+        The duration of the text, by default None
+    decoder_transforms : bool, optional
+        Whether ffmpeg crops, mirrors, speeds up and scales the background
+        clips while decoding, by default False
+    fps : float, optional
+        The frame rate the background clips are decoded at with decoder
+        transforms, by default DEFAULT_SEGMENT_FPS
+
+    Returns
+    -------
+    mpy.CompositeVideoClip
+        The video clip.
+    """
+
+    video_clip = create_background_clip(
+        background_clips_paths=background_clips_paths,
+        background_clips_speed=background_clips_speed,
+        final_clip_duration=final_clip_duration,
+        target_aspect_ratio=target_aspect_ratio,
+        video_dimensions=video_dimensions,
+        video_mode=video_mode,
+        decoder_transforms=decoder_transforms,
+        fps=fps,
+    )
 
     text_duration = text_duration if text_duration is not None else final_clip_duration
-    video_clip = video_clip.set_duration(final_clip_duration)
     clips = (
         [video_clip, shadow_clip, *text_clips]
         if shadow_clip is not None
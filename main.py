@@ -1,13 +1,19 @@
-from models import Account, ColorModes, Languages, AdditionalVideoSettings
-from moviepy.config import change_settings
+import argparse
+import dataclasses
+
+from models import (
+    Account,
+    AdditionalVideoSettings,
+    ColorModes,
+    Languages,
+    RenderBackends,
+    RenderSettings,
+)
 from presets import Presets
 from enum import Enum
 from tiktok import TikTok
 from enums import Accounts
-
-change_settings(
-    {"IMAGEMAGICK_BINARY": r"C:\\Program Files\\ImageMagick-7.1.1-Q16-HDRI\\magick.exe"}
-)
+from functions import load_video_map
 
 
 class Joe(Enum):
@@ -20,14 +26,147 @@ class Joe(Enum):
     )
 
 
-# WANNEER JE EEN VIDEOMAP MEEGEEFT DAN GEBRUIKT HIJ HEM NIET
+def add_render_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the arguments that choose how the video is encoded, see RenderSettings.
+    """
+
+    render_arguments = parser.add_argument_group("rendering")
+    render_arguments.add_argument(
+        "--fast",
+        action="store_true",
+        help="turn on parallel segments, decoder transforms, flattened overlays, "
+        "still images and the background video mezzanine",
+    )
+    render_arguments.add_argument(
+        "--parallel-segments",
+        action="store_true",
+        help="encode every verse in its own process and join them without re-encoding",
+    )
+    render_arguments.add_argument(
+        "--workers", type=int, help="the number of processes of parallel segments"
+    )
+    render_arguments.add_argument(
+        "--segment-cache",
+        metavar="DIRECTORY",
+        help="reuse the verses whose inputs did not change since an earlier render",
+    )
+    render_arguments.add_argument(
+        "--reuse-video-map",
+        action="store_true",
+        help="plan the same background clips as the last render of the same verses, "
+        "so its cached verses are reused (requires --segment-cache); by default "
+        "every render draws new background clips",
+    )
+    render_arguments.add_argument(
+        "--backend",
+        choices=[backend.name.lower() for backend in RenderBackends],
+        default=RenderBackends.MOVIEPY.name.lower(),
+        help="composite the verses in Python (moviepy) or in a single ffmpeg filter graph (ffmpeg)",
+    )
+    render_arguments.add_argument(
+        "--decoder-transforms",
+        action="store_true",
+        help="let ffmpeg crop, mirror, speed up and scale the background clips while decoding",
+    )
+    render_arguments.add_argument(
+        "--flatten-overlays",
+        action="store_true",
+        help="composite the shadow and text of every verse as one pre-flattened layer",
+    )
+    render_arguments.add_argument(
+        "--background-video-mezzanine",
+        action="store_true",
+        help="crop and scale a single background video once and reuse it",
+    )
+    render_arguments.add_argument(
+        "--still-images",
+        action="store_true",
+        help="encode IMAGE mode videos from stills",
+    )
+    render_arguments.add_argument(
+        "--overlay-cache",
+        metavar="DIRECTORY",
+        default=RenderSettings.overlayCacheDirectory,
+        help="the directory rendered text is reused from, by default %(default)s",
+    )
+    render_arguments.add_argument(
+        "--no-overlay-cache",
+        action="store_true",
+        help="render the text of every video again",
+    )
+
+
+def get_render_settings(args: argparse.Namespace) -> RenderSettings:
+    """
+    Gets the render settings of the parsed arguments.
+    """
+
+    return RenderSettings(
+        parallelSegments=args.fast or args.parallel_segments,
+        workers=args.workers,
+        segmentCacheDirectory=args.segment_cache,
+        reuseVideoMap=args.reuse_video_map,
+        backend=RenderBackends[args.backend.upper()],
+        decoderTransforms=args.fast or args.decoder_transforms,
+        flattenOverlays=args.fast or args.flatten_overlays,
+        backgroundVideoMezzanine=args.fast or args.background_video_mezzanine,
+        stillImages=args.fast or args.still_images,
+        overlayCacheDirectory=None if args.no_overlay_cache else args.overlay_cache,
+    )
+
+
+def get_additional_video_settings(
+    args: argparse.Namespace, preset: Presets
+) -> AdditionalVideoSettings:
+    """
+    Gets the additional video settings of a preset, with the video map of the
+    parsed arguments when one is given.
+    """
+
+    additional_video_settings = (
+        preset.value.additional_video_settings or AdditionalVideoSettings()
+    )
+
+    if not args.video_map:
+        return additional_video_settings
+
+    video_map = load_video_map(args.video_map)
+
+    # The video map of a single background video render is the path of the video
+    if isinstance(video_map, str):
+        return dataclasses.replace(additional_video_settings, backgroundVideo=video_map)
+
+    return dataclasses.replace(additional_video_settings, videoMap=video_map)
+
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--plan-only",
+        action="store_true",
+        help="only write the render plan of the video instead of rendering it",
+    )
+    parser.add_argument(
+        "--video-map",
+        metavar="PATH",
+        help="re-render an earlier video with the same background clips, "
+        "from the video map JSON written next to it",
+    )
+    add_render_arguments(parser)
+    args = parser.parse_args()
+
+    if args.reuse_video_map and not args.segment_cache:
+        parser.error("--reuse-video-map requires --segment-cache")
+
     tiktok = TikTok(Accounts.QURAN_2_LISTEN)
     preset = Presets.MANSOUR_AS_SALIMI_AL_KAHF_92_98
 
     tiktok.create(
         preset,
-        # additional_video_settings=AdditionalVideoSettings(videoMap={}),
+        additional_video_settings=get_additional_video_settings(args, preset),
+        plan_only=args.plan_only,
+        render_settings=get_render_settings(args),
     )
 
 
@@ -2,6 +2,12 @@ import moviepy.editor as mpy
 
 from dataclasses import dataclass
 from enum import Enum
+from overlay_cache import (
+    DEFAULT_OVERLAY_CACHE_DIRECTORY,
+    DEFAULT_OVERLAY_CACHE_SIZE_LIMIT,
+    get_text_image,
+)
+from segment_cache import DEFAULT_SEGMENT_CACHE_SIZE_LIMIT
 from typing import Optional, Union
 
 
@@ -72,14 +78,16 @@ class TextClipInfo:
 
     def create_text_clip(self, color: str, duration: float, font: str, text: str):
         return (
-            mpy.TextClip(
-                bg_color=self.text_background_color,
-                color=color,
-                font=font,
-                fontsize=self.text_font_size,
-                method=self.text_method,
-                size=self.text_size,
-                txt=text,
+            mpy.ImageClip(
+                get_text_image(
+                    text=text,
+                    font=font,
+                    font_size=self.text_font_size,
+                    color=color,
+                    background_color=self.text_background_color,
+                    method=self.text_method,
+                    size=self.text_size,
+                )
             )
             .set_duration(duration)
             .set_position(self.text_position, relative=True)
@@ -110,6 +118,27 @@ class VideoSettings:
     videoMode: VideoModes
 
 
+class RenderBackends(Enum):
+    MOVIEPY = 1
+    FFMPEG = 2
+
+
+@dataclass
+class RenderSettings:
+    parallelSegments: bool = False
+    workers: Optional[int] = None
+    segmentCacheDirectory: Optional[str] = None
+    segmentCacheSizeLimit: int = DEFAULT_SEGMENT_CACHE_SIZE_LIMIT
+    reuseVideoMap: bool = False
+    backend: RenderBackends = RenderBackends.MOVIEPY
+    decoderTransforms: bool = False
+    flattenOverlays: bool = False
+    backgroundVideoMezzanine: bool = False
+    stillImages: bool = False
+    overlayCacheDirectory: Optional[str] = DEFAULT_OVERLAY_CACHE_DIRECTORY
+    overlayCacheSizeLimit: int = DEFAULT_OVERLAY_CACHE_SIZE_LIMIT
+
+
 @dataclass
 class AdditionalVideoSettings:
     startLine: Optional[int] = None
@@ -0,0 +1,353 @@
+import contextlib
+import hashlib
+import json
+import numpy as np
+import os
+
+from segment_cache import get_file_hash
+from text_renderer import get_renderer_identity, get_text_renderer, render_text
+from threading import Lock
+from typing import Optional
+
+# Bump when the way text_renderer draws text changes
+OVERLAY_CACHE_VERSION = 1
+DEFAULT_OVERLAY_CACHE_DIRECTORY = ".cache/overlays"
+DEFAULT_OVERLAY_CACHE_SIZE_LIMIT = 1024**3
+
+_overlay_cache = None
+_overlay_cache_enabled = True
+_overlay_cache_lock = Lock()
+
+# The text images of the last prerender while the overlay cache is disabled, by key
+_prerendered_images: dict[str, np.ndarray] = {}
+_prerendered_images_lock = Lock()
+
+
+class OverlayCache:
+    """
+    Content-addressed store of rendered text images.
+
+    Images are stored under the hash of everything that determines their
+    pixels, so the same text in the same style is only rendered once across
+    renders, presets and accounts that share fonts. The least recently used
+    images are removed when the cache grows over its size limit.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_OVERLAY_CACHE_DIRECTORY,
+        size_limit: int = DEFAULT_OVERLAY_CACHE_SIZE_LIMIT,
+    ):
+        self.directory = directory
+        self.size_limit = size_limit
+
+        self._lock = Lock()
+        self._size = None
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_key(
+        self,
+        text: str,
+        font: str,
+        font_size: int,
+        color: str,
+        background_color: str,
+        method: str,
+        size: tuple[Optional[float], Optional[float]],
+    ) -> str:
+        """
+        Gets the cache key of a text image, see get_text_image_key.
+        """
+
+        return get_text_image_key(
+            text, font, font_size, color, background_color, method, size
+        )
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Gets the cached image of a key.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        Optional[np.ndarray]
+            The RGBA image, None if the image is not cached.
+        """
+
+        path = self.get_path(key)
+
+        try:
+            with np.load(path) as data:
+                image = data["image"]
+
+            # Keep track of when an image was last used
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            # Missing, or removed or written by another process meanwhile
+            return None
+
+        return image
+
+    def contains(self, key: str) -> bool:
+        return os.path.isfile(self.get_path(key))
+
+    def put(self, key: str, image: np.ndarray) -> None:
+        """
+        Stores an image and removes the least recently used images when the
+        cache is over its size limit.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        image : np.ndarray
+            The RGBA image.
+        """
+
+        path = self.get_path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(temporary_path, "wb") as file:
+            np.savez_compressed(file, image=image)
+
+        # Another process may have stored the same image meanwhile
+        try:
+            previous_size = os.path.getsize(path)
+        except OSError:
+            previous_size = 0
+
+        os.replace(temporary_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.get_size()
+            else:
+                self._size += os.path.getsize(path) - previous_size
+
+            if self._size > self.size_limit:
+                self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used images until the cache is at most 90%
+        of its size limit. Called with the lock held.
+        """
+
+        entries = []
+
+        with os.scandir(self.directory) as directory_entries:
+            for entry in directory_entries:
+                if entry.name.endswith(".npz"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if self._size <= self.size_limit * 0.9:
+                break
+
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+            self._size -= size
+
+    def get_size(self) -> int:
+        size = 0
+
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".npz"):
+                    with contextlib.suppress(OSError):
+                        size += entry.stat().st_size
+
+        return size
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+
+def get_overlay_cache() -> Optional[OverlayCache]:
+    """
+    Gets the overlay cache of the process, None if it is disabled.
+    """
+
+    global _overlay_cache
+
+    with _overlay_cache_lock:
+        if not _overlay_cache_enabled:
+            return None
+
+        if _overlay_cache is None:
+            _overlay_cache = OverlayCache()
+
+        return _overlay_cache
+
+
+def configure_overlay_cache(
+    directory: Optional[str] = DEFAULT_OVERLAY_CACHE_DIRECTORY,
+    size_limit: int = DEFAULT_OVERLAY_CACHE_SIZE_LIMIT,
+) -> None:
+    """
+    Sets the directory and size limit of the overlay cache of the process.
+
+    Parameters
+    ----------
+    directory : Optional[str]
+        The cache directory, None disables the cache.
+    size_limit : int
+        The size limit of the cache in bytes.
+    """
+
+    global _overlay_cache, _overlay_cache_enabled
+
+    with _overlay_cache_lock:
+        _overlay_cache_enabled = directory is not None
+
+        if _overlay_cache_enabled and (
+            _overlay_cache is None
+            or _overlay_cache.directory != directory
+            or _overlay_cache.size_limit != size_limit
+        ):
+            _overlay_cache = OverlayCache(directory, size_limit)
+
+
+def get_text_image_key(
+    text: str,
+    font: str,
+    font_size: int,
+    color: str,
+    background_color: str,
+    method: str,
+    size: tuple[Optional[float], Optional[float]],
+) -> str:
+    """
+    Gets the key of a text image: the hash of everything that determines its pixels.
+
+    Returns
+    -------
+    str
+        The key.
+    """
+
+    key_data = {
+        "version": OVERLAY_CACHE_VERSION,
+        "renderer": get_renderer_identity(),
+        "text": text,
+        "font": get_file_hash(font),
+        "font_size": font_size,
+        "color": color,
+        "background_color": background_color,
+        "method": method,
+        "size": list(size),
+    }
+
+    return hashlib.sha256(
+        json.dumps(key_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+def prerender_text_images(
+    texts: list[tuple[str, str, int, str, str, str, tuple]],
+) -> int:
+    """
+    Renders every text that is not cached yet into the overlay cache in a
+    single pass, with one renderer whose fonts stay loaded between texts.
+
+    When the overlay cache is disabled the texts are kept in memory instead,
+    until the next prerender. Worker processes that do not inherit the memory
+    of the process, e.g. on Windows, render their texts again.
+
+    Parameters
+    ----------
+    texts : list[tuple[str, str, int, str, str, str, tuple]]
+        The text, font, font size, color, background color, method and size
+        of every text, duplicates are rendered once.
+
+    Returns
+    -------
+    int
+        The number of rendered texts.
+    """
+
+    overlay_cache = get_overlay_cache()
+    text_renderer = get_text_renderer()
+    images = {}
+    rendered_texts = 0
+
+    for text in texts:
+        key = get_text_image_key(*text)
+
+        if key in images:
+            continue
+
+        if overlay_cache is None:
+            images[key] = text_renderer.render(*text)
+        else:
+            images[key] = None
+
+            if overlay_cache.contains(key):
+                continue
+
+            overlay_cache.put(key, text_renderer.render(*text))
+
+        rendered_texts += 1
+
+    with _prerendered_images_lock:
+        _prerendered_images.clear()
+
+        if overlay_cache is None:
+            _prerendered_images.update(images)
+
+    return rendered_texts
+
+
+def get_text_image(
+    text: str,
+    font: str,
+    font_size: int,
+    color: str,
+    background_color: str = "transparent",
+    method: str = "caption",
+    size: tuple[Optional[float], Optional[float]] = (None, None),
+) -> np.ndarray:
+    """
+    Gets the rendered image of a text from the overlay cache, rendering and
+    storing it when it is not cached. See TextRenderer.render.
+    """
+
+    overlay_cache = get_overlay_cache()
+
+    if overlay_cache is None:
+        with _prerendered_images_lock:
+            image = _prerendered_images.get(
+                get_text_image_key(
+                    text, font, font_size, color, background_color, method, size
+                )
+            )
+
+        if image is not None:
+            return image
+
+        return render_text(text, font, font_size, color, background_color, method, size)
+
+    key = overlay_cache.get_key(
+        text, font, font_size, color, background_color, method, size
+    )
+    image = overlay_cache.get(key)
+
+    if image is None:
+        image = render_text(text, font, font_size, color, background_color, method, size)
+        overlay_cache.put(key, image)
+
+    return image
@@ -0,0 +1,137 @@
+import argparse
+import concurrent.futures
+
+from colorama import Fore, Style
+from models import Languages
+from quran_client import MAX_CONCURRENT_REQUESTS
+from quran_corpus import QuranCorpus, get_quran_corpus
+
+
+def prefetch_chapters(
+    corpus: QuranCorpus,
+    chapter_numbers: list[int],
+    translation_ids: list[int],
+    workers: int = MAX_CONCURRENT_REQUESTS,
+) -> int:
+    """
+    Stores the text and translations of chapters in the Qur'an corpus, so
+    renders of those chapters never go to the network.
+
+    The text and translations of a chapter are stored in a single transaction.
+    Chapters that are already stored are skipped, so an interrupted prefetch
+    continues where it stopped when it is run again.
+
+    Parameters
+    ----------
+    corpus : QuranCorpus
+        The corpus to store the chapters in.
+    chapter_numbers : list[int]
+        The chapters to store.
+    translation_ids : list[int]
+        The api.quran.com ids of the translations to store.
+    workers : int, optional
+        The number of chapters fetched at the same time, by default MAX_CONCURRENT_REQUESTS
+
+    Returns
+    -------
+    int
+        The number of fetched chapters.
+    """
+
+    # Every chapter name and verse count comes with a single request
+    corpus.get_chapter_count()
+
+    missing_chapter_numbers = [
+        chapter_number
+        for chapter_number in chapter_numbers
+        if not corpus.contains_chapter(chapter_number, translation_ids)
+    ]
+    stored_chapter_count = len(chapter_numbers) - len(missing_chapter_numbers)
+
+    if stored_chapter_count:
+        print(
+            f"{Fore.CYAN}Skipping {stored_chapter_count} chapter(s) that are already stored{Style.RESET_ALL}"
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                corpus.prefetch_chapter, chapter_number, translation_ids
+            ): chapter_number
+            for chapter_number in missing_chapter_numbers
+        }
+
+        for fetched_chapter_count, future in enumerate(
+            concurrent.futures.as_completed(futures), start=1
+        ):
+            chapter_number = futures[future]
+
+            try:
+                future.result()
+            except Exception as error:
+                print(
+                    f"{Fore.RED}Failed to fetch chapter {chapter_number}: {error}{Style.RESET_ALL}"
+                )
+                continue
+
+            print(
+                f"{Fore.GREEN}[{fetched_chapter_count}/{len(missing_chapter_numbers)}] "
+                f"Stored chapter {chapter_number} ({corpus.get_chapter_name(chapter_number)})"
+                f"{Style.RESET_ALL}"
+            )
+
+    return len(missing_chapter_numbers)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="store every chapter and translation of the Qur'an for offline renders"
+    )
+    parser.add_argument(
+        "--chapters",
+        type=int,
+        nargs="+",
+        help="the chapters to store, by default all chapters",
+    )
+    parser.add_argument(
+        "--languages",
+        nargs="+",
+        choices=[language.name for language in Languages],
+        default=[language.name for language in Languages],
+        help="the translations to store, by default every language",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MAX_CONCURRENT_REQUESTS,
+        help="the number of chapters fetched at the same time",
+    )
+    args = parser.parse_args()
+
+    corpus = get_quran_corpus()
+    chapter_numbers = args.chapters or list(range(1, corpus.get_chapter_count() + 1))
+    translation_ids = list(
+        dict.fromkeys(
+            Languages[language].value.translation_id for language in args.languages
+        )
+    )
+
+    prefetch_chapters(corpus, chapter_numbers, translation_ids, args.workers)
+
+    missing_chapter_numbers = [
+        chapter_number
+        for chapter_number in chapter_numbers
+        if not corpus.contains_chapter(chapter_number, translation_ids)
+    ]
+
+    if missing_chapter_numbers:
+        print(
+            f"{Fore.RED}{len(missing_chapter_numbers)} chapter(s) are not stored yet, run the prefetch again to continue{Style.RESET_ALL}"
+        )
+        raise SystemExit(1)
+
+    print(f"{Fore.GREEN}Stored {len(chapter_numbers)} chapter(s){Style.RESET_ALL}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import os
+import requests
+
+from requests.adapters import HTTPAdapter
+from threading import BoundedSemaphore, Lock, get_ident
+from typing import Optional
+from urllib3.util.retry import Retry
+
+QURAN_API_URL = "https://api.quran.com/api/v4"
+DEFAULT_RESPONSE_CACHE_DIRECTORY = ".cache/quran-responses"
+MAX_CONCURRENT_REQUESTS = 8
+# Seconds to connect and to wait for the response
+REQUEST_TIMEOUT = (5, 30)
+RETRY_COUNT = 5
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_quran_client = None
+_quran_client_lock = Lock()
+
+
+class QuranClient:
+    """
+    HTTP client of api.quran.com shared by every lookup of a process.
+
+    Requests go through a single session that keeps its connections alive,
+    at most max_concurrent_requests at the same time. Failed connections and
+    server errors are retried with exponential backoff. Responses are stored
+    with their ETag and Last-Modified headers and revalidated on the next
+    request, so an unchanged response is not downloaded again and a cached
+    response is still served when the API can not be reached.
+    """
+
+    def __init__(
+        self,
+        cache_directory: Optional[str] = DEFAULT_RESPONSE_CACHE_DIRECTORY,
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+    ):
+        self.cache_directory = cache_directory
+        self.max_concurrent_requests = max_concurrent_requests
+
+        self._semaphore = BoundedSemaphore(max_concurrent_requests)
+        self.session = requests.Session()
+
+        retry = Retry(
+            total=RETRY_COUNT,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=["GET"],
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max_concurrent_requests,
+            max_retries=retry,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        if cache_directory:
+            os.makedirs(cache_directory, exist_ok=True)
+
+    def get_json(self, path: str) -> dict:
+        """
+        Gets the JSON response of an API path, revalidating a cached response.
+
+        Parameters
+        ----------
+        path : str
+            The path of the endpoint with its query, relative to QURAN_API_URL.
+
+        Returns
+        -------
+        dict
+            The JSON response.
+        """
+
+        url = f"{QURAN_API_URL}/{path.lstrip('/')}"
+        cached_response = self.get_cached_response(url)
+        headers = {}
+
+        if cached_response:
+            if cached_response.get("etag"):
+                headers["If-None-Match"] = cached_response["etag"]
+
+            if cached_response.get("last_modified"):
+                headers["If-Modified-Since"] = cached_response["last_modified"]
+
+        try:
+            with self._semaphore:
+                response = self.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+
+            if response.status_code == 304 and cached_response:
+                return cached_response["body"]
+
+            response.raise_for_status()
+            body = response.json()
+        except (requests.RequestException, ValueError):
+            if cached_response:
+                return cached_response["body"]
+
+            raise
+
+        self.put_cached_response(
+            url,
+            {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "body": body,
+            },
+        )
+
+        return body
+
+    def fetch_many(self, paths: list[str]) -> list[dict]:
+        """
+        Gets the JSON responses of several API paths concurrently.
+
+        Parameters
+        ----------
+        paths : list[str]
+            The paths of the endpoints.
+
+        Returns
+        -------
+        list[dict]
+            The JSON responses in the order of the paths.
+        """
+
+        if len(paths) <= 1:
+            return [self.get_json(path) for path in paths]
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.max_concurrent_requests, len(paths))
+        ) as executor:
+            return list(executor.map(self.get_json, paths))
+
+    def get_cached_response(self, url: str) -> Optional[dict]:
+        if not self.cache_directory:
+            return None
+
+        try:
+            with open(self.get_cache_path(url), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put_cached_response(self, url: str, cached_response: dict) -> None:
+        if not self.cache_directory:
+            return
+
+        path = self.get_cache_path(url)
+        temporary_path = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+
+        with contextlib.suppress(OSError):
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(cached_response, file, ensure_ascii=False)
+
+            os.replace(temporary_path, path)
+
+    def get_cache_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+        return os.path.join(self.cache_directory, f"{key}.json")
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def get_quran_client() -> QuranClient:
+    """
+    Gets the api.quran.com client of the process.
+    """
+
+    global _quran_client
+
+    with _quran_client_lock:
+        if _quran_client is None:
+            _quran_client = QuranClient()
+
+        return _quran_client
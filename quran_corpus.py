@@ -0,0 +1,440 @@
+import os
+import sqlite3
+
+from quran_client import get_quran_client
+from threading import Lock
+from typing import Optional
+
+DEFAULT_QURAN_CORPUS_PATH = ".cache/quran.sqlite"
+
+_quran_corpus = None
+_quran_corpus_lock = Lock()
+
+
+class QuranCorpus:
+    """
+    Local SQLite store of the chapters, Uthmani text and translations of the
+    Qur'an.
+
+    Chapter names and verse counts are fetched from api.quran.com once for all
+    chapters, and the text and every translation of a chapter once when they
+    are first used. After that every lookup is served from the store, also
+    offline.
+    """
+
+    def __init__(self, path: str = DEFAULT_QURAN_CORPUS_PATH):
+        self.path = path
+
+        # A single connection shared by the threads of a render
+        self._lock = Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+        with self._lock, self._connection:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chapters (
+                    chapter_number INTEGER PRIMARY KEY,
+                    name_simple TEXT NOT NULL,
+                    verses_count INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS verses (
+                    chapter_number INTEGER NOT NULL,
+                    verse_number INTEGER NOT NULL,
+                    text_uthmani TEXT NOT NULL,
+                    PRIMARY KEY (chapter_number, verse_number)
+                );
+                CREATE TABLE IF NOT EXISTS translations (
+                    translation_id INTEGER NOT NULL,
+                    chapter_number INTEGER NOT NULL,
+                    verse_number INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (translation_id, chapter_number, verse_number)
+                );
+                """
+            )
+
+    def get_chapter_name(self, chapter_number: int) -> str:
+        """
+        Gets the name of a chapter.
+
+        Parameters
+        ----------
+        chapter_number : int
+            The chapter number.
+
+        Returns
+        -------
+        str
+            The name of the chapter.
+        """
+
+        return self.get_chapter(chapter_number)[0]
+
+    def get_verse_count(self, chapter_number: int) -> int:
+        """
+        Gets the number of verses in a chapter.
+
+        Parameters
+        ----------
+        chapter_number : int
+            The chapter number.
+
+        Returns
+        -------
+        int
+            The number of verses in the chapter.
+        """
+
+        return self.get_chapter(chapter_number)[1]
+
+    def get_chapter(self, chapter_number: int) -> tuple[str, int]:
+        row = self.query(
+            "SELECT name_simple, verses_count FROM chapters WHERE chapter_number = ?",
+            (chapter_number,),
+        )
+
+        if not row:
+            self.store_chapters(fetch_chapters())
+
+            row = self.query(
+                "SELECT name_simple, verses_count FROM chapters WHERE chapter_number = ?",
+                (chapter_number,),
+            )
+
+            if not row:
+                raise ValueError(f"Chapter {chapter_number} does not exist.")
+
+        return row[0]
+
+    def get_chapter_text(self, chapter_number: int) -> list[str]:
+        """
+        Gets the Uthmani text of every verse of a chapter.
+
+        Parameters
+        ----------
+        chapter_number : int
+            The chapter number.
+
+        Returns
+        -------
+        list[str]
+            The text of every verse in verse order.
+        """
+
+        query = "SELECT text_uthmani FROM verses WHERE chapter_number = ? ORDER BY verse_number"
+        rows = self.query(query, (chapter_number,))
+
+        if not rows:
+            self.store_chapter_text(chapter_number, fetch_chapter_text(chapter_number))
+            rows = self.query(query, (chapter_number,))
+
+        return [text for (text,) in rows]
+
+    def get_chapter_translation(
+        self, chapter_number: int, translation_id: int
+    ) -> list[str]:
+        """
+        Gets a translation of every verse of a chapter.
+
+        Parameters
+        ----------
+        chapter_number : int
+            The chapter number.
+        translation_id : int
+            The api.quran.com id of the translation.
+
+        Returns
+        -------
+        list[str]
+            The translation of every verse in verse order, as served by the API.
+        """
+
+        return self.get_chapter_translations(chapter_number, [translation_id])[
+            translation_id
+        ]
+
+    def get_chapter_translations(
+        self, chapter_number: int, translation_ids: list[int]
+    ) -> dict[int, list[str]]:
+        """
+        Gets several translations of every verse of a chapter, fetching the
+        translations that are not stored yet in parallel.
+
+        Parameters
+        ----------
+        chapter_number : int
+            The chapter number.
+        translation_ids : list[int]
+            The api.quran.com ids of the translations.
+
+        Returns
+        -------
+        dict[int, list[str]]
+            The translation of every verse in verse order by translation id.
+        """
+
+        query = (
+            "SELECT text FROM translations WHERE translation_id = ? AND chapter_number = ? "
+            "ORDER BY verse_number"
+        )
+        translations = {
+            translation_id: [
+                text for (text,) in self.query(query, (translation_id, chapter_number))
+            ]
+            for translation_id in dict.fromkeys(translation_ids)
+        }
+        missing_translation_ids = [
+            translation_id
+            for translation_id, verses in translations.items()
+            if not verses
+        ]
+
+        if missing_translation_ids:
+            for translation_id, verses in zip(
+                missing_translation_ids,
+                fetch_chapter_translations(chapter_number, missing_translation_ids),
+            ):
+                self.store_chapter_translation(chapter_number, translation_id, verses)
+                translations[translation_id] = verses
+
+        return translations
+
+    def contains_chapter(
+        self, chapter_number: int, translation_ids: list[int]
+    ) -> bool:
+        """
+        Checks if the text and the given translations of a chapter are stored.
+        """
+
+        if not self.query(
+            "SELECT 1 FROM verses WHERE chapter_number = ? LIMIT 1", (chapter_number,)
+        ):
+            return False
+
+        return all(
+            self.query(
+                "SELECT 1 FROM translations WHERE translation_id = ? AND chapter_number = ? LIMIT 1",
+                (translation_id, chapter_number),
+            )
+            for translation_id in translation_ids
+        )
+
+    def get_chapter_count(self) -> int:
+        """
+        Gets the number of chapters, fetching the chapters when they are not stored yet.
+        """
+
+        self.get_chapter(1)
+
+        return self.query("SELECT COUNT(*) FROM chapters", ())[0][0]
+
+    def store_chapters(self, chapters: list[tuple[int, str, int]]) -> None:
+        """
+        Stores the number, name and verse count of chapters.
+        """
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO chapters VALUES (?, ?, ?)", chapters
+            )
+
+    def store_chapter_text(self, chapter_number: int, verses: list[str]) -> None:
+        """
+        Stores the Uthmani text of every verse of a chapter, in verse order.
+        """
+
+        self.store_chapter(chapter_number, verses, {})
+
+    def store_chapter_translation(
+        self, chapter_number: int, translation_id: int, translations: list[str]
+    ) -> None:
+        """
+        Stores a translation of every verse of a chapter, in verse order.
+        """
+
+        self.store_chapter(chapter_number, None, {translation_id: translations})
+
+    def store_chapter(
+        self,
+        chapter_number: int,
+        verses: Optional[list[str]],
+        translations: dict[int, list[str]],
+    ) -> None:
+        """
+        Stores the Uthmani text and translations of every verse of a chapter,
+        in verse order, in a single transaction.
+
+        Parameters
+        ----------
+        chapter_number : int
+            The chapter number.
+        verses : Optional[list[str]]
+            The text of every verse, None to leave the stored text as it is.
+        translations : dict[int, list[str]]
+            The translation of every verse by translation id.
+        """
+
+        with self._lock, self._connection:
+            if verses is not None:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO verses VALUES (?, ?, ?)",
+                    [
+                        (chapter_number, verse_number, text)
+                        for verse_number, text in enumerate(verses, start=1)
+                    ],
+                )
+
+            for translation_id, translated_verses in translations.items():
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                    [
+                        (translation_id, chapter_number, verse_number, text)
+                        for verse_number, text in enumerate(translated_verses, start=1)
+                    ],
+                )
+
+    def prefetch_chapter(self, chapter_number: int, translation_ids: list[int]) -> None:
+        """
+        Fetches the text and the given translations of a chapter that are not
+        stored yet and stores them together, so an interrupted prefetch never
+        leaves a chapter with only part of them.
+
+        Parameters
+        ----------
+        chapter_number : int
+            The chapter number.
+        translation_ids : list[int]
+            The api.quran.com ids of the translations.
+        """
+
+        verses = None
+
+        if not self.query(
+            "SELECT 1 FROM verses WHERE chapter_number = ? LIMIT 1", (chapter_number,)
+        ):
+            verses = fetch_chapter_text(chapter_number)
+
+        missing_translation_ids = [
+            translation_id
+            for translation_id in dict.fromkeys(translation_ids)
+            if not self.query(
+                "SELECT 1 FROM translations WHERE translation_id = ? AND chapter_number = ? LIMIT 1",
+                (translation_id, chapter_number),
+            )
+        ]
+        translations = {}
+
+        if missing_translation_ids:
+            translations = dict(
+                zip(
+                    missing_translation_ids,
+                    fetch_chapter_translations(chapter_number, missing_translation_ids),
+                )
+            )
+
+        self.store_chapter(chapter_number, verses, translations)
+
+    def query(self, query: str, parameters: tuple) -> list[tuple]:
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def get_quran_corpus() -> QuranCorpus:
+    """
+    Gets the Qur'an corpus of the process.
+    """
+
+    global _quran_corpus
+
+    with _quran_corpus_lock:
+        if _quran_corpus is None:
+            _quran_corpus = QuranCorpus()
+
+        return _quran_corpus
+
+
+def fetch_chapters() -> list[tuple[int, str, int]]:
+    """
+    Fetches the number, name and verse count of every chapter from api.quran.com.
+    """
+
+    try:
+        response = get_quran_client().get_json("chapters")
+    except Exception as error:
+        raise Exception("Failed to fetch chapters.") from error
+
+    return [
+        (chapter["id"], chapter["name_simple"], chapter["verses_count"])
+        for chapter in response["chapters"]
+    ]
+
+
+def fetch_chapter_text(chapter_number: int) -> list[str]:
+    """
+    Fetches the Uthmani text of every verse of a chapter from api.quran.com.
+    """
+
+    try:
+        response = get_quran_client().get_json(
+            f"quran/verses/uthmani?chapter_number={chapter_number}"
+        )
+    except Exception as error:
+        raise Exception(f"Failed to fetch text for chapter {chapter_number}.") from error
+
+    return [verse["text_uthmani"] for verse in response["verses"]]
+
+
+def fetch_chapter_translations(
+    chapter_number: int, translation_ids: list[int]
+) -> list[list[str]]:
+    """
+    Fetches translations of every verse of a chapter from api.quran.com, all
+    translations at the same time.
+    """
+
+    try:
+        responses = get_quran_client().fetch_many(
+            [
+                f"quran/translations/{translation_id}?chapter_number={chapter_number}"
+                for translation_id in translation_ids
+            ]
+        )
+    except Exception as error:
+        raise Exception(
+            f"Failed to fetch translations {translation_ids} for chapter {chapter_number}."
+        ) from error
+
+    return [
+        [translation["text"] for translation in response["translations"]]
+        for response in responses
+    ]
+
+
+def get_chapter_name(chapter_number: int) -> str:
+    return get_quran_corpus().get_chapter_name(chapter_number)
+
+
+def get_chapter_verse_count(chapter_number: int) -> int:
+    return get_quran_corpus().get_verse_count(chapter_number)
+
+
+def get_chapter_text(chapter_number: int) -> list[str]:
+    return get_quran_corpus().get_chapter_text(chapter_number)
+
+
+def get_chapter_translation(chapter_number: int, translation_id: int) -> list[str]:
+    return get_quran_corpus().get_chapter_translation(chapter_number, translation_id)
+
+
+def get_chapter_translations(
+    chapter_number: int, translation_ids: list[int]
+) -> dict[int, list[str]]:
+    return get_quran_corpus().get_chapter_translations(chapter_number, translation_ids)
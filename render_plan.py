@@ -0,0 +1,133 @@
+import json
+
+from dataclasses import asdict, dataclass, field
+from typing import Optional, Union
+
+
+@dataclass
+class OverlaySpec:
+    kind: str
+    text: str
+    color: str
+    font: str
+    font_size: int
+    method: str
+    background_color: str
+    position: tuple[Union[float, str], Union[float, str]]
+    size: tuple[Union[float, None], Union[float, None]]
+    fade_duration: float
+    duration: float
+    start: float = 0.0
+
+
+@dataclass
+class SegmentPlan:
+    index: int
+    line: int
+    audio_start: str
+    audio_end: str
+    start: float
+    duration: float
+    text_duration: float
+    backgrounds: list[list[str, float, int, str]] = field(default_factory=list)
+    overlays: list[OverlaySpec] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SegmentPlan":
+        return cls(
+            **{
+                **data,
+                "backgrounds": [list(entry) for entry in data["backgrounds"]],
+                "overlays": [
+                    OverlaySpec(
+                        **{
+                            **overlay,
+                            "position": tuple(overlay["position"]),
+                            "size": tuple(overlay["size"]),
+                        }
+                    )
+                    for overlay in data["overlays"]
+                ],
+            }
+        )
+
+
+@dataclass
+class BackgroundVideoPlan:
+    path: str
+    start: str
+    horizontal_offset: Optional[int] = None
+    vertical_offset: Optional[int] = None
+
+
+@dataclass
+class RenderPlan:
+    """
+    Plain-data description of a video, produced before any moviepy object is built.
+
+    Timestamps are "MM:SS.mmm" strings like in the chapter CSV files, segment
+    starts and durations are in seconds relative to the start of the video.
+    """
+
+    output_file: str
+    audio_file: str
+    video_start: str
+    video_end: str
+    video_dimensions: tuple[int, int]
+    video_mode: str
+    clip_speed: float
+    fps: Optional[float]
+    shadow_color: tuple[int, int, int]
+    shadow_opacity: float
+    segments: list[SegmentPlan] = field(default_factory=list)
+    background_video: Optional[BackgroundVideoPlan] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RenderPlan":
+        return cls(
+            **{
+                **data,
+                "video_dimensions": tuple(data["video_dimensions"]),
+                "shadow_color": tuple(data["shadow_color"]),
+                "segments": [
+                    SegmentPlan.from_dict(segment) for segment in data["segments"]
+                ],
+                "background_video": BackgroundVideoPlan(**data["background_video"])
+                if data.get("background_video")
+                else None,
+            }
+        )
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=4)
+
+    @classmethod
+    def load(cls, path: str) -> "RenderPlan":
+        with open(path, "r", encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+    @property
+    def duration(self) -> float:
+        return sum(segment.duration for segment in self.segments)
+
+    def video_map(self) -> Union[dict[int, list[list[str, float, int, str]]], str]:
+        """
+        Gets the video map of the plan, or the background video path when a
+        single background video is used.
+        """
+
+        if self.background_video:
+            return self.background_video.path
+
+        return {
+            segment.index: segment.backgrounds
+            for segment in sorted(self.segments, key=lambda segment: segment.index)
+            if segment.backgrounds
+        }
@@ -0,0 +1,352 @@
+import contextlib
+import hashlib
+import json
+import os
+
+from clip_index import get_clip_metadata
+from threading import Lock
+from typing import Optional
+
+SEGMENT_CACHE_VERSION = 1
+DEFAULT_SEGMENT_CACHE_SIZE_LIMIT = 10 * 1024**3
+
+_file_hashes: dict[tuple[str, int, float], str] = {}
+_file_hashes_lock = Lock()
+
+
+class SegmentCache:
+    """
+    Content-addressed store of encoded segment files.
+
+    A segment is stored under the hash of everything that determines its
+    frames, so a re-render only has to encode the segments whose inputs changed.
+    The video map of the last render of the same inputs is stored next to the
+    segments, so a re-render plans the same background clips. The least
+    recently used files are removed when the cache grows over its size limit.
+    """
+
+    def __init__(
+        self, directory: str, size_limit: int = DEFAULT_SEGMENT_CACHE_SIZE_LIMIT
+    ):
+        self.directory = directory
+        self.size_limit = size_limit
+
+        self._lock = Lock()
+        self._size = None
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_key(
+        self,
+        render_plan_data: dict,
+        segment_data: dict,
+        frame_count: int,
+        encoder_settings: dict,
+    ) -> str:
+        """
+        Gets the cache key of a segment.
+
+        Parameters
+        ----------
+        render_plan_data : dict
+            The render plan.
+        segment_data : dict
+            The segment.
+        frame_count : int
+            The number of frames of the segment.
+        encoder_settings : dict
+            The codec settings the segment is encoded with.
+
+        Returns
+        -------
+        str
+            The cache key.
+        """
+
+        segment_inputs = {
+            key: value
+            for key, value in segment_data.items()
+            if key not in ("index", "line", "start")
+        }
+
+        key_data = {
+            "version": SEGMENT_CACHE_VERSION,
+            "video": {
+                key: render_plan_data[key]
+                for key in (
+                    "video_dimensions",
+                    "video_mode",
+                    "clip_speed",
+                    "fps",
+                    "shadow_color",
+                    "shadow_opacity",
+                )
+            },
+            "segment": segment_inputs,
+            "frame_count": frame_count,
+            "encoder": encoder_settings,
+            "fonts": {
+                overlay["font"]: get_file_hash(overlay["font"])
+                for overlay in segment_data["overlays"]
+            },
+            "backgrounds": [
+                get_file_signature(background[0])
+                for background in segment_data["backgrounds"]
+            ],
+        }
+
+        return hashlib.sha256(
+            json.dumps(key_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str) -> str or None:
+        """
+        Gets the cached segment file of a key.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        str or None
+            The path of the segment file, None if the segment is not cached.
+        """
+
+        path = self.get_path(key)
+
+        if not os.path.isfile(path):
+            return None
+
+        # Keep track of when a segment was last used
+        os.utime(path)
+
+        return path
+
+    def put(self, key: str, segment_file: str) -> str:
+        """
+        Moves an encoded segment file into the cache. Call trim once the
+        segments of a render are joined to keep the cache under its size limit.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        segment_file : str
+            The encoded segment file, on the same drive as the cache.
+
+        Returns
+        -------
+        str
+            The path of the cached segment file.
+        """
+
+        path = self.get_path(key)
+        self.replace_file(segment_file, path)
+
+        return path
+
+    def get_video_map_key(self, render_inputs: dict) -> str:
+        """
+        Gets the cache key of the video map of a render.
+
+        Parameters
+        ----------
+        render_inputs : dict
+            Everything the background clips of the render are planned for.
+
+        Returns
+        -------
+        str
+            The cache key.
+        """
+
+        key_data = {"version": SEGMENT_CACHE_VERSION, "inputs": render_inputs}
+
+        return hashlib.sha256(
+            json.dumps(key_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def get_video_map(self, key: str) -> Optional[dict]:
+        """
+        Gets the video map of the last render of a key.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        Optional[dict]
+            The video map, None if there was no render of the key yet.
+        """
+
+        path = self.get_video_map_path(key)
+
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                video_map = json.load(file)
+
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return video_map if isinstance(video_map, dict) else None
+
+    def put_video_map(self, key: str, video_map: dict) -> None:
+        """
+        Stores the video map of a render.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        video_map : dict
+            The video map.
+        """
+
+        path = self.get_video_map_path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+
+        try:
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(video_map, file, ensure_ascii=False)
+
+            self.replace_file(temporary_path, path)
+        finally:
+            if os.path.isfile(temporary_path):
+                os.remove(temporary_path)
+
+    def replace_file(self, source: str, path: str) -> None:
+        try:
+            previous_size = os.path.getsize(path)
+        except OSError:
+            previous_size = 0
+
+        os.replace(source, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.get_size()
+            else:
+                self._size += os.path.getsize(path) - previous_size
+
+    def trim(self) -> None:
+        """
+        Removes the least recently used files when the cache is over its size limit.
+        """
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.get_size()
+
+            if self._size > self.size_limit:
+                self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used files until the cache is at most 90%
+        of its size limit. Called with the lock held.
+        """
+
+        entries = []
+
+        for entry in self.get_entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if self._size <= self.size_limit * 0.9:
+                break
+
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+            self._size -= size
+
+    def get_size(self) -> int:
+        size = 0
+
+        for entry in self.get_entries():
+            with contextlib.suppress(OSError):
+                size += entry.stat().st_size
+
+        return size
+
+    def get_entries(self) -> list[os.DirEntry]:
+        # Temporary files of renders in progress are left alone
+        with os.scandir(self.directory) as entries:
+            return [
+                entry
+                for entry in entries
+                if entry.name.endswith((".mp4", ".json"))
+                and ".tmp." not in entry.name
+            ]
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp4")
+
+    def get_video_map_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get_temporary_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.{os.getpid()}.tmp.mp4")
+
+
+def get_file_hash(path: str) -> str:
+    """
+    Gets the SHA-256 hash of the contents of a file, memoized by size and
+    modification time.
+
+    Parameters
+    ----------
+    path : str
+        The path to the file.
+
+    Returns
+    -------
+    str
+        The hash of the file.
+    """
+
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+
+    with _file_hashes_lock:
+        file_hash = _file_hashes.get(key)
+
+    if file_hash is None:
+        file_hash_builder = hashlib.sha256()
+
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                file_hash_builder.update(chunk)
+
+        file_hash = file_hash_builder.hexdigest()
+
+        with _file_hashes_lock:
+            _file_hashes[key] = file_hash
+
+    return file_hash
+
+
+def get_file_signature(path: str) -> list:
+    """
+    Gets the size and modification time of a background clip from the clip index.
+
+    Background clips are too large to hash on every render, a changed clip gets
+    a new size or modification time.
+    """
+
+    metadata = get_clip_metadata(path)
+
+    return [path, metadata.file_size, metadata.modified_time]
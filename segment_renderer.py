@@ -0,0 +1,160 @@
+import os
+import subprocess
+
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+DEFAULT_SEGMENT_FPS = 30
+SEGMENT_CODEC = "libx264"
+SEGMENT_PRESET = "medium"
+SEGMENT_ENCODER_SETTINGS = {"codec": SEGMENT_CODEC, "preset": SEGMENT_PRESET}
+
+
+def get_segment_frame_ranges(
+    segment_bounds: list[tuple[float, float]], fps: float
+) -> list[tuple[int, int]]:
+    """
+    Gets the frames of every segment of a video.
+
+    Segment boundaries are rounded to frames on the timeline of the whole
+    video instead of per segment, so rounding errors do not add up and the
+    concatenated segments stay in sync with the audio.
+
+    Parameters
+    ----------
+    segment_bounds : list[tuple[float, float]]
+        The start and duration of every segment in seconds.
+    fps : float
+        The frame rate of the video.
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        The first frame and the frame count of every segment.
+    """
+
+    frame_ranges = []
+
+    for start, duration in segment_bounds:
+        start_frame = round(start * fps)
+        end_frame = round((start + duration) * fps)
+        frame_ranges.append((start_frame, max(end_frame - start_frame, 1)))
+
+    return frame_ranges
+
+
+def write_clip_frames(
+    clip,
+    output_file: str,
+    fps: float,
+    frame_count: int,
+    threads: int = None,
+) -> None:
+    """
+    Encodes exactly the given number of frames of a clip without audio.
+
+    Every segment of a video is written with the same codec settings, so the
+    segment files can be joined without re-encoding.
+
+    Parameters
+    ----------
+    clip : mpy.VideoClip
+        The clip to encode.
+    output_file : str
+        The path of the segment file.
+    fps : float
+        The frame rate of the video.
+    frame_count : int
+        The number of frames to write.
+    threads : int, optional
+        The number of encoder threads, by default None
+    """
+
+    writer = FFMPEG_VideoWriter(
+        output_file,
+        clip.size,
+        fps,
+        codec=SEGMENT_CODEC,
+        preset=SEGMENT_PRESET,
+        threads=threads,
+    )
+
+    try:
+        last_frame_time = max(clip.duration - 1e-6, 0) if clip.duration else None
+
+        for frame_number in range(frame_count):
+            frame_time = frame_number / fps
+
+            # Rounding to frames can make a segment one frame longer than its clip
+            if last_frame_time is not None:
+                frame_time = min(frame_time, last_frame_time)
+
+            writer.write_frame(clip.get_frame(frame_time))
+    finally:
+        writer.close()
+
+
+def concatenate_segment_files(
+    segment_files: list[str],
+    output_file: str,
+    audio_file: str = None,
+    audio_start: float = 0.0,
+    audio_end: float = None,
+) -> None:
+    """
+    Joins segment files with the ffmpeg concat demuxer without re-encoding and
+    muxes the audio once.
+
+    Parameters
+    ----------
+    segment_files : list[str]
+        The segment files in playback order.
+    output_file : str
+        The path of the video.
+    audio_file : str, optional
+        The audio file, by default None
+    audio_start : float, optional
+        The start of the audio in seconds, by default 0.0
+    audio_end : float, optional
+        The end of the audio in seconds, by default None
+    """
+
+    concat_list_file = f"{output_file}.concat.txt"
+
+    with open(concat_list_file, "w", encoding="utf-8") as file:
+        for segment_file in segment_files:
+            escaped_path = os.path.abspath(segment_file).replace("\\", "/")
+            escaped_path = escaped_path.replace("'", "'\\''")
+            file.write(f"file '{escaped_path}'\n")
+
+    command = [
+        get_setting("FFMPEG_BINARY"),
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        concat_list_file,
+    ]
+
+    if audio_file:
+        command += ["-ss", f"{audio_start:.3f}"]
+
+        if audio_end is not None:
+            command += ["-to", f"{audio_end:.3f}"]
+
+        command += ["-i", audio_file, "-map", "0:v", "-map", "1:a", "-c:a", "aac"]
+
+    command += ["-c:v", "copy", "-movflags", "+faststart", output_file]
+
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except subprocess.CalledProcessError as error:
+        raise RuntimeError(
+            f"Failed to concatenate segments: {error.stderr.decode(errors='ignore')}"
+        ) from error
+    finally:
+        os.remove(concat_list_file)
@@ -0,0 +1,211 @@
+import numpy as np
+import os
+import subprocess
+
+from compositor import SegmentCompositor
+from moviepy.config import get_setting
+from PIL import Image
+from segment_renderer import SEGMENT_CODEC, SEGMENT_PRESET
+
+STILL_TUNE = "stillimage"
+# Fast PNG compression, the images are only read back once by ffmpeg
+STILL_IMAGE_COMPRESSION = 1
+
+
+def get_still_runs(
+    compositor: SegmentCompositor, frame_count: int, fps: float, duration: float
+) -> list[tuple[float, int]]:
+    """
+    Splits the frames of a segment with a still background into runs of
+    identical frames.
+
+    Frames only differ while a text or the frame fades, so a segment is a few
+    long runs for the time its texts are shown or hidden and a run of a single
+    frame for every fade frame.
+
+    Parameters
+    ----------
+    compositor : SegmentCompositor
+        The compositor of the overlays of the segment.
+    frame_count : int
+        The number of frames of the segment.
+    fps : float
+        The frame rate of the video.
+    duration : float
+        The duration of the segment in seconds.
+
+    Returns
+    -------
+    list[tuple[float, int]]
+        The time of the first frame and the frame count of every run.
+    """
+
+    runs = []
+    last_state = None
+    last_frame_time = max(duration - 1e-6, 0)
+
+    for frame_number in range(frame_count):
+        # Rounding to frames can make a segment one frame longer than its overlays
+        frame_time = min(frame_number / fps, last_frame_time)
+        state = compositor.get_fade_state(frame_time)
+
+        if runs and state == last_state:
+            runs[-1] = (runs[-1][0], runs[-1][1] + 1)
+        else:
+            runs.append((frame_time, 1))
+            last_state = state
+
+    return runs
+
+
+def write_still_frames(
+    directory: str,
+    background: np.ndarray,
+    compositor: SegmentCompositor,
+    frame_count: int,
+    fps: float,
+    duration: float,
+    first_image: int = 0,
+) -> list[tuple[str, int]]:
+    """
+    Composites every run of identical frames of a segment with a still
+    background once and writes it as an image.
+
+    Parameters
+    ----------
+    directory : str
+        The directory the images are written to.
+    background : np.ndarray
+        The background frame, of the video size.
+    compositor : SegmentCompositor
+        The compositor of the overlays of the segment.
+    frame_count : int
+        The number of frames of the segment.
+    fps : float
+        The frame rate of the video.
+    duration : float
+        The duration of the segment in seconds.
+    first_image : int, optional
+        The number of the first image, so segments do not overwrite each
+        other's images, by default 0
+
+    Returns
+    -------
+    list[tuple[str, int]]
+        The path and the frame count of every image.
+    """
+
+    images = []
+
+    for image_number, (frame_time, run_frame_count) in enumerate(
+        get_still_runs(compositor, frame_count, fps, duration), start=first_image
+    ):
+        path = os.path.join(directory, f"{image_number:06d}.png")
+        Image.fromarray(compositor.composite(background, frame_time)).save(
+            path, compress_level=STILL_IMAGE_COMPRESSION
+        )
+        images.append((path, run_frame_count))
+
+    return images
+
+
+def encode_still_frames(
+    images: list[tuple[str, int]],
+    output_file: str,
+    fps: float,
+    audio_file: str = None,
+    audio_start: float = 0.0,
+    audio_end: float = None,
+) -> None:
+    """
+    Encodes images that are each shown for a number of frames, and muxes the
+    audio.
+
+    The images are looped by the ffmpeg concat demuxer and the video is
+    written at a constant frame rate, so x264 encodes the repeated frames of
+    an image as skipped blocks.
+
+    Parameters
+    ----------
+    images : list[tuple[str, int]]
+        The path and the frame count of every image in playback order.
+    output_file : str
+        The path of the video.
+    fps : float
+        The frame rate of the video.
+    audio_file : str, optional
+        The audio file, by default None
+    audio_start : float, optional
+        The start of the audio in seconds, by default 0.0
+    audio_end : float, optional
+        The end of the audio in seconds, by default None
+    """
+
+    concat_list_file = f"{output_file}.stills.txt"
+    frame_number = 0
+
+    with open(concat_list_file, "w", encoding="utf-8") as file:
+        file.write("ffconcat version 1.0\n")
+
+        for path, frame_count in images:
+            escaped_path = os.path.abspath(path).replace("\\", "/")
+            escaped_path = escaped_path.replace("'", "'\\''")
+
+            # Durations are taken from the timeline, so their rounding errors do not add up
+            duration = round((frame_number + frame_count) / fps, 6) - round(
+                frame_number / fps, 6
+            )
+            file.write(f"file '{escaped_path}'\nduration {duration:.6f}\n")
+            frame_number += frame_count
+
+        # The duration of the last image only applies when it is listed again
+        if images:
+            file.write(f"file '{escaped_path}'\n")
+
+    command = [
+        get_setting("FFMPEG_BINARY"),
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        concat_list_file,
+    ]
+
+    if audio_file:
+        command += ["-ss", f"{audio_start:.3f}"]
+
+        if audio_end is not None:
+            command += ["-to", f"{audio_end:.3f}"]
+
+        command += ["-i", audio_file, "-map", "0:v", "-map", "1:a", "-c:a", "aac"]
+
+    command += [
+        "-vf",
+        f"fps={fps}",
+        "-frames:v",
+        str(frame_number),
+        "-c:v",
+        SEGMENT_CODEC,
+        "-preset",
+        SEGMENT_PRESET,
+        "-tune",
+        STILL_TUNE,
+        "-pix_fmt",
+        "yuv420p",
+        "-movflags",
+        "+faststart",
+        output_file,
+    ]
+
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except subprocess.CalledProcessError as error:
+        raise RuntimeError(
+            f"Failed to encode still images: {error.stderr.decode(errors='ignore')}"
+        ) from error
+    finally:
+        os.remove(concat_list_file)
@@ -0,0 +1,69 @@
+import os
+import pytest
+
+from chapter_sheet import ChapterSheet
+
+CONTENTS = "verse,ar,timestamps\r\n1,a,00:00:01.000\r\n2,b,00:00:02.000\r\n"
+
+
+@pytest.fixture
+def chapter_csv_file(tmp_path) -> str:
+    path = os.path.join(tmp_path, "chapter.csv")
+
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        file.write(CONTENTS)
+
+    return path
+
+
+def test_saving_an_unchanged_sheet_does_not_write(chapter_csv_file):
+    os.utime(chapter_csv_file, (1, 1))
+    chapter_sheet = ChapterSheet.load(chapter_csv_file)
+
+    assert not chapter_sheet.save()
+    assert os.stat(chapter_csv_file).st_mtime == 1
+
+
+def test_empty_rows_are_dropped(chapter_csv_file):
+    chapter_sheet = ChapterSheet.load(chapter_csv_file)
+    chapter_sheet.rows.insert(1, {"verse": "", "ar": " ", "timestamps": None})
+    chapter_sheet.rows.append({"verse": "3"})
+
+    assert chapter_sheet.save()
+    assert ChapterSheet.load(chapter_csv_file).rows == [
+        {"verse": "1", "ar": "a", "timestamps": "00:00:01.000"},
+        {"verse": "2", "ar": "b", "timestamps": "00:00:02.000"},
+        {"verse": "3", "ar": "", "timestamps": ""},
+    ]
+
+
+def test_add_column_before_an_existing_column(chapter_csv_file):
+    chapter_sheet = ChapterSheet.load(chapter_csv_file)
+    chapter_sheet.add_column("en", before="timestamps")
+    chapter_sheet.add_column("en", before="verse")
+    chapter_sheet.add_column("nl", before="missing")
+
+    assert chapter_sheet.field_names == ["verse", "ar", "en", "timestamps", "nl"]
+
+    chapter_sheet.save()
+
+    with open(chapter_csv_file, "r", encoding="utf-8", newline="") as file:
+        assert file.readline() == "verse,ar,en,timestamps,nl\r\n"
+
+
+def test_failed_write_leaves_no_file_behind(chapter_csv_file, monkeypatch):
+    chapter_sheet = ChapterSheet.load(chapter_csv_file)
+    chapter_sheet.rows[0]["ar"] = "c"
+
+    def replace(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", replace)
+
+    with pytest.raises(OSError):
+        chapter_sheet.save()
+
+    assert os.listdir(os.path.dirname(chapter_csv_file)) == ["chapter.csv"]
+
+    with open(chapter_csv_file, "r", encoding="utf-8", newline="") as file:
+        assert file.read() == CONTENTS
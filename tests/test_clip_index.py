@@ -0,0 +1,82 @@
+import clip_index
+import os
+import pytest
+
+from clip_index import (
+    CLIP_INDEX_FILE_NAME,
+    ClipMetadata,
+    get_clip_keyframe_interval,
+    get_clip_metadata,
+)
+
+
+@pytest.fixture
+def probed_paths(monkeypatch):
+    paths = []
+
+    def probe_clip(path):
+        paths.append(path)
+        stat = os.stat(path)
+
+        return ClipMetadata(
+            path, 10.0, 1920, 1080, 30.0, "h264", None, stat.st_size, stat.st_mtime
+        )
+
+    monkeypatch.setattr(clip_index, "probe_clip", probe_clip)
+    monkeypatch.setattr(clip_index, "_clip_indexes", {})
+
+    return paths
+
+
+def create_clips(directory, count: int) -> list[str]:
+    paths = []
+
+    for clip in range(count):
+        path = os.path.join(directory, f"{clip}.mp4").replace("\\", "/")
+
+        with open(path, "wb") as file:
+            file.write(b"0")
+
+        paths.append(path)
+
+    return paths
+
+
+def test_metadata_without_an_index_file_only_probes_the_clip(tmp_path, probed_paths):
+    paths = create_clips(tmp_path, 5)
+
+    assert get_clip_metadata(paths[2]).duration == 10.0
+    assert get_clip_metadata(paths[2]).width == 1920
+    assert probed_paths == [paths[2]]
+    assert not os.path.exists(os.path.join(tmp_path, CLIP_INDEX_FILE_NAME))
+
+
+def test_metadata_with_an_index_file_loads_the_directory_index(tmp_path, probed_paths):
+    paths = create_clips(tmp_path, 3)
+    clip_index.get_clip_index([str(tmp_path).replace("\\", "/")])
+    probed_paths.clear()
+    # Like a worker process, which has no index loaded yet
+    clip_index._clip_indexes.clear()
+
+    assert get_clip_metadata(paths[1]).duration == 10.0
+    # Every clip was stored in the index file, none is probed again
+    assert probed_paths == []
+
+
+def test_keyframe_interval_is_only_scanned_when_needed(tmp_path, probed_paths, monkeypatch):
+    paths = create_clips(tmp_path, 1)
+    scanned_paths = []
+
+    def probe_keyframe_interval(path):
+        scanned_paths.append(path)
+
+        return 2.0
+
+    monkeypatch.setattr(clip_index, "probe_keyframe_interval", probe_keyframe_interval)
+
+    assert get_clip_metadata(paths[0]).keyframe_interval is None
+    assert scanned_paths == []
+
+    assert get_clip_keyframe_interval(paths[0]) == 2.0
+    assert get_clip_keyframe_interval(paths[0]) == 2.0
+    assert scanned_paths == [paths[0]]
@@ -0,0 +1,110 @@
+import pytest
+
+from clip_planner import DURATION_TOLERANCE, BackgroundClipPlanner
+from clip_sampler import BackgroundClipSampler, BackgroundClipsExhaustedError
+from types import SimpleNamespace
+
+
+class FakeClipIndex:
+    def __init__(
+        self, durations: dict[str, float], width: int = 1920, widths=None
+    ):
+        self.durations = durations
+        self.width = width
+        self.widths = widths or {}
+
+    def duration(self, path: str, speed: float = 1.0) -> float:
+        return self.durations[path] / speed
+
+    def get(self, path: str):
+        return SimpleNamespace(width=self.widths.get(path, self.width))
+
+
+def create_planner(
+    durations, minimum_clip_duration=2.0, clip_speed=1.0, seed=1, widths=None
+):
+    clip_index = FakeClipIndex(durations, widths=widths)
+    sampler = BackgroundClipSampler(list(durations), seed=seed)
+
+    return BackgroundClipPlanner(
+        clip_index,
+        sampler,
+        clip_speed=clip_speed,
+        minimum_clip_duration=minimum_clip_duration,
+        video_width=576,
+        allow_mirrored_clips=True,
+        seed=seed,
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("duration", [0.5, 2.0, 3.9, 4.01, 7.3, 25.0])
+def test_plans_follow_the_minimum_clip_duration(seed, duration):
+    durations = {f"clip_{number}.mp4": 1.5 + number * 1.3 for number in range(12)}
+    planner = create_planner(durations, minimum_clip_duration=2.0, seed=seed)
+
+    background_clips = planner.plan(duration)
+    remaining_duration = duration
+
+    for clip_path, time_offset, horizontal_offset, mirrored in background_clips:
+        clip_duration = durations[clip_path]
+        used_duration = min(remaining_duration, clip_duration - time_offset)
+
+        assert 0 <= time_offset <= clip_duration
+        assert round(time_offset * 100) == pytest.approx(time_offset * 100)
+        assert 0 <= horizontal_offset <= 1920 - 576
+        assert mirrored in ("True", "False")
+
+        # Every clip is shown for at least the minimum duration, unless the
+        # whole video clip is shorter than that
+        assert used_duration >= min(2.0, duration) - DURATION_TOLERANCE
+
+        remaining_duration -= used_duration
+
+    assert remaining_duration == pytest.approx(0, abs=DURATION_TOLERANCE)
+
+
+def test_plans_do_not_repeat_clips_until_exhausted():
+    durations = {f"clip_{number}.mp4": 10.0 for number in range(6)}
+    planner = create_planner(durations, minimum_clip_duration=2.0)
+
+    clip_paths = [
+        clip_path
+        for _ in range(6)
+        for clip_path, *_ in planner.plan(3.0)
+    ]
+
+    assert len(clip_paths) == len(set(clip_paths))
+
+
+def test_raises_when_no_clip_is_long_enough():
+    planner = create_planner({"short.mp4": 1.0}, minimum_clip_duration=2.0)
+
+    with pytest.raises(BackgroundClipsExhaustedError):
+        planner.plan(3.0)
+
+
+def test_clip_speed_shortens_clips():
+    planner = create_planner({"clip.mp4": 3.0}, minimum_clip_duration=2.0, clip_speed=2.0)
+
+    with pytest.raises(BackgroundClipsExhaustedError):
+        planner.plan(2.0)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_narrow_clips_are_never_planned(seed):
+    durations = {f"clip_{number}.mp4": 10.0 for number in range(6)}
+    widths = {"clip_0.mp4": 480, "clip_3.mp4": 575}
+    planner = create_planner(durations, seed=seed, widths=widths)
+
+    for _ in range(4):
+        for clip_path, _, horizontal_offset, _ in planner.plan(12.0):
+            assert clip_path not in widths
+            assert 0 <= horizontal_offset <= 1920 - 576
+
+
+def test_only_narrow_clips_raise():
+    planner = create_planner({"clip.mp4": 10.0}, widths={"clip.mp4": 480})
+
+    with pytest.raises(BackgroundClipsExhaustedError):
+        planner.plan(4.0)
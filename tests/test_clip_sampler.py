@@ -0,0 +1,65 @@
+import pytest
+
+from clip_sampler import BackgroundClipSampler, BackgroundClipsExhaustedError
+
+CLIP_PATHS = [f"clip_{number}.mp4" for number in range(10)]
+
+
+def test_draws_every_clip_once_before_recycling():
+    sampler = BackgroundClipSampler(CLIP_PATHS, seed=1)
+
+    drawn_clip_paths = [sampler.draw() for _ in CLIP_PATHS]
+
+    assert sorted(drawn_clip_paths) == sorted(CLIP_PATHS)
+    assert sampler.recycle_count == 0
+
+    sampler.draw()
+
+    assert sampler.recycle_count == 1
+
+
+def test_raises_when_exhausted_without_recycling():
+    sampler = BackgroundClipSampler(CLIP_PATHS, recycle_when_exhausted=False, seed=1)
+
+    for _ in CLIP_PATHS:
+        sampler.draw()
+
+    with pytest.raises(BackgroundClipsExhaustedError):
+        sampler.draw()
+
+
+def test_keeps_rejected_unused_clips_in_the_deck():
+    sampler = BackgroundClipSampler(["long_1", "long_2", "short"], seed=1)
+
+    def is_long(clip_path):
+        return clip_path.startswith("long")
+
+    first_clip_paths = {sampler.draw(is_long), sampler.draw(is_long)}
+
+    # Only used clips fit, a single one is drawn again without recycling the deck
+    assert sampler.draw(is_long) in first_clip_paths
+    assert sampler.recycle_count == 0
+
+    # The unused clip is still drawn before the deck is recycled
+    assert sampler.draw() == "short"
+    assert sampler.recycle_count == 0
+
+
+def test_raises_when_no_clip_fits():
+    sampler = BackgroundClipSampler(CLIP_PATHS, seed=1)
+
+    with pytest.raises(BackgroundClipsExhaustedError):
+        sampler.draw(lambda clip_path: False)
+
+
+def test_marked_and_released_clips():
+    sampler = BackgroundClipSampler(CLIP_PATHS, seed=1)
+    sampler.mark_used("clip_0.mp4")
+
+    drawn_clip_paths = [sampler.draw() for _ in range(len(CLIP_PATHS) - 1)]
+
+    assert "clip_0.mp4" not in drawn_clip_paths
+
+    sampler.release(drawn_clip_paths[0])
+
+    assert sampler.draw() == drawn_clip_paths[0]
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+import random
+
+from compositor import (
+    FadeEnvelope,
+    FlattenedRegion,
+    IntervalIndex,
+    OverlayLayer,
+    SegmentCompositor,
+    blend_region,
+    divide_by_255,
+    get_fade_factor,
+)
+
+
+def test_divide_by_255_rounds_to_nearest():
+    values = np.arange(255 * 255 + 1, dtype=np.uint16)
+    expected = np.round(values / 255).astype(np.uint16)
+
+    divide_by_255(values, np.empty_like(values))
+
+    assert np.array_equal(values, expected)
+
+
+@pytest.mark.parametrize("fade_step", [0, 1, 64, 128, 200, 255, 256])
+def test_blend_matches_a_float_reference(fade_step):
+    generator = np.random.default_rng(fade_step)
+    alpha = generator.random((24, 32, 1))
+    color = generator.random((24, 32, 3)) * 255 * alpha
+    frame = generator.integers(0, 256, (24, 32, 3), dtype=np.uint8)
+
+    region = FlattenedRegion.from_layer(slice(0, 24), slice(0, 32), color, alpha)
+    blended_frame = frame.copy()
+    blend_region(blended_frame, region, fade_step)
+
+    fade = fade_step / 256
+    expected = frame * (1 - fade * alpha) + fade * color
+
+    assert np.abs(blended_frame.astype(np.float64) - expected).max() <= 2
+
+
+def test_fade_envelope_matches_the_fade_factor():
+    fps = 30
+    fade_envelope = FadeEnvelope(1.0, 2.0, 0.5, fps)
+
+    for frame in range(0, 4 * fps):
+        t = frame / fps
+        expected = round(get_fade_factor(t - 1.0, 2.0, 0.5) * 256)
+
+        assert fade_envelope.get_step(t) == expected
+
+    assert fade_envelope.get_step(0.0) == 0
+    assert fade_envelope.get_step(2.0) == 256
+    # Times between frames are computed instead of looked up
+    assert fade_envelope.get_step(1.01) == round(get_fade_factor(0.01, 2.0, 0.5) * 256)
+
+
+def test_interval_index_matches_a_linear_scan():
+    generator = random.Random(1)
+    intervals = []
+
+    for item in range(200):
+        start = generator.uniform(0, 100)
+        intervals.append((start, start + generator.uniform(0.1, 8), item))
+
+    interval_index = IntervalIndex(intervals)
+
+    for _ in range(1000):
+        t = generator.uniform(-5, 110)
+        expected = sorted(
+            (start, item) for start, end, item in intervals if start <= t < end
+        )
+
+        assert interval_index.get_active(t) == [item for _, item in expected]
+
+
+def test_compositor_fade_state_only_changes_during_fades():
+    image = np.zeros((10, 10, 4), dtype=np.uint8)
+    image[2:8, 2:8] = (255, 255, 255, 255)
+    compositor = SegmentCompositor(
+        (40, 30),
+        (0, 0, 0),
+        0.5,
+        [OverlayLayer(image=image, x=5, y=5, start=0.0, duration=2.0, fade_duration=0.5)],
+        fps=10,
+    )
+
+    fade_states = [compositor.get_fade_state(frame / 10) for frame in range(20)]
+
+    # 5 frames fading in, then the same state until the fade out starts
+    assert len(set(fade_states[5:16])) == 1
+    assert len(set(fade_states[:6])) == 6
+
+    frame = np.full((30, 40, 3), 200, dtype=np.uint8)
+    composited_frame = compositor.composite(frame, 1.0)
+
+    assert tuple(composited_frame[0, 0]) == (100, 100, 100)
+    assert tuple(composited_frame[10, 10]) == (255, 255, 255)
@@ -0,0 +1,71 @@
+import numpy as np
+import overlay_cache
+import text_renderer
+
+from overlay_cache import OverlayCache, get_text_image, prerender_text_images
+from types import SimpleNamespace
+
+
+def test_put_of_an_existing_key_counts_the_size_difference(tmp_path):
+    cache = OverlayCache(str(tmp_path), size_limit=1024**2)
+    generator = np.random.default_rng(0)
+
+    cache.put("a", np.zeros((8, 8, 4), dtype=np.uint8))
+    cache.put("b", np.zeros((8, 8, 4), dtype=np.uint8))
+    cache.put("b", generator.integers(0, 256, (64, 64, 4), dtype=np.uint8))
+
+    assert cache._size == cache.get_size()
+    assert np.array_equal(cache.get("a"), np.zeros((8, 8, 4), dtype=np.uint8))
+
+
+def test_prerender_without_the_cache_keeps_the_images_in_memory(tmp_path, monkeypatch):
+    rendered_texts = []
+
+    def render(text, *args):
+        rendered_texts.append(text)
+
+        return np.full((4, 4, 4), len(rendered_texts), dtype=np.uint8)
+
+    font = str(tmp_path / "font.ttf")
+
+    with open(font, "wb") as file:
+        file.write(b"font")
+
+    monkeypatch.setattr(
+        overlay_cache, "get_text_renderer", lambda: SimpleNamespace(render=render)
+    )
+    monkeypatch.setattr(overlay_cache, "render_text", render)
+    monkeypatch.setattr(overlay_cache, "_overlay_cache_enabled", False)
+    monkeypatch.setattr(overlay_cache, "_prerendered_images", {})
+
+    text = (font, 20, "white", "transparent", "caption", (None, None))
+
+    assert prerender_text_images([("a", *text), ("b", *text), ("a", *text)]) == 2
+    assert rendered_texts == ["a", "b"]
+
+    assert get_text_image("b", *text)[0, 0, 0] == 2
+    assert rendered_texts == ["a", "b"]
+
+    # Texts that were not prerendered are still rendered
+    assert get_text_image("c", *text)[0, 0, 0] == 3
+
+
+def test_key_depends_on_the_layout_engine(tmp_path, monkeypatch):
+    font = str(tmp_path / "font.ttf")
+
+    with open(font, "wb") as file:
+        file.write(b"font")
+
+    text = ("a", font, 20, "white", "transparent", "caption", (None, None))
+
+    text_renderer.get_renderer_identity.cache_clear()
+    monkeypatch.setattr(text_renderer, "HAS_RAQM", False)
+    key = overlay_cache.get_text_image_key(*text)
+
+    text_renderer.get_renderer_identity.cache_clear()
+    monkeypatch.setattr(text_renderer, "HAS_RAQM", True)
+    raqm_key = overlay_cache.get_text_image_key(*text)
+
+    text_renderer.get_renderer_identity.cache_clear()
+
+    assert key != raqm_key
@@ -0,0 +1,59 @@
+import pytest
+import quran_corpus
+
+from quran_corpus import QuranCorpus
+
+
+def fail_to_fetch(*args):
+    raise Exception("Failed to fetch.")
+
+
+def test_prefetch_stores_text_and_translations(tmp_path, monkeypatch):
+    corpus = QuranCorpus(str(tmp_path / "quran.sqlite"))
+    monkeypatch.setattr(quran_corpus, "fetch_chapter_text", lambda _: ["a", "b"])
+    monkeypatch.setattr(
+        quran_corpus,
+        "fetch_chapter_translations",
+        lambda _, translation_ids: [
+            [f"{translation_id} a", f"{translation_id} b"]
+            for translation_id in translation_ids
+        ],
+    )
+
+    corpus.prefetch_chapter(1, [20, 85])
+
+    assert corpus.contains_chapter(1, [20, 85])
+    assert corpus.get_chapter_text(1) == ["a", "b"]
+    assert corpus.get_chapter_translation(1, 85) == ["85 a", "85 b"]
+
+
+def test_failed_prefetch_stores_nothing(tmp_path, monkeypatch):
+    corpus = QuranCorpus(str(tmp_path / "quran.sqlite"))
+    monkeypatch.setattr(quran_corpus, "fetch_chapter_text", lambda _: ["a", "b"])
+    monkeypatch.setattr(quran_corpus, "fetch_chapter_translations", fail_to_fetch)
+
+    with pytest.raises(Exception):
+        corpus.prefetch_chapter(1, [20])
+
+    assert not corpus.query("SELECT 1 FROM verses WHERE chapter_number = 1", ())
+
+
+def test_prefetch_only_fetches_what_is_missing(tmp_path, monkeypatch):
+    corpus = QuranCorpus(str(tmp_path / "quran.sqlite"))
+    corpus.store_chapter_text(1, ["a", "b"])
+    fetched_translation_ids = []
+
+    def fetch_chapter_translations(chapter_number, translation_ids):
+        fetched_translation_ids.extend(translation_ids)
+
+        return [["a", "b"] for _ in translation_ids]
+
+    monkeypatch.setattr(quran_corpus, "fetch_chapter_text", fail_to_fetch)
+    monkeypatch.setattr(
+        quran_corpus, "fetch_chapter_translations", fetch_chapter_translations
+    )
+
+    corpus.prefetch_chapter(1, [20])
+
+    assert fetched_translation_ids == [20]
+    assert corpus.contains_chapter(1, [20])
@@ -0,0 +1,71 @@
+import os
+
+from segment_cache import SegmentCache
+
+
+def write_segment(cache: SegmentCache, directory, key: str, size: int, mtime: int) -> str:
+    segment_file = os.path.join(directory, f"{key}.encoded.mp4")
+
+    with open(segment_file, "wb") as file:
+        file.write(b"0" * size)
+
+    path = cache.put(key, segment_file)
+    os.utime(path, (mtime, mtime))
+
+    return path
+
+
+def test_video_map_round_trips(tmp_path):
+    cache = SegmentCache(str(tmp_path))
+    key = cache.get_video_map_key({"audio_file": "a.mp3", "loop_range": [1, 4]})
+    video_map = {"1": [["Background_Clips/a.mp4", 0.5, 12, "True"]]}
+
+    assert cache.get_video_map(key) is None
+
+    cache.put_video_map(key, video_map)
+
+    assert cache.get_video_map(key) == video_map
+    assert cache.get_video_map_key({"loop_range": [1, 4], "audio_file": "a.mp3"}) == key
+    assert cache.get_video_map_key({"audio_file": "a.mp3", "loop_range": [1, 5]}) != key
+
+
+def test_trim_removes_least_recently_used_segments(tmp_path):
+    cache = SegmentCache(str(tmp_path), size_limit=250)
+
+    oldest = write_segment(cache, tmp_path, "a", 100, 1)
+    reused = write_segment(cache, tmp_path, "b", 100, 2)
+    newest = write_segment(cache, tmp_path, "c", 100, 3)
+
+    # Reusing a segment makes it the most recently used one
+    assert cache.get("b") == reused
+
+    cache.trim()
+
+    assert not os.path.exists(oldest)
+    assert os.path.exists(reused)
+    assert os.path.exists(newest)
+    assert cache.get_size() == 200
+
+
+def test_put_of_an_existing_key_counts_the_size_difference(tmp_path):
+    cache = SegmentCache(str(tmp_path), size_limit=1000)
+
+    write_segment(cache, tmp_path, "a", 100, 1)
+    write_segment(cache, tmp_path, "b", 100, 2)
+    write_segment(cache, tmp_path, "b", 300, 3)
+
+    assert cache._size == cache.get_size() == 400
+
+
+def test_trim_leaves_temporary_files_alone(tmp_path):
+    cache = SegmentCache(str(tmp_path), size_limit=50)
+    temporary_path = cache.get_temporary_path("a")
+
+    with open(temporary_path, "wb") as file:
+        file.write(b"0" * 100)
+
+    write_segment(cache, tmp_path, "b", 100, 1)
+    cache.trim()
+
+    assert os.path.exists(temporary_path)
+    assert cache.get_size() == 0
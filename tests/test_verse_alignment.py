@@ -0,0 +1,52 @@
+from verse_alignment import MATCH_THRESHOLD, VerseAligner
+
+VERSES = [
+    (1, "the quick brown fox jumps over the lazy dog"),
+    (2, "a journey of a thousand miles begins with a single step"),
+    (3, "all that glitters is not gold"),
+]
+
+
+def test_aligns_parts_of_verses_in_order():
+    verse_aligner = VerseAligner(VERSES)
+
+    assert verse_aligner.align("the quick brown fox") == 1
+    assert verse_aligner.align("jumps over the lazy dog") == 1
+    assert verse_aligner.align("a journey of a thousand miles") == 2
+    assert verse_aligner.align("begins with a single step") == 2
+    assert verse_aligner.align("all that glitters is not gold") == 3
+
+
+def test_alignment_is_monotonic():
+    verse_aligner = VerseAligner(VERSES)
+
+    assert verse_aligner.align("a journey of a thousand miles begins with a single step") == 2
+
+    # Verses before the position are not matched again
+    assert verse_aligner.align("the quick brown fox jumps over the lazy dog") is None
+    assert verse_aligner.align("all that glitters is not gold") == 3
+
+
+def test_repeated_rows_match_the_rest_of_the_verse():
+    verse_aligner = VerseAligner(VERSES)
+
+    assert verse_aligner.align("the quick brown fox") == 1
+    # A reciter repeating the start of a verse before continuing it
+    assert verse_aligner.align("the quick brown fox") is None
+    assert verse_aligner.align("jumps over the lazy dog") == 1
+
+
+def test_keeps_the_match_threshold():
+    verse_aligner = VerseAligner(VERSES)
+
+    # One changed letter in 19 is a ratio of 95, well above the threshold
+    assert verse_aligner.align("the quick brawn fox") == 1
+    assert verse_aligner.align("something else entirely") is None
+    assert verse_aligner.align("") is None
+    assert MATCH_THRESHOLD == 84
+
+
+def test_skips_verses_shorter_than_the_text():
+    verse_aligner = VerseAligner([(1, "short"), (2, "a much longer verse text")])
+
+    assert verse_aligner.align("a much longer") == 2
@@ -0,0 +1,289 @@
+import numpy as np
+import PIL
+
+from functools import lru_cache
+from importlib import metadata
+from PIL import Image, ImageColor, ImageDraw, ImageFont, features
+from threading import Lock
+from typing import Optional, Union
+
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+except ImportError:
+    arabic_reshaper = None
+    get_display = None
+
+# raqm shapes Arabic and reorders right-to-left text itself
+HAS_RAQM = features.check("raqm")
+
+
+class TextRenderer:
+    """
+    Rasterizes text to RGBA images with Pillow and FreeType, like ImageMagick's
+    label and caption methods used by mpy.TextClip.
+
+    A renderer keeps its fonts loaded, so rendering many texts with the same
+    fonts only lays them out.
+    """
+
+    def __init__(self):
+        # FreeType faces are not safe to use from several threads at once
+        self._lock = Lock()
+        self._get_font = lru_cache(maxsize=None)(
+            lambda path, size: ImageFont.truetype(
+                path,
+                size,
+                layout_engine=ImageFont.Layout.RAQM
+                if HAS_RAQM
+                else ImageFont.Layout.BASIC,
+            )
+        )
+
+    def render(
+        self,
+        text: str,
+        font: str,
+        font_size: int,
+        color: str,
+        background_color: str = "transparent",
+        method: str = "caption",
+        size: tuple[Optional[float], Optional[float]] = (None, None),
+    ) -> np.ndarray:
+        """
+        Renders text to an RGBA image.
+
+        Parameters
+        ----------
+        text : str
+            The text.
+        font : str
+            The path to the font file.
+        font_size : int
+            The font size in pixels.
+        color : str
+            The color of the text, in any format Pillow understands.
+        background_color : str, optional
+            The background color, by default "transparent"
+        method : str, optional
+            "caption" wraps the text to the width of the size, "label" keeps
+            every line of the text on one line, by default "caption"
+        size : tuple[Optional[float], Optional[float]], optional
+            The size of the image, a None dimension fits the text, by default (None, None)
+
+        Returns
+        -------
+        np.ndarray
+            The image as an RGBA array of shape (height, width, 4).
+        """
+
+        with self._lock:
+            return self.render_unlocked(
+                text, font, font_size, color, background_color, method, size
+            )
+
+    def render_unlocked(
+        self,
+        text: str,
+        font: str,
+        font_size: int,
+        color: str,
+        background_color: str,
+        method: str,
+        size: tuple[Optional[float], Optional[float]],
+    ) -> np.ndarray:
+        image_font = self._get_font(font, int(font_size))
+        width, height = (int(dimension) if dimension else None for dimension in size)
+
+        if method == "caption" and width:
+            lines = [
+                wrapped_line
+                for line in text.split("\n")
+                for wrapped_line in self.wrap(line, image_font, width)
+            ]
+        else:
+            lines = text.split("\n")
+
+        lines = [get_visual_text(line) for line in lines]
+
+        ascent, descent = image_font.getmetrics()
+        line_height = ascent + descent
+
+        # Diacritics can reach above the ascent and below the descent of the font
+        bounding_boxes = [
+            image_font.getbbox(line) if line else (0, 0, 0, 0) for line in lines
+        ]
+        top = min(
+            [0]
+            + [
+                line_number * line_height + bounding_box[1]
+                for line_number, bounding_box in enumerate(bounding_boxes)
+            ]
+        )
+        bottom = max(
+            [len(lines) * line_height]
+            + [
+                line_number * line_height + bounding_box[3]
+                for line_number, bounding_box in enumerate(bounding_boxes)
+            ]
+        )
+        line_widths = [image_font.getlength(line) for line in lines]
+
+        text_width = int(np.ceil(max(line_widths, default=0)))
+        text_height = bottom - top
+        width = width or max(text_width, 1)
+        height = height or max(text_height, 1)
+
+        image = Image.new("RGBA", (width, height), get_color(background_color))
+        draw = ImageDraw.Draw(image)
+        y_offset = (height - text_height) / 2 - top
+
+        for line_number, (line, line_width) in enumerate(zip(lines, line_widths)):
+            if not line:
+                continue
+
+            draw.text(
+                ((width - line_width) / 2, y_offset + line_number * line_height),
+                line,
+                font=image_font,
+                fill=get_color(color),
+            )
+
+        return np.array(image)
+
+    def wrap(
+        self, text: str, image_font: ImageFont.FreeTypeFont, width: int
+    ) -> list[str]:
+        """
+        Wraps a line of text on word boundaries to the given width.
+
+        The text is wrapped in logical order and measured the way it is drawn,
+        so right-to-left text wraps correctly.
+        """
+
+        lines = []
+        current_line = ""
+
+        for word in text.split():
+            candidate_line = f"{current_line} {word}" if current_line else word
+
+            if (
+                current_line
+                and image_font.getlength(get_visual_text(candidate_line)) > width
+            ):
+                lines.append(current_line)
+                current_line = word
+            else:
+                current_line = candidate_line
+
+        lines.append(current_line)
+
+        return lines
+
+
+_text_renderer = None
+
+
+def get_text_renderer() -> TextRenderer:
+    """
+    Gets the text renderer of the process.
+    """
+
+    global _text_renderer
+
+    if _text_renderer is None:
+        _text_renderer = TextRenderer()
+
+    return _text_renderer
+
+
+def render_text(
+    text: str,
+    font: str,
+    font_size: int,
+    color: str,
+    background_color: str = "transparent",
+    method: str = "caption",
+    size: tuple[Optional[float], Optional[float]] = (None, None),
+) -> np.ndarray:
+    """
+    Renders text to an RGBA image with the text renderer of the process.
+    See TextRenderer.render.
+    """
+
+    return get_text_renderer().render(
+        text, font, font_size, color, background_color, method, size
+    )
+
+
+def save_text_image(image: np.ndarray, path: str) -> None:
+    Image.fromarray(image, mode="RGBA").save(path)
+
+
+def get_color(color: Union[str, tuple]) -> tuple[int, int, int, int]:
+    if color is None or color == "transparent":
+        return (0, 0, 0, 0)
+
+    if isinstance(color, tuple):
+        return (*color[:3], color[3] if len(color) > 3 else 255)
+
+    return ImageColor.getcolor(color, "RGBA")
+
+
+def get_layout_engine() -> str:
+    """
+    Gets how right-to-left text is shaped and reordered: "raqm", "reshaper+bidi" or
+    "basic" when neither is available.
+    """
+
+    if HAS_RAQM:
+        return "raqm"
+
+    if arabic_reshaper is not None:
+        return "reshaper+bidi"
+
+    return "basic"
+
+
+@lru_cache(maxsize=None)
+def get_renderer_identity() -> dict:
+    """
+    Gets the layout engine and library versions that determine the pixels of
+    rendered text, so images rendered by another setup are not reused.
+    """
+
+    layout_engine = get_layout_engine()
+    identity = {
+        "layout_engine": layout_engine,
+        "pillow": PIL.__version__,
+        "freetype": features.version("freetype2"),
+    }
+
+    if layout_engine == "raqm":
+        identity["raqm"] = features.version("raqm")
+    elif layout_engine == "reshaper+bidi":
+        identity["arabic_reshaper"] = get_package_version("arabic-reshaper")
+        identity["python_bidi"] = get_package_version("python-bidi")
+
+    return identity
+
+
+def get_package_version(name: str) -> Optional[str]:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def get_visual_text(text: str) -> str:
+    """
+    Gets the text in the order it is drawn in.
+
+    With raqm Pillow shapes and reorders the text itself. Without it, Arabic is
+    shaped with arabic_reshaper and reordered with python-bidi when installed.
+    """
+
+    if HAS_RAQM or arabic_reshaper is None:
+        return text
+
+    return get_display(arabic_reshaper.reshape(text))
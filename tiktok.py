@@ -11,6 +11,7 @@ from models import (
     VideoModes,
     VideoSettings,
     AdditionalVideoSettings,
+    RenderSettings,
 )
 from presets import Presets
 from functions import create_video, fetch_chapter_name
@@ -37,6 +38,8 @@ class TikTok:
         ),
         additional_video_settings: Optional[AdditionalVideoSettings] = None,
         output_mp4_file: Optional[str] = None,
+        plan_only: bool = False,
+        render_settings: Optional[RenderSettings] = None,
     ):
         if preset:
             audio_directory_path = preset.value.audio_directory_path
@@ -141,7 +144,7 @@ class TikTok:
             text_size=(video_settings.videoDimensions[0] * 0.6, None),
         )
 
-        create_video(
+        return create_video(
             account=self.account,
             audioSettings=audio_settings,
             csvColumnNames=csv_column_names,
@@ -158,4 +161,6 @@ class TikTok:
             reciter_name=reciter_name,
             reciter_name_text_clip=reciter_name_text_clip,
             outputFile=output_mp4_file,
+            plan_only=plan_only,
+            renderSettings=render_settings,
         )
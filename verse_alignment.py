@@ -0,0 +1,103 @@
+from bisect import bisect_left
+from rapidfuzz import fuzz, process
+from typing import Optional
+
+# The lowest rounded match ratio of a text and the verse it is part of
+MATCH_THRESHOLD = 84
+
+
+class VerseAligner:
+    """
+    Finds the verses that the texts of a recitation are part of, in order.
+
+    The start of every word of the verses is indexed once. A text is compared
+    with the part of a verse of the same length starting at each word, with
+    the C implementation of the fuzzy match ratio of rapidfuzz. Texts follow
+    the verses, so every match moves a position in the verses forward and
+    later texts are only compared with the rest of the verses from there.
+    """
+
+    def __init__(self, verses: list[tuple[int, str]]):
+        self.verses = verses
+        self.word_starts = [
+            [0] + [index + 1 for index, char in enumerate(text) if char == " "]
+            for _, text in verses
+        ]
+
+        # The position in the verses: the current verse and the end of its matched text
+        self.verse_index = 0
+        self.offset = 0
+
+        self.skip_matched_verses()
+
+    def align(self, text: str) -> Optional[int]:
+        """
+        Finds the verse a text is part of and moves past the matched text.
+
+        Within a verse the part with the best ratio is the match, the first
+        one on ties. Verses are compared by their rounded best ratio, the
+        first verse wins on ties.
+
+        Parameters
+        ----------
+        text : str
+            The text.
+
+        Returns
+        -------
+        Optional[int]
+            The verse number, None if no part of the rest of the verses
+            matches at least MATCH_THRESHOLD.
+        """
+
+        if not text:
+            return None
+
+        best_ratio, best_match = 0, None
+
+        for verse_index in range(self.verse_index, len(self.verses)):
+            verse_text = self.verses[verse_index][1]
+            word_starts = self.word_starts[verse_index]
+
+            if verse_index == self.verse_index:
+                word_starts = word_starts[bisect_left(word_starts, self.offset) :]
+
+            # Verses shorter than the text can not contain it
+            if not word_starts or len(verse_text) - word_starts[0] < len(text):
+                continue
+
+            candidates = [
+                verse_text[word_start : word_start + len(text)]
+                for word_start in word_starts
+            ]
+            _, ratio, candidate_index = process.extractOne(
+                text, candidates, scorer=fuzz.ratio, processor=None
+            )
+            ratio = round(ratio)
+
+            if ratio <= best_ratio:
+                continue
+
+            best_ratio, best_match = ratio, (verse_index, word_starts[candidate_index])
+
+            if best_ratio == 100:
+                break
+
+        if best_ratio < MATCH_THRESHOLD:
+            return None
+
+        verse_index, word_start = best_match
+        self.verse_index = verse_index
+        self.offset = word_start + len(text)
+
+        self.skip_matched_verses()
+
+        return self.verses[verse_index][0]
+
+    def skip_matched_verses(self) -> None:
+        while (
+            self.verse_index < len(self.verses)
+            and not self.verses[self.verse_index][1][self.offset :].strip()
+        ):
+            self.verse_index += 1
+            self.offset = 0
@@ -0,0 +1,447 @@
+import numpy as np
+import subprocess
+
+from clip_index import get_clip_metadata
+from collections import OrderedDict
+from ffmpeg_backend import get_background_filter, get_center_crop_filter
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+from moviepy.video.VideoClip import VideoClip
+from threading import RLock
+from typing import Optional
+
+# Seeking further ahead than this restarts ffmpeg instead of skipping frames
+MAX_SKIPPED_FRAMES = 100
+DEFAULT_MAX_DECODERS = 8
+
+_video_reader_pool = None
+_video_reader_pool_lock = RLock()
+
+
+class VideoReaderPool:
+    """
+    Shares video readers between the clips of a render.
+
+    Every file, or file and transform, gets a single reader, so sequential
+    subclips of the same file reuse one decoder. At most max_decoders ffmpeg
+    processes run at the same time: starting another one stops the least
+    recently used decoder, which is restarted at its position when it is read again.
+    """
+
+    def __init__(self, max_decoders: int = DEFAULT_MAX_DECODERS):
+        self.max_decoders = max_decoders
+        self.lock = RLock()
+
+        self._clips = {}
+        self._transformed_readers = {}
+        self._open_readers = OrderedDict()
+
+    def get_clip(self, path: str) -> VideoClip:
+        """
+        Gets the shared clip of a file.
+
+        Parameters
+        ----------
+        path : str
+            The path to the clip.
+
+        Returns
+        -------
+        VideoClip
+            The clip, without audio. Use subclip and the other moviepy
+            transforms on it instead of closing it.
+        """
+
+        with self.lock:
+            if path not in self._clips:
+                self._clips[path] = PooledVideoFileClip(PooledVideoReader(self, path))
+
+            return self._clips[path]
+
+    def get_transformed_clip(
+        self,
+        path: str,
+        time_offset: float,
+        clip_speed: float,
+        horizontal_offset: int,
+        mirrored: bool,
+        video_dimensions: tuple[int, int],
+        fps: float,
+        duration: float,
+    ) -> "TransformedVideoClip":
+        """
+        Gets a clip of a file that is transformed while decoding, sharing the
+        reader with every clip of the file with the same transform.
+
+        Returns
+        -------
+        TransformedVideoClip
+            The clip.
+        """
+
+        key = (path, clip_speed, horizontal_offset, mirrored, video_dimensions, fps)
+
+        with self.lock:
+            if key not in self._transformed_readers:
+                self._transformed_readers[key] = TransformedVideoReader(
+                    path,
+                    clip_speed,
+                    horizontal_offset,
+                    mirrored,
+                    video_dimensions,
+                    fps,
+                    pool=self,
+                )
+
+            return TransformedVideoClip(
+                self._transformed_readers[key], time_offset, duration
+            )
+
+    def acquire(self, reader) -> None:
+        """
+        Registers a reader that starts its decoder, stopping the least recently
+        used decoders above the limit. Called with the pool lock held.
+        """
+
+        self._open_readers.pop(id(reader), None)
+
+        while len(self._open_readers) >= self.max_decoders:
+            _, least_recently_used_reader = self._open_readers.popitem(last=False)
+            least_recently_used_reader.close()
+
+        self._open_readers[id(reader)] = reader
+
+    def touch(self, reader) -> None:
+        with self.lock:
+            if id(reader) in self._open_readers:
+                self._open_readers.move_to_end(id(reader))
+
+    def release(self, reader) -> None:
+        with self.lock:
+            self._open_readers.pop(id(reader), None)
+
+    @property
+    def open_decoders(self) -> int:
+        return len(self._open_readers)
+
+    def close(self) -> None:
+        """
+        Stops every decoder and forgets every reader of the pool.
+        """
+
+        with self.lock:
+            readers = [
+                *(clip.reader for clip in self._clips.values()),
+                *self._transformed_readers.values(),
+            ]
+
+            for reader in readers:
+                reader.close()
+
+            self._clips.clear()
+            self._transformed_readers.clear()
+            self._open_readers.clear()
+
+
+class PooledVideoReader(FFMPEG_VideoReader):
+    """
+    moviepy video reader whose decoder is managed by a VideoReaderPool.
+    """
+
+    def __init__(self, pool: VideoReaderPool, path: str):
+        self.pool = pool
+
+        FFMPEG_VideoReader.__init__(self, path)
+
+    def initialize(self, starttime=0):
+        with self.pool.lock:
+            self.close()
+            self.pool.acquire(self)
+            FFMPEG_VideoReader.initialize(self, starttime)
+
+    def get_frame(self, t):
+        self.pool.touch(self)
+
+        with self.pool.lock:
+            return FFMPEG_VideoReader.get_frame(self, t)
+
+    def close(self):
+        FFMPEG_VideoReader.close(self)
+        self.pool.release(self)
+
+
+class PooledVideoFileClip(VideoClip):
+    """
+    Video clip of the frames of a PooledVideoReader, like mpy.VideoFileClip
+    without audio.
+    """
+
+    def __init__(self, reader: PooledVideoReader):
+        VideoClip.__init__(self)
+
+        self.reader = reader
+        self.filename = reader.filename
+        self.duration = reader.duration
+        self.end = reader.duration
+        self.fps = reader.fps
+        self.size = reader.size
+        self.rotation = reader.rotation
+        self.make_frame = lambda t: reader.get_frame(t)
+
+
+def get_video_reader_pool() -> VideoReaderPool:
+    """
+    Gets the video reader pool of the process.
+    """
+
+    global _video_reader_pool
+
+    with _video_reader_pool_lock:
+        if _video_reader_pool is None:
+            _video_reader_pool = VideoReaderPool()
+
+        return _video_reader_pool
+
+
+def close_video_readers() -> None:
+    """
+    Stops every decoder of the video reader pool of the process.
+    """
+
+    with _video_reader_pool_lock:
+        if _video_reader_pool is not None:
+            _video_reader_pool.close()
+
+
+class TransformedVideoReader:
+    """
+    Reads the frames of a background clip with the crop, mirror, speed and
+    scale of the render plan applied by ffmpeg, so only frames of the video
+    size are piped to Python.
+
+    Times are in seconds of the sped up clip.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        clip_speed: float,
+        horizontal_offset: int,
+        mirrored: bool,
+        video_dimensions: tuple[int, int],
+        fps: float,
+        pool: Optional[VideoReaderPool] = None,
+    ):
+        self.path = path
+        self.clip_speed = clip_speed
+        self.horizontal_offset = horizontal_offset
+        self.mirrored = mirrored
+        self.size = video_dimensions
+        self.fps = fps
+        self.pool = pool
+
+        self.process = None
+        self.position = 0
+        self.last_frame = None
+
+        metadata = get_clip_metadata(path)
+        self.filters = get_background_filter(
+            metadata.width,
+            metadata.height,
+            horizontal_offset,
+            mirrored,
+            clip_speed,
+            video_dimensions,
+            fps,
+        )
+
+    def initialize(self, frame_number: int = 0) -> None:
+        """
+        Starts ffmpeg at a frame of the clip.
+
+        Parameters
+        ----------
+        frame_number : int, optional
+            The first frame to read, by default 0
+        """
+
+        if self.pool:
+            with self.pool.lock:
+                self.close()
+                self.pool.acquire(self)
+                self.start_process(frame_number)
+        else:
+            self.close()
+            self.start_process(frame_number)
+
+    def start_process(self, frame_number: int) -> None:
+        source_time = frame_number / self.fps * self.clip_speed
+        command = [
+            get_setting("FFMPEG_BINARY"),
+            "-loglevel",
+            "error",
+            "-ss",
+            f"{source_time:.6f}",
+            "-i",
+            self.path,
+            "-an",
+            "-vf",
+            self.filters,
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "rgb24",
+            "-",
+        ]
+
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=self.size[0] * self.size[1] * 3 * 4,
+        )
+        self.position = frame_number
+
+    def read_frame(self) -> np.ndarray:
+        """
+        Reads the next frame, or repeats the last frame at the end of the clip.
+        """
+
+        width, height = self.size
+        frame_size = width * height * 3
+        data = self.process.stdout.read(frame_size)
+
+        if len(data) == frame_size:
+            self.last_frame = np.frombuffer(data, dtype=np.uint8).reshape(
+                (height, width, 3)
+            )
+        elif self.last_frame is None:
+            raise IOError(f"Failed to read a frame of {self.path}")
+
+        self.position += 1
+
+        return self.last_frame
+
+    def get_frame(self, t: float) -> np.ndarray:
+        """
+        Gets the frame at a time, skipping frames when reading ahead.
+
+        Parameters
+        ----------
+        t : float
+            The time in seconds.
+
+        Returns
+        -------
+        np.ndarray
+            The frame.
+        """
+
+        if self.pool:
+            self.pool.touch(self)
+
+            with self.pool.lock:
+                return self.read_frame_at(t)
+
+        return self.read_frame_at(t)
+
+    def read_frame_at(self, t: float) -> np.ndarray:
+        frame_number = int(self.fps * t + 0.00001)
+
+        if self.process is not None and frame_number == self.position - 1:
+            return self.last_frame
+
+        if (
+            self.process is None
+            or frame_number < self.position
+            or frame_number > self.position + MAX_SKIPPED_FRAMES
+        ):
+            self.initialize(frame_number)
+
+        while self.position < frame_number:
+            self.read_frame()
+
+        return self.read_frame()
+
+    def close(self) -> None:
+        if self.process is not None:
+            self.process.stdout.close()
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+
+        if self.pool:
+            self.pool.release(self)
+
+    def __del__(self):
+        self.close()
+
+
+class TransformedVideoClip(VideoClip):
+    """
+    Video clip of the frames of a TransformedVideoReader from a time offset on.
+    """
+
+    def __init__(
+        self, reader: TransformedVideoReader, time_offset: float, duration: float
+    ):
+        VideoClip.__init__(self, duration=duration)
+
+        self.reader = reader
+        self.size = reader.size
+        self.fps = reader.fps
+        self.make_frame = lambda t: reader.get_frame(time_offset + t)
+
+
+def read_transformed_frame(
+    path: str, frame_time: float, video_dimensions: tuple[int, int]
+) -> np.ndarray:
+    """
+    Reads a single frame of a clip, center cropped to the aspect ratio of the
+    video and scaled to the video size by ffmpeg.
+
+    Parameters
+    ----------
+    path : str
+        The path to the clip.
+    frame_time : float
+        The time of the frame in seconds.
+    video_dimensions : tuple[int, int]
+        The dimensions of the video.
+
+    Returns
+    -------
+    np.ndarray
+        The frame.
+    """
+
+    width, height = video_dimensions
+    command = [
+        get_setting("FFMPEG_BINARY"),
+        "-loglevel",
+        "error",
+        "-ss",
+        f"{frame_time:.6f}",
+        "-i",
+        path,
+        "-an",
+        "-frames:v",
+        "1",
+        "-vf",
+        get_center_crop_filter(path, video_dimensions) + f"scale={width}:{height}",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-",
+    ]
+
+    result = subprocess.run(command, capture_output=True)
+
+    if result.returncode != 0 or len(result.stdout) != width * height * 3:
+        raise IOError(
+            f"Failed to read the frame at {frame_time}s of {path}: {result.stderr.decode(errors='ignore')}"
+        )
+
+    return np.frombuffer(result.stdout, dtype=np.uint8).reshape((height, width, 3))